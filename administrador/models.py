@@ -77,6 +77,11 @@ class ModelosIa(models.Model):
     imagen_ia = models.BinaryField(blank=True, null=True)
     color_ia = models.CharField(max_length=7, blank=True, null=True)
     id_usuario = models.ForeignKey('Usuarios', models.DO_NOTHING, db_column='id_usuario', blank=True, null=True)
+    id_modelo_respaldo = models.ForeignKey('self', models.DO_NOTHING, db_column='id_modelo_respaldo', blank=True, null=True)
+    cobertura_activa = models.BooleanField(blank=True, null=True)
+    imagen_hash = models.CharField(max_length=64, blank=True, null=True)
+    imagen_miniatura = models.BinaryField(blank=True, null=True)
+    fecha_imagen = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = False
@@ -106,6 +111,9 @@ class ConfiguracionClaude(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     anthropic_version = models.CharField(max_length=20, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -124,6 +132,9 @@ class ConfiguracionDeepseek(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -142,6 +153,9 @@ class ConfiguracionGemini(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -160,6 +174,9 @@ class ConfiguracionOpenai(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -4,28 +4,17 @@ from django.http import JsonResponse, QueryDict
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import requests
-import jwt
 from django.db.models import Q
 from administrador.models import *
 from django.utils import timezone
 from datetime import datetime
 import base64
+from usuarios.autenticacion import validar_token
+from usuarios.imagenes_modelo import ErrorImagenModelo, campos_imagen
+from usuarios.paginacion import ErrorPaginacion, leer_campos, paginar, proyectar
 
-def validar_token(request):
-    """Valida el token JWT del header Authorization"""
-    try:
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return None
-        
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        return payload
-        
-    except jwt.ExpiredSignatureError:
-        return {'error': 'Token expirado'}
-    except jwt.InvalidTokenError:
-        return {'error': 'Token inválido'}
+# Límites de uso del modelo configurables en las tablas configuracion_* (vacío = sin límite)
+CAMPOS_LIMITE_USO = ['limite_peticiones_minuto', 'limite_tokens_minuto', 'max_llamadas_simultaneas']
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -100,14 +89,10 @@ def listar_lenguajes_usuario(request, usuario_id):
         return JsonResponse(payload, status=401)
     
     try:
-        # Obtener IDs de todos los usuarios admin
-        usuarios_admin_ids = list(Usuarios.objects.filter(
-            rol__nombre__iexact='admin'
-        ).values_list('id', flat=True))
-        
         # Obtener lenguajes creados por admins O por el usuario actual
+        # (el rol de los creadores se resuelve con un JOIN en la misma consulta)
         lenguajes = Lenguajes.objects.filter(
-            Q(usuario_id__in=usuarios_admin_ids) | 
+            Q(usuario__rol__nombre__iexact='admin') | 
             Q(usuario_id=usuario_id)
         ).values(
             'id', 
@@ -270,6 +255,9 @@ def crear_modelo_claude(request):
         except Usuarios.DoesNotExist:
             return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
 
+        # Imagen opcional (se valida antes de crear el modelo)
+        imagen = campos_imagen(request.FILES.get('imagen'))
+
         # Crear modelo IA
         modelo = ModelosIa.objects.create(
             nombre=nombre,
@@ -280,7 +268,8 @@ def crear_modelo_claude(request):
             recomendado=False,
             fecha_creacion=timezone.now(),
             color_ia=color_ia,
-            id_usuario=usuario
+            id_usuario=usuario,
+            **imagen
         )
 
         # Crear configuración Claude
@@ -292,6 +281,9 @@ def crear_modelo_claude(request):
             model_name=request.POST.get("model_name", ""),
             max_tokens=request.POST.get("max_tokens"),
             anthropic_version=request.POST.get("anthropic_version"),
+            limite_peticiones_minuto=request.POST.get("limite_peticiones_minuto") or None,
+            limite_tokens_minuto=request.POST.get("limite_tokens_minuto") or None,
+            max_llamadas_simultaneas=request.POST.get("max_llamadas_simultaneas") or None,
             activo=True,
             fecha_creacion=timezone.now(),
             fecha_modificacion=timezone.now()
@@ -303,6 +295,8 @@ def crear_modelo_claude(request):
             "nombre": modelo.nombre
         }, status=201)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -339,6 +333,9 @@ def crear_modelo_deepseek(request):
         except Usuarios.DoesNotExist:
             return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
 
+        # Imagen opcional (se valida antes de crear el modelo)
+        imagen = campos_imagen(request.FILES.get('imagen'))
+
         modelo = ModelosIa.objects.create(
             nombre=nombre,
             version=version,
@@ -348,7 +345,8 @@ def crear_modelo_deepseek(request):
             recomendado=False,
             fecha_creacion=timezone.now(),
             color_ia=color_ia,
-            id_usuario=usuario
+            id_usuario=usuario,
+            **imagen
         )
 
         ConfiguracionDeepseek.objects.create(
@@ -359,6 +357,9 @@ def crear_modelo_deepseek(request):
             model_name=request.POST.get("model_name", ""),
             max_tokens=request.POST.get("max_tokens"),
             temperature=request.POST.get("temperature"),
+            limite_peticiones_minuto=request.POST.get("limite_peticiones_minuto") or None,
+            limite_tokens_minuto=request.POST.get("limite_tokens_minuto") or None,
+            max_llamadas_simultaneas=request.POST.get("max_llamadas_simultaneas") or None,
             activo=True,
             fecha_creacion=timezone.now(),
             fecha_modificacion=timezone.now()
@@ -370,6 +371,8 @@ def crear_modelo_deepseek(request):
             "nombre": modelo.nombre
         }, status=201)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -406,6 +409,9 @@ def crear_modelo_gemini(request):
         except Usuarios.DoesNotExist:
             return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
 
+        # Imagen opcional (se valida antes de crear el modelo)
+        imagen = campos_imagen(request.FILES.get('imagen'))
+
         modelo = ModelosIa.objects.create(
             nombre=nombre,
             version=version,
@@ -415,7 +421,8 @@ def crear_modelo_gemini(request):
             recomendado=False,
             fecha_creacion=timezone.now(),
             color_ia=color_ia,
-            id_usuario=usuario
+            id_usuario=usuario,
+            **imagen
         )
 
         ConfiguracionGemini.objects.create(
@@ -426,6 +433,9 @@ def crear_modelo_gemini(request):
             model_name=request.POST.get("model_name", ""),
             max_tokens=request.POST.get("max_tokens"),
             temperature=request.POST.get("temperature"),
+            limite_peticiones_minuto=request.POST.get("limite_peticiones_minuto") or None,
+            limite_tokens_minuto=request.POST.get("limite_tokens_minuto") or None,
+            max_llamadas_simultaneas=request.POST.get("max_llamadas_simultaneas") or None,
             activo=True,
             fecha_creacion=timezone.now(),
             fecha_modificacion=timezone.now()
@@ -437,6 +447,8 @@ def crear_modelo_gemini(request):
             "nombre": modelo.nombre
         }, status=201)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -473,6 +485,9 @@ def crear_modelo_openai(request):
         except Usuarios.DoesNotExist:
             return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
 
+        # Imagen opcional (se valida antes de crear el modelo)
+        imagen = campos_imagen(request.FILES.get('imagen'))
+
         modelo = ModelosIa.objects.create(
             nombre=nombre,
             version=version,
@@ -482,7 +497,8 @@ def crear_modelo_openai(request):
             recomendado=False,
             fecha_creacion=timezone.now(),
             color_ia=color_ia,
-            id_usuario=usuario
+            id_usuario=usuario,
+            **imagen
         )
 
         ConfiguracionOpenai.objects.create(
@@ -493,6 +509,9 @@ def crear_modelo_openai(request):
             model_name=request.POST.get("model_name", ""),
             max_tokens=request.POST.get("max_tokens"),
             temperature=request.POST.get("temperature"),
+            limite_peticiones_minuto=request.POST.get("limite_peticiones_minuto") or None,
+            limite_tokens_minuto=request.POST.get("limite_tokens_minuto") or None,
+            max_llamadas_simultaneas=request.POST.get("max_llamadas_simultaneas") or None,
             activo=True,
             fecha_creacion=timezone.now(),
             fecha_modificacion=timezone.now()
@@ -504,6 +523,8 @@ def crear_modelo_openai(request):
             "nombre": modelo.nombre
         }, status=201)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -551,6 +572,19 @@ def editar_modelo_claude(request, id_modelo):
         if data.get("color_ia"):
             modelo.color_ia = data.get("color_ia")
         
+        # Respaldo ante fallas del proveedor (vacío lo quita) y cobertura por latencia
+        if "id_modelo_respaldo" in data:
+            id_respaldo = data.get("id_modelo_respaldo") or None
+            if id_respaldo and int(id_respaldo) == modelo.id:
+                return JsonResponse({'error': 'Un modelo no puede ser su propio respaldo'}, status=400)
+            modelo.id_modelo_respaldo_id = id_respaldo
+        if "cobertura_activa" in data:
+            modelo.cobertura_activa = data.get("cobertura_activa").lower() in ['true', '1', 'yes']
+        
+        # Imagen nueva (solo en POST multipart; con PUT no llegan archivos)
+        for campo, valor in campos_imagen(request.FILES.get('imagen')).items():
+            setattr(modelo, campo, valor)
+        
         modelo.save()
 
         # Actualizar configuración
@@ -565,6 +599,11 @@ def editar_modelo_claude(request, id_modelo):
         if data.get("anthropic_version"):
             config.anthropic_version = data.get("anthropic_version")
         
+        # Límites de uso: un valor vacío los quita
+        for campo in CAMPOS_LIMITE_USO:
+            if campo in data:
+                setattr(config, campo, data.get(campo) or None)
+        
         config.fecha_modificacion = timezone.now()
         config.save()
 
@@ -574,6 +613,8 @@ def editar_modelo_claude(request, id_modelo):
             "nombre": modelo.nombre
         }, status=200)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -617,6 +658,19 @@ def editar_modelo_deepseek(request, id_modelo):
         if data.get("color_ia"):
             modelo.color_ia = data.get("color_ia")
         
+        # Respaldo ante fallas del proveedor (vacío lo quita) y cobertura por latencia
+        if "id_modelo_respaldo" in data:
+            id_respaldo = data.get("id_modelo_respaldo") or None
+            if id_respaldo and int(id_respaldo) == modelo.id:
+                return JsonResponse({'error': 'Un modelo no puede ser su propio respaldo'}, status=400)
+            modelo.id_modelo_respaldo_id = id_respaldo
+        if "cobertura_activa" in data:
+            modelo.cobertura_activa = data.get("cobertura_activa").lower() in ['true', '1', 'yes']
+        
+        # Imagen nueva (solo en POST multipart; con PUT no llegan archivos)
+        for campo, valor in campos_imagen(request.FILES.get('imagen')).items():
+            setattr(modelo, campo, valor)
+        
         modelo.save()
 
         if data.get("endpoint_url"):
@@ -630,6 +684,11 @@ def editar_modelo_deepseek(request, id_modelo):
         if data.get("temperature"):
             config.temperature = data.get("temperature")
         
+        # Límites de uso: un valor vacío los quita
+        for campo in CAMPOS_LIMITE_USO:
+            if campo in data:
+                setattr(config, campo, data.get(campo) or None)
+        
         config.fecha_modificacion = timezone.now()
         config.save()
 
@@ -639,6 +698,8 @@ def editar_modelo_deepseek(request, id_modelo):
             "nombre": modelo.nombre
         }, status=200)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -682,6 +743,19 @@ def editar_modelo_gemini(request, id_modelo):
         if data.get("color_ia"):
             modelo.color_ia = data.get("color_ia")
         
+        # Respaldo ante fallas del proveedor (vacío lo quita) y cobertura por latencia
+        if "id_modelo_respaldo" in data:
+            id_respaldo = data.get("id_modelo_respaldo") or None
+            if id_respaldo and int(id_respaldo) == modelo.id:
+                return JsonResponse({'error': 'Un modelo no puede ser su propio respaldo'}, status=400)
+            modelo.id_modelo_respaldo_id = id_respaldo
+        if "cobertura_activa" in data:
+            modelo.cobertura_activa = data.get("cobertura_activa").lower() in ['true', '1', 'yes']
+        
+        # Imagen nueva (solo en POST multipart; con PUT no llegan archivos)
+        for campo, valor in campos_imagen(request.FILES.get('imagen')).items():
+            setattr(modelo, campo, valor)
+        
         modelo.save()
 
         if data.get("endpoint_url"):
@@ -695,6 +769,11 @@ def editar_modelo_gemini(request, id_modelo):
         if data.get("temperature"):
             config.temperature = data.get("temperature")
         
+        # Límites de uso: un valor vacío los quita
+        for campo in CAMPOS_LIMITE_USO:
+            if campo in data:
+                setattr(config, campo, data.get(campo) or None)
+        
         config.fecha_modificacion = timezone.now()
         config.save()
 
@@ -704,6 +783,8 @@ def editar_modelo_gemini(request, id_modelo):
             "nombre": modelo.nombre
         }, status=200)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -747,6 +828,19 @@ def editar_modelo_openai(request, id_modelo):
         if data.get("color_ia"):
             modelo.color_ia = data.get("color_ia")
         
+        # Respaldo ante fallas del proveedor (vacío lo quita) y cobertura por latencia
+        if "id_modelo_respaldo" in data:
+            id_respaldo = data.get("id_modelo_respaldo") or None
+            if id_respaldo and int(id_respaldo) == modelo.id:
+                return JsonResponse({'error': 'Un modelo no puede ser su propio respaldo'}, status=400)
+            modelo.id_modelo_respaldo_id = id_respaldo
+        if "cobertura_activa" in data:
+            modelo.cobertura_activa = data.get("cobertura_activa").lower() in ['true', '1', 'yes']
+        
+        # Imagen nueva (solo en POST multipart; con PUT no llegan archivos)
+        for campo, valor in campos_imagen(request.FILES.get('imagen')).items():
+            setattr(modelo, campo, valor)
+        
         modelo.save()
 
         if data.get("endpoint_url"):
@@ -760,6 +854,11 @@ def editar_modelo_openai(request, id_modelo):
         if data.get("temperature"):
             config.temperature = data.get("temperature")
         
+        # Límites de uso: un valor vacío los quita
+        for campo in CAMPOS_LIMITE_USO:
+            if campo in data:
+                setattr(config, campo, data.get(campo) or None)
+        
         config.fecha_modificacion = timezone.now()
         config.save()
 
@@ -769,6 +868,8 @@ def editar_modelo_openai(request, id_modelo):
             "nombre": modelo.nombre
         }, status=200)
 
+    except ErrorImagenModelo as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -783,31 +884,23 @@ def listar_modelos_usuario(request):
         return JsonResponse(payload, status=401)
 
     try:
-        # Obtener IDs de todos los usuarios admin
-        usuarios_admin_ids = list(Usuarios.objects.filter(
-            rol__nombre__iexact='admin'
-        ).values_list('id', flat=True))
-
-        # Obtener solo modelos creados por admins
+        # Obtener solo modelos creados por admins (el rol se resuelve con un JOIN en la misma consulta)
+        # Solo las columnas del listado: sin leer los bytes de la imagen ni de la miniatura
         modelos = ModelosIa.objects.filter(
-            id_usuario_id__in=usuarios_admin_ids
-        ).order_by('proveedor_id', '-fecha_creacion')
+            id_usuario__rol__nombre__iexact='admin'
+        ).order_by('proveedor_id', '-fecha_creacion').values(
+            "id",
+            "nombre",
+            "version",
+            "descripcion",
+            "proveedor_id",
+            "color_ia",
+            "recomendado",
+            "activo",
+            "fecha_creacion",
+        )
 
-        data = []
-        for m in modelos:
-            data.append({
-                "id": m.id,
-                "nombre": m.nombre,
-                "version": m.version,
-                "descripcion": m.descripcion,
-                "proveedor_id": m.proveedor_id,
-                "color_ia": m.color_ia,
-                "recomendado": m.recomendado,
-                "activo": m.activo,
-                "fecha_creacion": m.fecha_creacion,
-            })
-
-        return JsonResponse({"modelos": data}, status=200)
+        return JsonResponse({"modelos": list(modelos)}, status=200)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -879,6 +972,11 @@ def marcar_recomendado(request, id_modelo):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
     
+# Columnas que se pueden pedir con ?fields= en el listado de comparaciones
+CAMPOS_LISTADO_COMPARACIONES = [
+    'id', 'nombre_comparacion', 'nombre_usuario', 'usuario_id', 'estado', 'lenguaje', 'modelo_ia', 'fecha_creacion'
+]
+
 @require_http_methods(["GET"])
 def listar_comparaciones(request):
     """Listar TODAS las comparaciones individuales de todos los usuarios"""
@@ -890,31 +988,30 @@ def listar_comparaciones(request):
         return JsonResponse(payload, status=401)
 
     try:
-        # Verificar que el usuario es admin (opcional pero recomendado)
-        try:
-            usuario = Usuarios.objects.select_related('rol').get(id=payload['usuario_id'])
-            if usuario.rol.nombre.lower() != 'admin':
-                return JsonResponse({
-                    'error': 'No tienes permisos para ver todas las comparaciones'
-                }, status=403)
-        except Usuarios.DoesNotExist:
-            return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
+        # Verificar que el usuario es admin (rol vigente del principal, cacheado TTL_USUARIO segundos)
+        if not request.principal.es_admin:
+            return JsonResponse({
+                'error': 'No tienes permisos para ver todas las comparaciones'
+            }, status=403)
         
-        # Obtener TODAS las comparaciones de TODOS los usuarios
-        comparaciones = ComparacionesIndividuales.objects.select_related(
-            'usuario__datos_personales',
-            'lenguaje',
-            'id_modelo_ia'
-        ).order_by('-fecha_creacion')
-
-        print(f"🔍 DEBUG: Total de comparaciones en el sistema: {comparaciones.count()}")
+        # Página de comparaciones de TODOS los usuarios (?limit=, ?cursor=, ?fields=),
+        # sin traer los códigos fuente que el listado no muestra
+        campos = leer_campos(request, CAMPOS_LISTADO_COMPARACIONES)
+        comparaciones, siguiente = paginar(
+            ComparacionesIndividuales.objects.select_related(
+                'usuario__datos_personales',
+                'lenguaje',
+                'id_modelo_ia'
+            ).defer('codigo_1', 'codigo_2'),
+            request
+        )
 
         data = []
         for comp in comparaciones:
             # Concatenar nombres y apellidos
             nombre_completo = f"{comp.usuario.datos_personales.nombres} {comp.usuario.datos_personales.apellidos}"
             
-            data.append({
+            data.append(proyectar({
                 "id": comp.id,
                 "nombre_comparacion": comp.nombre_comparacion,
                 "nombre_usuario": nombre_completo,
@@ -923,12 +1020,12 @@ def listar_comparaciones(request):
                 "lenguaje": comp.lenguaje.nombre if comp.lenguaje else None,
                 "modelo_ia": comp.id_modelo_ia.nombre if comp.id_modelo_ia else None,
                 "fecha_creacion": comp.fecha_creacion,
-            })
-
-        print(f"🔍 DEBUG: Datos a enviar: {len(data)} comparaciones")
+            }, campos))
 
-        return JsonResponse({"comparaciones": data}, status=200)
+        return JsonResponse({"comparaciones": data, "next_cursor": siguiente}, status=200)
 
+    except ErrorPaginacion as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         return JsonResponse({"error": str(e)}, status=500)
@@ -945,15 +1042,11 @@ def cambiar_estado_comparacion(request, id_comparacion):
         return JsonResponse(payload, status=401)
 
     try:
-        # Verificar que el usuario es admin
-        try:
-            usuario = Usuarios.objects.select_related('rol').get(id=payload['usuario_id'])
-            if usuario.rol.nombre.lower() != 'admin':
-                return JsonResponse({
-                    'error': 'No tienes permisos para modificar comparaciones'
-                }, status=403)
-        except Usuarios.DoesNotExist:
-            return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
+        # Verificar que el usuario es admin (rol vigente del principal, cacheado TTL_USUARIO segundos)
+        if not request.principal.es_admin:
+            return JsonResponse({
+                'error': 'No tienes permisos para modificar comparaciones'
+            }, status=403)
         
         # Admin puede cambiar el estado de cualquier comparación
         try:
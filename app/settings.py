@@ -53,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'usuarios.autenticacion.AutenticacionJWTMiddleware',  # request.principal a partir del JWT
 ]
 
 # Configuración de CORS
@@ -111,6 +112,34 @@ DATABASES = {
     }
 }
 
+# Cachés
+# 'similitud_ia' guarda respuestas del proveedor por contenido del par de códigos.
+# LocMemCache es por proceso; para compartirla entre trabajadores usar Redis o DatabaseCache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'similitud_ia': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'similitud_ia',
+        'TIMEOUT': 60 * 60 * 24 * 7,    # TTL: 7 días
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,        # Al llenarse se descartan las menos usadas (LRU)
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # Estado de los usuarios (activo, rol) y tokens revocados. La revocación debe verse en todos los
+    # procesos: backend compartido (DatabaseCache o Redis); la tabla se crea con
+    # `python manage.py createcachetable`. Con LocMemCache el middleware no arranca
+    'autenticacion': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_autenticacion',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+}
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -162,3 +191,111 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Cola de trabajos para las comparaciones con IA
+# Los trabajadores se inician con: python manage.py procesar_trabajos_ia
+TRABAJOS_IA = {
+    'TRABAJADORES': 4,              # Hilos por proceso trabajador
+    'INTERVALO_SONDEO': 1.0,        # Segundos de espera cuando la cola está vacía
+    'MAX_INTENTOS': 3,              # Reintentos ante timeouts, 429 y 5xx del proveedor
+    'MAX_ESPERAS_LIMITE': 20,       # Veces que un trabajo vuelve a la cola por falta de cupo antes de fallar
+    'TIEMPO_MAXIMO_PROCESO': 300,   # Segundos antes de considerar abandonado un trabajo
+    'TIEMPO_MAXIMO_PROCESO_GRUPAL': 3600,  # Igual, para comparaciones grupales (una llamada por par)
+}
+
+# Similitud local por huellas (winnowing) antes de consultar a la IA
+SIMILITUD_LOCAL = {
+    'TAMANO_KGRAMA': 5,             # Tokens por k-grama
+    'VENTANA': 4,                   # Tamaño de la ventana de winnowing
+    'UMBRAL_IDENTICO': 0.95,        # Jaccard desde el que el par se considera idéntico
+    'UMBRAL_SIN_RELACION': 0.05,    # Contención hasta la que el par se considera sin relación
+    'OMITIR_IA': True,              # No consultar a la IA cuando el resultado local es claro
+}
+
+# Motor de comparación grupal
+COMPARACION_GRUPAL = {
+    'UMBRAL_CANDIDATO': 0.30,       # Similitud local mínima para enviar un par a la IA
+    'CONCURRENCIA_IA': 8,           # Llamadas simultáneas al proveedor por comparación
+}
+
+# Respaldo entre modelos (modelos_ia.id_modelo_respaldo) y cobertura por latencia (modelos_ia.cobertura_activa)
+RESPALDO_IA = {
+    'TIMEOUT_CON_RESPALDO': 20,     # Timeout de conexión y primer byte en streaming cuando hay respaldo (sin streaming o sin respaldo: 60s)
+    'MAX_RESPALDOS': 2,             # Largo máximo de la cadena de respaldos
+    'DEMORA_COBERTURA': 8.0,        # Espera antes de lanzar la cobertura mientras no hay muestras suficientes
+    'DEMORA_COBERTURA_MINIMA': 1.0, # La cobertura nunca se lanza antes de esto, aunque el p95 sea menor
+    'MIN_MUESTRAS': 20,             # Latencias necesarias para usar el p95 del modelo
+    'MUESTRAS_LATENCIA': 200,       # Latencias recientes guardadas por modelo y proceso
+    'HILOS_COBERTURA': 16,          # Hilos compartidos por proceso para las llamadas con cobertura
+}
+
+# Comparación de un par con varios modelos a la vez (segunda opinión)
+COMPARACION_MULTIMODELO = {
+    'MAX_MODELOS': 8,               # Modelos máximos por petición (una llamada simultánea por modelo)
+}
+
+# Análisis Big O en paralelo (pool de procesos)
+ANALISIS_BIG_O = {
+    'PROCESOS': None,               # Procesos del pool; None usa todos los núcleos
+    'MIN_CARACTERES_PARALELO': 16384,  # Por debajo de este total se analiza en el mismo proceso
+    'MAX_LOTE': 500,                # Comparaciones máximas por petición al endpoint de lote
+    'CONTEXTO': 'spawn',            # Método de arranque de los procesos (spawn evita heredar conexiones a BD)
+    'TAMANO_CACHE_LOCAL': 2048,     # Análisis guardados en memoria por proceso (LRU)
+    'CACHE_COMPARTIDA': None,       # Alias de CACHES compartido entre procesos (p. ej. FileBasedCache o DatabaseCache)
+}
+
+# Cliente HTTP compartido para las llamadas a los proveedores de IA
+PROVEEDORES_IA_HTTP = {
+    'CONEXIONES_POR_HOST': 10,      # Conexiones keep-alive por endpoint y proceso
+    'CONEXIONES_ASYNC': 500,        # Conexiones simultáneas del cliente asíncrono (vistas ASGI)
+    'REINTENTOS': 3,                # Reintentos ante errores de conexión y 5xx
+    'FACTOR_ESPERA': 0.5,           # Espera exponencial: 0.5s, 1s, 2s...
+    'ESPERA_MAXIMA_REINTENTO': 5,   # Tope en segundos del Retry-After que se respeta entre reintentos
+    'STATUS_REINTENTABLES': [500, 502, 503, 504],  # Sin 429: lo manejan el limitador, el respaldo y la cola
+}
+
+# Limitador de llamadas a los proveedores de IA. Los límites de cada modelo (peticiones y tokens
+# por minuto, llamadas simultáneas) se configuran en las tablas configuracion_*; sin límites no se consulta la BD
+LIMITES_PROVEEDORES_IA = {
+    'ESPERA_MAXIMA': 10,            # Segundos que una petición espera cupo antes de responder 429
+    'INTERVALO_ESPERA': 0.25,       # Espera entre consultas cuando se alcanzó el máximo de llamadas simultáneas
+    'MARGEN_VENCIMIENTO': 30,       # Segundos extra (sobre el timeout) antes de descartar una llamada en curso huérfana
+}
+
+# Compactación de los códigos antes de armar el prompt (menos tokens por llamada)
+COMPACTACION_PROMPT = {
+    'ACTIVA': True,
+    'QUITAR_COMENTARIOS': True,     # Los comentarios no cambian la lógica que compara la IA
+    'MAX_LITERAL': 200,             # Caracteres de una cadena a partir de los cuales se acorta
+    'MAX_ELEMENTOS_LITERALES': 20,  # Listas de literales más largas se dejan con sus primeros elementos
+    'PRESUPUESTO_TOKENS_CODIGO': 6000,  # Tokens máximos por código; por encima se resume el medio
+    'CARACTERES_POR_TOKEN': {       # Proporción aproximada por proveedor para estimar tokens
+        'Claude': 3.5,
+        'OpenAI': 4.0,
+        'DeepSeek': 4.0,
+        'Gemini': 4.0,
+    },
+}
+
+# Paginación por cursor de los listados (?limit=, ?cursor=, ?fields=)
+PAGINACION = {
+    'LIMITE_POR_DEFECTO': 50,       # Filas por página cuando no se envía limit
+    'LIMITE_MAXIMO': 200,           # Un limit mayor se recorta a este valor
+}
+
+# Imágenes de los modelos de IA (se sirven en usuarios/imagen_modelo/<id>/ con ETag y Last-Modified)
+IMAGENES_MODELOS = {
+    'TAMANO_MAXIMO': 2 * 1024 * 1024,   # Bytes máximos de la imagen subida
+    'MINIATURAS': True,             # Generar la miniatura al subir (requiere Pillow; sin él se sirve la original)
+    'LADO_MINIATURA': 128,          # Lado máximo en píxeles de la miniatura
+    'MAX_AGE_VERSIONADA': 60 * 60 * 24 * 365,  # Cache-Control de la URL con ?v=<huella> (immutable)
+    'MAX_AGE': 300,                 # Cache-Control de la URL sin versión
+}
+
+# Tokens JWT (usuarios.autenticacion)
+AUTENTICACION = {
+    'ALIAS_CACHE': 'autenticacion',  # Alias de CACHES para el estado de usuarios y la revocación
+    'TTL_USUARIO': 60,              # Segundos que se reutiliza el activo/rol de un usuario sin consultar la BD
+    'DURACION_TOKEN_HORAS': 24,     # Vigencia de los tokens emitidos en el login
+    'PERMITIR_CACHE_LOCAL': False,  # True solo con un único proceso (desarrollo): la revocación no se comparte
+}
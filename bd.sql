@@ -34,6 +34,9 @@ CREATE TABLE usuarios (
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- El estado de los usuarios y los tokens revocados se guardan en la caché 'autenticacion'
+-- (DatabaseCache, tabla cache_autenticacion): crearla con `python manage.py createcachetable`
+
 -- ============================================
 -- TABLAS DE PROVEEDORES Y MODELOS DE IA
 -- ============================================
@@ -60,9 +63,32 @@ CREATE TABLE modelos_ia (
     imagen_ia BYTEA,
     activo BOOLEAN DEFAULT true,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    recomendado BOOLEAN DEFAULT false
+    recomendado BOOLEAN DEFAULT false,
+    -- Respaldo: modelo al que se pasa si este no responde (timeout, 429 o 5xx); puede encadenarse
+    id_modelo_respaldo INTEGER REFERENCES modelos_ia(id_modelo_ia) ON DELETE SET NULL,
+    -- Cobertura: si este tarda más que su p95 también se consulta el respaldo y gana el primero
+    cobertura_activa BOOLEAN DEFAULT false,
+    -- Huella SHA-256 de imagen_ia: ETag y versión de la URL de la imagen
+    imagen_hash VARCHAR(64),
+    -- PNG reducido generado al subir la imagen (NULL si no hace falta o no está Pillow)
+    imagen_miniatura BYTEA,
+    fecha_imagen TIMESTAMP
 );
 
+-- Listado de modelos activos de un usuario, del más nuevo al más viejo (cursor: fecha_creacion, id)
+CREATE INDEX idx_modelos_ia_usuario_activos_cursor
+    ON modelos_ia (id_usuario, fecha_creacion DESC, id_modelo_ia DESC) WHERE activo;
+
+-- Migración en bases existentes:
+--   ALTER TABLE modelos_ia
+--       ADD COLUMN id_modelo_respaldo INTEGER REFERENCES modelos_ia(id_modelo_ia) ON DELETE SET NULL,
+--       ADD COLUMN cobertura_activa BOOLEAN DEFAULT false;
+--   ALTER TABLE modelos_ia
+--       ADD COLUMN imagen_hash VARCHAR(64),
+--       ADD COLUMN imagen_miniatura BYTEA,
+--       ADD COLUMN fecha_imagen TIMESTAMP;
+--   Después, para las imágenes ya cargadas: python manage.py procesar_imagenes_modelos
+
 CREATE TABLE prompt_comparacion (
     id_prompt SERIAL PRIMARY KEY,
     template_prompt TEXT NOT NULL,
@@ -83,6 +109,10 @@ CREATE TABLE configuracion_claude (
     model_name VARCHAR(100) NOT NULL,
     max_tokens INTEGER DEFAULT 4000,
     anthropic_version VARCHAR(20) DEFAULT '2023-06-01',
+    -- Límites de uso del modelo (NULL = sin límite); se comparten entre todos los procesos
+    limite_peticiones_minuto INTEGER CHECK (limite_peticiones_minuto > 0),
+    limite_tokens_minuto INTEGER CHECK (limite_tokens_minuto > 0),
+    max_llamadas_simultaneas INTEGER CHECK (max_llamadas_simultaneas > 0),
     activo BOOLEAN DEFAULT true,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_modificacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -98,6 +128,10 @@ CREATE TABLE configuracion_openai (
     model_name VARCHAR(100) NOT NULL,
     max_tokens INTEGER DEFAULT 4000,
     temperature DECIMAL(3,2) DEFAULT 0.7,
+    -- Límites de uso del modelo (NULL = sin límite); se comparten entre todos los procesos
+    limite_peticiones_minuto INTEGER CHECK (limite_peticiones_minuto > 0),
+    limite_tokens_minuto INTEGER CHECK (limite_tokens_minuto > 0),
+    max_llamadas_simultaneas INTEGER CHECK (max_llamadas_simultaneas > 0),
     activo BOOLEAN DEFAULT true,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_modificacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -113,6 +147,10 @@ CREATE TABLE configuracion_gemini (
     model_name VARCHAR(100) NOT NULL,
     max_tokens INTEGER DEFAULT 4000,
     temperature DECIMAL(3,2) DEFAULT 0.7,
+    -- Límites de uso del modelo (NULL = sin límite); se comparten entre todos los procesos
+    limite_peticiones_minuto INTEGER CHECK (limite_peticiones_minuto > 0),
+    limite_tokens_minuto INTEGER CHECK (limite_tokens_minuto > 0),
+    max_llamadas_simultaneas INTEGER CHECK (max_llamadas_simultaneas > 0),
     activo BOOLEAN DEFAULT true,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_modificacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -128,6 +166,10 @@ CREATE TABLE configuracion_deepseek (
     model_name VARCHAR(100) NOT NULL,
     max_tokens INTEGER DEFAULT 4000,
     temperature DECIMAL(3,2) DEFAULT 0.7,
+    -- Límites de uso del modelo (NULL = sin límite); se comparten entre todos los procesos
+    limite_peticiones_minuto INTEGER CHECK (limite_peticiones_minuto > 0),
+    limite_tokens_minuto INTEGER CHECK (limite_tokens_minuto > 0),
+    max_llamadas_simultaneas INTEGER CHECK (max_llamadas_simultaneas > 0),
     activo BOOLEAN DEFAULT true,
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     fecha_modificacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -151,6 +193,9 @@ CREATE TABLE comentarios_eficiencia_individual (
     fecha_generacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_comentarios_eficiencia_individual_resultado
+    ON comentarios_eficiencia_individual (id_resultado_eficiencia_individual);
+
 -- ============================================
 -- TABLAS DE LENGUAJES Y COMPARACIONES
 -- ============================================
@@ -176,6 +221,15 @@ CREATE TABLE comparaciones_individuales (
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Listado de comparaciones del usuario resuelto solo con el índice (INCLUDE trae las columnas que muestra);
+-- el id desempata las filas con la misma fecha en la paginación por cursor
+CREATE INDEX idx_comparaciones_individuales_usuario_cursor
+    ON comparaciones_individuales (id_usuario, fecha_creacion DESC, id DESC) INCLUDE (nombre_comparacion, estado);
+
+-- Listado de todas las comparaciones (administrador)
+CREATE INDEX idx_comparaciones_individuales_cursor
+    ON comparaciones_individuales (fecha_creacion DESC, id DESC);
+
 CREATE TABLE comparaciones_grupales (
     id_comparacion_grupal SERIAL PRIMARY KEY,
     id_usuario INTEGER NOT NULL REFERENCES usuarios(id),
@@ -191,6 +245,9 @@ CREATE TABLE comparaciones_grupales (
     )
 );
 
+CREATE INDEX idx_comparaciones_grupales_usuario_cursor
+    ON comparaciones_grupales (id_usuario, fecha_creacion DESC, id_comparacion_grupal DESC) INCLUDE (nombre_comparacion, estado);
+
 -- Tabla de códigos fuente para comparaciones grupales
 CREATE TABLE codigos_fuente (
     id_codigo_fuente SERIAL PRIMARY KEY,
@@ -200,6 +257,9 @@ CREATE TABLE codigos_fuente (
     orden INTEGER
 );
 
+CREATE INDEX idx_codigos_fuente_comparacion_orden
+    ON codigos_fuente (id_comparacion_grupal, orden);
+
 -- ============================================
 -- TABLAS DE RESULTADOS
 -- ============================================
@@ -208,10 +268,19 @@ CREATE TABLE codigos_fuente (
 CREATE TABLE resultados_similitud_individual (
     id_resultado_similitud_individual SERIAL PRIMARY KEY,
     id_comparacion_individual INTEGER NOT NULL REFERENCES comparaciones_individuales(id),
+    -- Modelo que dio el resultado (NULL: similitud local, sin consultar a la IA)
+    id_modelo_ia INTEGER REFERENCES modelos_ia(id_modelo_ia) ON DELETE SET NULL,
     porcentaje_similitud INT NOT NULL,
     explicacion TEXT
 );
 
+CREATE INDEX idx_resultados_similitud_individual_comparacion
+    ON resultados_similitud_individual (id_comparacion_individual, id_modelo_ia);
+
+-- Migración en bases existentes:
+--   ALTER TABLE resultados_similitud_individual
+--       ADD COLUMN id_modelo_ia INTEGER REFERENCES modelos_ia(id_modelo_ia) ON DELETE SET NULL;
+
 -- Tabla de resultados de similitud para comparaciones grupales
 CREATE TABLE resultados_similitud_grupal (
     id_resultado_similitud_grupal SERIAL PRIMARY KEY,
@@ -222,6 +291,9 @@ CREATE TABLE resultados_similitud_grupal (
     explicacion TEXT
 );
 
+CREATE INDEX idx_resultados_similitud_grupal_comparacion
+    ON resultados_similitud_grupal (id_comparacion_grupal, porcentaje_similitud DESC);
+
 CREATE TABLE resultados_eficiencia_individual (
     id_resultado_eficiencia_individual SERIAL PRIMARY KEY,
     id_comparacion_individual INTEGER NOT NULL REFERENCES comparaciones_individuales(id),
@@ -240,9 +312,39 @@ CREATE TABLE resultados_eficiencia_individual (
     ganador VARCHAR(20) CHECK (ganador IN ('codigo_1', 'codigo_2', 'empate')),
     lenguaje VARCHAR(50),
     lenguaje_analizado VARCHAR(50),
+    version_analizador INTEGER NOT NULL DEFAULT 1,
     fecha_analisis TIMESTAMP
 );
 
+-- Una fila vigente por comparación y versión del analizador (destino del ON CONFLICT)
+CREATE UNIQUE INDEX uq_resultados_eficiencia_individual_version
+    ON resultados_eficiencia_individual (id_comparacion_individual, version_analizador);
+
+-- Historial compacto: una fila por ejecución del análisis, solo con lo necesario para ver la evolución
+CREATE TABLE historial_eficiencia_individual (
+    id_historial_eficiencia SERIAL PRIMARY KEY,
+    id_comparacion_individual INTEGER NOT NULL REFERENCES comparaciones_individuales(id) ON DELETE CASCADE,
+    version_analizador INTEGER NOT NULL,
+    codigo_1_complejidad_temporal VARCHAR(50) NOT NULL,
+    codigo_2_complejidad_temporal VARCHAR(50) NOT NULL,
+    ganador VARCHAR(20),
+    fecha_analisis TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_historial_eficiencia_individual_comparacion
+    ON historial_eficiencia_individual (id_comparacion_individual, fecha_analisis);
+
+-- Migración en bases existentes: conservar solo el último resultado de cada comparación
+-- (y los comentarios que apuntan a él) antes de crear el índice único:
+--   ALTER TABLE resultados_eficiencia_individual ADD COLUMN version_analizador INTEGER NOT NULL DEFAULT 1;
+--   DELETE FROM resultados_eficiencia_individual r
+--    WHERE EXISTS (SELECT 1 FROM resultados_eficiencia_individual m
+--                   WHERE m.id_comparacion_individual = r.id_comparacion_individual
+--                     AND m.id_resultado_eficiencia_individual > r.id_resultado_eficiencia_individual);
+--   CREATE UNIQUE INDEX CONCURRENTLY uq_resultados_eficiencia_individual_version
+--       ON resultados_eficiencia_individual (id_comparacion_individual, version_analizador);
+--   (`python manage.py migrate usuarios` lo hace en 0005_unico_resultados_eficiencia_individual)
+
 -- Tabla de resultados de eficiencia para comparaciones grupales
 CREATE TABLE resultados_eficiencia_grupal (
     id_resultado_eficiencia_grupal SERIAL PRIMARY KEY,
@@ -254,6 +356,85 @@ CREATE TABLE resultados_eficiencia_grupal (
     es_mas_eficiente BOOLEAN
 );
 
+CREATE INDEX idx_resultados_eficiencia_grupal_comparacion
+    ON resultados_eficiencia_grupal (id_comparacion_grupal, puntuacion_eficiencia DESC);
+
+-- Migración en bases existentes: los índices idx_* de modelos_ia, comentarios, comparaciones, códigos
+-- fuente y resultados grupales los crea `python manage.py migrate usuarios` (0002_indices_consultas)
+-- con CREATE INDEX CONCURRENTLY, sin bloquear las escrituras. Para revisar los planes:
+--   python manage.py verificar_indices --filas 1000000
+-- La 0003_indices_paginacion cambia los índices *_usuario_fecha y idx_modelos_ia_usuario_activos
+-- por los *_cursor de arriba (crea los nuevos antes de borrar los viejos) y la
+-- 0004_indice_resultados_similitud_individual crea idx_resultados_similitud_individual_comparacion.
+-- La 0005_unico_resultados_eficiencia_individual crea uq_resultados_eficiencia_individual_version.
+
+-- ============================================
+-- COLA DE TRABAJOS DE IA
+-- ============================================
+
+-- Trabajos de comparación con IA procesados por los trabajadores en segundo plano
+CREATE TABLE trabajos_comparacion_ia (
+    id_trabajo SERIAL PRIMARY KEY,
+    tipo VARCHAR(20) NOT NULL DEFAULT 'individual' CHECK (tipo IN ('individual', 'grupal')),
+    id_comparacion_individual INTEGER REFERENCES comparaciones_individuales(id) ON DELETE CASCADE,
+    id_comparacion_grupal INTEGER REFERENCES comparaciones_grupales(id_comparacion_grupal) ON DELETE CASCADE,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente' CHECK (estado IN ('pendiente', 'en_proceso', 'completado', 'fallido')),
+    intentos INTEGER NOT NULL DEFAULT 0,
+    esperas_limite INTEGER NOT NULL DEFAULT 0,
+    disponible_desde TIMESTAMP,
+    resultado JSONB,
+    error TEXT,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_inicio TIMESTAMP,
+    fecha_fin TIMESTAMP,
+
+    CONSTRAINT check_trabajo_comparacion CHECK (
+        (tipo = 'individual' AND id_comparacion_individual IS NOT NULL) OR
+        (tipo = 'grupal' AND id_comparacion_grupal IS NOT NULL)
+    )
+);
+
+-- Los trabajadores solo buscan trabajos pendientes en orden de llegada
+CREATE INDEX idx_trabajos_comparacion_ia_pendientes
+    ON trabajos_comparacion_ia (id_trabajo) WHERE estado = 'pendiente';
+
+CREATE INDEX idx_trabajos_comparacion_ia_comparacion
+    ON trabajos_comparacion_ia (id_comparacion_individual, estado);
+
+CREATE INDEX idx_trabajos_comparacion_ia_grupal
+    ON trabajos_comparacion_ia (id_comparacion_grupal, estado);
+
+-- Migración en bases existentes:
+--   ALTER TABLE trabajos_comparacion_ia ADD COLUMN esperas_limite INTEGER NOT NULL DEFAULT 0,
+--       ADD COLUMN disponible_desde TIMESTAMP;
+
+-- ============================================
+-- LÍMITES DE USO DE LOS PROVEEDORES DE IA
+-- ============================================
+
+-- Baldes de tokens por modelo y API key (una fila por clave, bloqueada con FOR UPDATE al reservar)
+CREATE TABLE cupos_proveedor_ia (
+    clave VARCHAR(150) PRIMARY KEY,
+    peticiones_disponibles DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tokens_disponibles DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Llamadas en curso; las que vencen (proceso caído) dejan de contar para el máximo simultáneo
+CREATE TABLE llamadas_en_curso_ia (
+    id_llamada SERIAL PRIMARY KEY,
+    clave VARCHAR(150) NOT NULL,
+    fecha_vencimiento TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_llamadas_en_curso_ia_clave
+    ON llamadas_en_curso_ia (clave, fecha_vencimiento);
+
+-- Migración en bases existentes:
+--   ALTER TABLE configuracion_claude ADD COLUMN limite_peticiones_minuto INTEGER,
+--       ADD COLUMN limite_tokens_minuto INTEGER, ADD COLUMN max_llamadas_simultaneas INTEGER;
+--   (lo mismo para configuracion_openai, configuracion_gemini y configuracion_deepseek)
+
 -- Insertar algunos roles básicos
 INSERT INTO roles (nombre, descripcion) VALUES 
 ('admin', 'Administrador del sistema'),
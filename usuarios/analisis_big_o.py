@@ -0,0 +1,1039 @@
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Versión de las heurísticas: subirla al cambiar cualquier resultado invalida los análisis guardados
+VERSION_ANALIZADOR = 1
+
+
+# Mapeo de lenguajes soportados
+LENGUAJES_SOPORTADOS = {
+    'python': {'nombre': 'Python', 'extensiones': ['.py']},
+    'javascript': {'nombre': 'JavaScript', 'extensiones': ['.js']},
+    'java': {'nombre': 'Java', 'extensiones': ['.java']},
+    'c': {'nombre': 'C', 'extensiones': ['.c', '.h']},
+    'cpp': {'nombre': 'C++', 'extensiones': ['.cpp', '.cc', '.cxx', '.hpp']},
+    'c++': {'nombre': 'C++', 'extensiones': ['.cpp', '.cc', '.cxx', '.hpp']},
+    'csharp': {'nombre': 'C#', 'extensiones': ['.cs']},
+    'c#': {'nombre': 'C#', 'extensiones': ['.cs']},
+    'php': {'nombre': 'PHP', 'extensiones': ['.php']},
+    'ruby': {'nombre': 'Ruby', 'extensiones': ['.rb']},
+    'go': {'nombre': 'Go', 'extensiones': ['.go']},
+    'rust': {'nombre': 'Rust', 'extensiones': ['.rs']},
+    'swift': {'nombre': 'Swift', 'extensiones': ['.swift']},
+    'kotlin': {'nombre': 'Kotlin', 'extensiones': ['.kt']},
+    'typescript': {'nombre': 'TypeScript', 'extensiones': ['.ts']},
+}
+
+
+def detectar_lenguaje_por_extension(extension: str) -> str:
+    """Detecta el lenguaje por su extensión"""
+    if not extension:
+        return None
+    
+    extension = extension.lower()
+    if not extension.startswith('.'):
+        extension = f'.{extension}'
+    
+    for lenguaje, info in LENGUAJES_SOPORTADOS.items():
+        if extension in info['extensiones']:
+            return lenguaje
+    
+    return None
+
+
+def resolver_lenguaje(nombre: str, extension: str) -> str:
+    """Clave de LENGUAJES_SOPORTADOS por nombre del lenguaje o, si no, por su extensión"""
+    nombre = (nombre or '').lower()
+    if nombre in LENGUAJES_SOPORTADOS:
+        return nombre
+    return detectar_lenguaje_por_extension(extension)
+
+
+# ============================================
+# PATRONES PRECOMPILADOS
+# ============================================
+
+PATRON_LOOP_INDENTADO = re.compile(r'^\s*(for\s+.*:|while\s+.*:)')
+PATRON_LOOP_LLAVES = re.compile(r'^\s*(for\s*\(|while\s*\()')
+
+PATRONES_LOOP = {
+    'python': PATRON_LOOP_INDENTADO,
+    'javascript': PATRON_LOOP_LLAVES,
+    'typescript': PATRON_LOOP_LLAVES,
+    'java': PATRON_LOOP_LLAVES,
+    'c': PATRON_LOOP_LLAVES,
+    'cpp': PATRON_LOOP_LLAVES,
+    'c++': PATRON_LOOP_LLAVES,
+}
+
+# Definiciones de función por familia de lenguaje (el grupo 1 es el nombre)
+PATRON_DEF_INDENTADA = re.compile(r'^\s*(?:async\s+)?def\s+(?:self\.)?(\w+)')
+PATRON_DEF_PALABRA = re.compile(r'\b(?:function|func|fun|fn)\s+(?:\([^)]*\)\s*)?(\w+)\s*[(<]')
+PATRON_DEF_ASIGNADA = re.compile(
+    r'\b(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)'
+)
+PATRON_DEF_TIPADA = re.compile(
+    r'^\s*(?:[\w$<>\[\],.*&:~?]+\s+)*?(\w+)\s*\([^;]*\)\s*(?:const\s*)?(?:throws\s+[\w.,\s]+?)?\s*(?:\{|$)'
+)
+
+PATRONES_DEFINICION = {
+    'python': (PATRON_DEF_INDENTADA,),
+    'ruby': (PATRON_DEF_INDENTADA,),
+    'javascript': (PATRON_DEF_PALABRA, PATRON_DEF_ASIGNADA, PATRON_DEF_TIPADA),
+    'typescript': (PATRON_DEF_PALABRA, PATRON_DEF_ASIGNADA, PATRON_DEF_TIPADA),
+    'php': (PATRON_DEF_PALABRA,),
+    'go': (PATRON_DEF_PALABRA,),
+    'kotlin': (PATRON_DEF_PALABRA,),
+    'swift': (PATRON_DEF_PALABRA,),
+    'rust': (PATRON_DEF_PALABRA,),
+    'java': (PATRON_DEF_TIPADA,),
+    'c': (PATRON_DEF_TIPADA,),
+    'cpp': (PATRON_DEF_TIPADA,),
+    'c++': (PATRON_DEF_TIPADA,),
+    'csharp': (PATRON_DEF_TIPADA,),
+    'c#': (PATRON_DEF_TIPADA,),
+}
+PATRONES_DEFINICION_GENERICOS = (PATRON_DEF_INDENTADA, PATRON_DEF_PALABRA, PATRON_DEF_TIPADA)
+
+# Lenguajes cuyo cuerpo de función se delimita por indentación y no por llaves
+LENGUAJES_INDENTADOS = {'python', 'ruby'}
+LENGUAJES_COMENTARIO_NUMERAL = {'python', 'ruby', 'php'}
+
+# Palabras que van seguidas de '(' sin ser una definición ni una llamada
+PALABRAS_CONTROL = frozenset({
+    'if', 'elif', 'else', 'for', 'foreach', 'while', 'do', 'switch', 'case', 'catch', 'return',
+    'new', 'sizeof', 'typeof', 'synchronized', 'using', 'lock', 'with', 'match', 'print',
+    'def', 'function', 'func', 'fun', 'fn', 'and', 'or', 'not', 'in', 'assert', 'yield', 'await',
+})
+
+PATRON_CADENAS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+PATRON_INICIO_DEF = re.compile(r'^\s*def\s+(\w+)\s*\(')
+PATRON_LLAMADA = re.compile(r'\b(\w+)\s*\(')
+PATRON_INICIO_LOOP = re.compile(r'^\s*(for|while)\s+')
+PATRON_DIVISION_MITAD = re.compile(r'//=\s*2|/=\s*2|(mid|mitad)\s*=.*//\s*2')
+
+PATRON_LISTA_CON_DATOS = re.compile(r'=\s*\[.+\]')
+PATRON_LISTA_CORTA = re.compile(r'=\s*\[[^\]]{0,5}\]')
+PATRON_LISTA_VACIA = re.compile(r'(\w+)\s*=\s*\[\s*\]')
+PATRON_APPEND = re.compile(r'(\w+)\.append\(')
+
+PATRON_RECURSION_MULTIPLE = re.compile(r'\w+\([^)]*-\s*\d+\)')
+PATRON_MITAD = re.compile(r'/\s*2')
+
+PATRONES_MATRIZ = {
+    'python': re.compile(r'\[\s*\[\s*\]|\[\s*\]\s*\*\s*\d+'),
+    'javascript': re.compile(r'new\s+Array\(.*\)\.fill\(\[|\.map\(\s*\(\)\s*=>\s*\['),
+    'java': re.compile(r'new\s+\w+\[.*\]\[.*\]'),
+    'c': re.compile(r'\w+\s+\w+\[.*\]\[.*\]'),
+    'cpp': re.compile(r'vector<\s*vector<|new\s+\w+\[.*\]\[.*\]'),
+    'c++': re.compile(r'vector<\s*vector<|new\s+\w+\[.*\]\[.*\]'),
+}
+PATRON_MATRIZ_GENERICO = re.compile(r'\[\s*\[\s*\]')
+
+# Las palabras clave se buscan como subcadenas del código en minúsculas (equivale a
+# re.IGNORECASE y evita recorrer el archivo con una expresión por cada patrón)
+PATRON_HASH = re.compile(r'(dict|map|hash|set)\s*[\(\{<]', re.IGNORECASE)
+PATRON_LLAVES_DOS_PUNTOS = re.compile(r'\{.*:.*\}')
+
+# (nombre, complejidad, subcadenas, expresión que confirma) ; None en subcadenas = por anidamiento
+PATRONES_ALGORITMICOS = [
+    ('Búsqueda Binaria', 'O(log n)', ('binary', 'binaria', 'mid', 'mitad'), None),
+    ('Ordenamiento', 'O(n log n)', ('sort', 'ordenar'), None),
+    ('Fuerza Bruta', 'O(n^2) o superior', None, None),
+    ('Hash Table', 'O(1) búsquedas', ('dict', 'map', 'hash', 'set'), PATRON_HASH),
+    ('Fibonacci', 'O(2^n) o O(n) con memo', ('fib',), None),
+    ('Programación Dinámica', 'Variable', ('dynamic', 'dinamica', 'memo', 'dp['), None),
+]
+
+# estructura: (subcadenas, expresión alternativa)
+PATRONES_ESTRUCTURAS = {
+    'Array/Lista': (('[', 'list(', 'array', 'vector<'), None),
+    'Diccionario/Map': (('dict(', 'map'), PATRON_LLAVES_DOS_PUNTOS),
+    'Set': (('set',), None),
+    'Queue': (('queue', 'deque'), None),
+    'Stack': (('stack',), None),
+    'Heap': (('heap', 'priorityqueue'), None),
+    'Árbol': (('tree', 'node'), None),
+    'Grafo': (('graph', 'grafo', 'adjacency'), None),
+}
+
+
+def contiene_alguna(texto: str, subcadenas) -> bool:
+    return any(subcadena in texto for subcadena in subcadenas)
+
+
+class LineaEscaneada(NamedTuple):
+    """Todo lo que el análisis necesita saber de una línea, calculado una sola vez"""
+    espacios: int
+    ignorable: bool             # vacía o comentario con '#'
+    es_loop: bool
+    cierra_llave: bool
+    definicion: Optional[str]   # nombre de la función que se define en la línea
+    llamadas: tuple             # nombres llamados (sin contar la propia definición)
+    llaves: int                 # llaves abiertas menos cerradas, fuera de cadenas y comentarios
+    inicia_loop: bool
+    divide_a_la_mitad: bool
+    inicio_def: Optional[str]   # nombre de la función si la línea abre un def de Python
+    lista_vacia: Optional[str]  # nombre de la lista si la línea crea una lista vacía
+    lista_con_datos: bool
+
+
+def escanear_lineas(lineas: List[str], lenguaje: str) -> List[LineaEscaneada]:
+    """Única pasada sobre el código: loops, definiciones, llamadas, divisiones y listas por línea"""
+    patron_loop = PATRONES_LOOP.get(lenguaje, PATRON_LOOP_INDENTADO)
+    patrones_definicion = PATRONES_DEFINICION.get(lenguaje, PATRONES_DEFINICION_GENERICOS)
+    marca_comentario = '#' if lenguaje in LENGUAJES_COMENTARIO_NUMERAL else '//'
+    es_python = lenguaje == 'python'
+    escaneo = []
+
+    for linea in lineas:
+        sin_espacios = linea.strip()
+        tiene_parentesis = '(' in linea
+        tiene_loop = 'for' in linea or 'while' in linea
+
+        # Para el grafo de llamadas no cuentan las cadenas ni los comentarios
+        limpia = linea
+        if '"' in limpia or "'" in limpia:
+            limpia = PATRON_CADENAS.sub('""', limpia)
+        if marca_comentario in limpia:
+            limpia = limpia.split(marca_comentario, 1)[0]
+
+        definicion = None
+        llamadas = ()
+        if '(' in limpia or '=>' in limpia or 'def ' in limpia:
+            resto = limpia
+            for patron in patrones_definicion:
+                match_definicion = patron.search(limpia)
+                if match_definicion and match_definicion.group(1) not in PALABRAS_CONTROL:
+                    definicion = match_definicion.group(1)
+                    # Lo que sigue a la firma (cuerpo en una línea) sí puede tener llamadas
+                    resto = limpia[match_definicion.end():]
+                    break
+
+            if '(' in resto:
+                llamadas = tuple(
+                    nombre for nombre in PATRON_LLAMADA.findall(resto)
+                    if nombre not in PALABRAS_CONTROL
+                )
+
+        inicio_def = None
+        lista_vacia = None
+        lista_con_datos = False
+        if es_python:
+            if tiene_parentesis and 'def' in linea:
+                match_def = PATRON_INICIO_DEF.match(linea)
+                inicio_def = match_def.group(1) if match_def else None
+
+            if '[' in linea:
+                lista_con_datos = bool(PATRON_LISTA_CON_DATOS.search(linea)) and not PATRON_LISTA_CORTA.search(linea)
+                if not lista_con_datos:
+                    match_lista = PATRON_LISTA_VACIA.search(linea)
+                    lista_vacia = match_lista.group(1) if match_lista else None
+
+        escaneo.append(LineaEscaneada(
+            espacios=len(linea) - len(linea.lstrip()),
+            ignorable=not sin_espacios or sin_espacios.startswith('#'),
+            es_loop=tiene_loop and patron_loop.match(linea) is not None,
+            cierra_llave='}' in linea,
+            definicion=definicion,
+            llamadas=llamadas,
+            llaves=limpia.count('{') - limpia.count('}'),
+            inicia_loop=tiene_loop and PATRON_INICIO_LOOP.match(linea) is not None,
+            divide_a_la_mitad='/' in linea and PATRON_DIVISION_MITAD.search(linea) is not None,
+            inicio_def=inicio_def,
+            lista_vacia=lista_vacia,
+            lista_con_datos=lista_con_datos,
+        ))
+
+    return escaneo
+
+
+def construir_grafo_llamadas(escaneo: List[LineaEscaneada], lenguaje: str) -> Dict:
+    """Grafo función -> funciones llamadas, con las funciones recursivas (directas o mutuas)"""
+    llamadas_por_funcion = {}
+    por_indentacion = lenguaje in LENGUAJES_INDENTADOS
+    # Pila de funciones abiertas: (nombre, indentación o profundidad de llaves al abrirse)
+    abiertas = []
+    profundidad = 0
+    pendiente = None  # firma cuya llave '{' viene en la línea siguiente
+
+    for info in escaneo:
+        if info.ignorable and info.definicion is None:
+            continue
+
+        # 1. Cerrar las funciones que terminan antes de esta línea
+        if por_indentacion:
+            while abiertas and info.espacios <= abiertas[-1][1]:
+                abiertas.pop()
+        elif pendiente is not None:
+            if info.llaves > 0 and info.definicion is None and profundidad == pendiente[1]:
+                abiertas.append(pendiente)
+            pendiente = None
+
+        # 2. Registrar la definición y a quién pertenecen las llamadas de la línea
+        if info.definicion is not None:
+            llamadas_por_funcion.setdefault(info.definicion, set())
+            funcion = (info.definicion, info.espacios if por_indentacion else profundidad)
+            if por_indentacion or info.llaves > 0:
+                abiertas.append(funcion)
+            elif not info.cierra_llave:
+                # Sin '{' en la firma: el cuerpo puede abrirse en la línea siguiente
+                pendiente = funcion
+            actual = info.definicion
+        else:
+            actual = abiertas[-1][0] if abiertas else None
+
+        if actual is not None and info.llamadas:
+            llamadas_por_funcion.setdefault(actual, set()).update(info.llamadas)
+
+        # 3. Las llaves que se cierran terminan las funciones de lenguajes con llaves
+        if not por_indentacion:
+            profundidad = max(0, profundidad + info.llaves)
+            while abiertas and profundidad <= abiertas[-1][1]:
+                abiertas.pop()
+
+    # Solo interesan las llamadas a funciones definidas en el mismo código
+    grafo = {
+        nombre: sorted(llamadas & llamadas_por_funcion.keys())
+        for nombre, llamadas in llamadas_por_funcion.items()
+    }
+    ciclos = encontrar_ciclos(grafo)
+
+    return {
+        'funciones': grafo,
+        'ciclos': ciclos,
+        'recursivas': sorted({nombre for ciclo in ciclos for nombre in ciclo}),
+        'recursion_mutua': any(len(ciclo) > 1 for ciclo in ciclos),
+    }
+
+
+def grafo_llamadas_codigo(codigo: str, lenguaje: str) -> Dict:
+    """Grafo de llamadas de un código sin hacer el análisis Big O completo"""
+    return construir_grafo_llamadas(escanear_lineas(codigo.split('\n'), lenguaje), lenguaje)
+
+
+def encontrar_ciclos(grafo: Dict[str, List[str]]) -> List[List[str]]:
+    """Componentes fuertemente conexas con ciclo (Tarjan iterativo, tiempo lineal)"""
+    indice = {}
+    minimo = {}
+    en_pila = set()
+    pila = []
+    ciclos = []
+    contador = 0
+
+    for raiz in grafo:
+        if raiz in indice:
+            continue
+
+        recorrido = [(raiz, iter(grafo[raiz]))]
+        indice[raiz] = minimo[raiz] = contador
+        contador += 1
+        pila.append(raiz)
+        en_pila.add(raiz)
+
+        while recorrido:
+            nodo, vecinos = recorrido[-1]
+            avanzo = False
+
+            for vecino in vecinos:
+                if vecino not in indice:
+                    indice[vecino] = minimo[vecino] = contador
+                    contador += 1
+                    pila.append(vecino)
+                    en_pila.add(vecino)
+                    recorrido.append((vecino, iter(grafo[vecino])))
+                    avanzo = True
+                    break
+                if vecino in en_pila:
+                    minimo[nodo] = min(minimo[nodo], indice[vecino])
+
+            if avanzo:
+                continue
+
+            recorrido.pop()
+            if recorrido:
+                padre = recorrido[-1][0]
+                minimo[padre] = min(minimo[padre], minimo[nodo])
+
+            if minimo[nodo] == indice[nodo]:
+                componente = []
+                while True:
+                    miembro = pila.pop()
+                    en_pila.discard(miembro)
+                    componente.append(miembro)
+                    if miembro == nodo:
+                        break
+
+                if len(componente) > 1 or nodo in grafo[nodo]:
+                    ciclos.append(sorted(componente))
+
+    return ciclos
+
+
+# ============================================
+# ANÁLISIS
+# ============================================
+
+def analizar_codigo_big_o(codigo: str, lenguaje: str) -> Dict:
+    """Analiza un código y retorna su complejidad Big O"""
+    # Python se analiza sobre su árbol sintáctico; si no compila, con las heurísticas por línea
+    if lenguaje == 'python':
+        arbol = parsear_python(codigo)
+        if arbol is not None:
+            return analizar_python_ast(codigo, arbol)
+    
+    return analizar_por_lineas(codigo, lenguaje)
+
+
+def analizar_por_lineas(codigo: str, lenguaje: str) -> Dict:
+    """Análisis heurístico a partir del escaneo de líneas (todos los lenguajes)"""
+    lineas = codigo.split('\n')
+    escaneo = escanear_lineas(lineas, lenguaje)
+    grafo_llamadas = construir_grafo_llamadas(escaneo, lenguaje)
+    recursivas = set(grafo_llamadas['recursivas'])
+    
+    # Analizar cada función por separado
+    funciones = extraer_funciones(lineas, escaneo, lenguaje)
+    
+    if funciones:
+        # Si hay múltiples funciones, tomar la de mayor complejidad
+        complejidad_temporal = max(
+            [calcular_complejidad_temporal(func['codigo'], escaneo[func['inicio']:func['fin']], lenguaje,
+                                           func['nombre'] in recursivas)
+             for func in funciones],
+            key=lambda x: orden_complejidad(x)
+        )
+    else:
+        # Analizar el código completo
+        complejidad_temporal = calcular_complejidad_temporal(codigo, escaneo, lenguaje, bool(recursivas))
+    
+    nivel_anidamiento = contar_loops_anidados(escaneo, lenguaje)
+    tiene_recursion = bool(recursivas)
+    texto_minusculas = codigo.lower()
+    
+    return {
+        'complejidad_temporal': complejidad_temporal,
+        'complejidad_espacial': calcular_complejidad_espacial(codigo, escaneo, lenguaje, tiene_recursion),
+        'patrones_detectados': detectar_patrones(codigo, texto_minusculas, nivel_anidamiento, grafo_llamadas),
+        'nivel_anidamiento': nivel_anidamiento,
+        'estructuras_datos': detectar_estructuras_datos(codigo, texto_minusculas),
+        'confianza_analisis': calcular_confianza(codigo, lenguaje),
+        'grafo_llamadas': grafo_llamadas,
+        'analizador': 'lineas'
+    }
+
+
+def extraer_funciones(lineas: List[str], escaneo: List[LineaEscaneada], lenguaje: str) -> List[Dict]:
+    """Extrae funciones individuales del código para analizarlas por separado"""
+    funciones = []
+    
+    if lenguaje == 'python':
+        funcion_actual = None
+        indentacion_funcion = None
+        
+        for i, (linea, info) in enumerate(zip(lineas, escaneo)):
+            # Detectar inicio de función
+            if info.inicio_def:
+                if funcion_actual:
+                    funcion_actual['fin'] = i
+                    funciones.append(funcion_actual)
+                
+                funcion_actual = {
+                    'nombre': info.inicio_def,
+                    'lineas': [linea],
+                    'indentacion': info.espacios,
+                    'inicio': i
+                }
+                indentacion_funcion = info.espacios
+            
+            # Agregar líneas a la función actual
+            elif funcion_actual:
+                # Si la indentación vuelve al nivel de la función o menos, terminar
+                if not info.ignorable and info.espacios <= indentacion_funcion:
+                    funcion_actual['fin'] = i
+                    funciones.append(funcion_actual)
+                    funcion_actual = None
+                else:
+                    funcion_actual['lineas'].append(linea)
+        
+        # Agregar última función
+        if funcion_actual:
+            funcion_actual['fin'] = len(lineas)
+            funciones.append(funcion_actual)
+    
+    # El código de cada función se arma una sola vez (no con += línea por línea)
+    for funcion in funciones:
+        funcion['codigo'] = '\n'.join(funcion['lineas']) + '\n'
+    
+    return funciones
+
+
+def orden_complejidad(complejidad: str) -> int:
+    """Retorna el orden numérico de una complejidad"""
+    orden = {
+        'O(1)': 1,
+        'O(log n)': 2,
+        'O(n)': 3,
+        'O(n log n)': 4,
+        'O(n^2)': 5,
+        'O(n^3)': 6,
+        'O(2^n)': 7,
+        'O(n!)': 8
+    }
+    return orden.get(complejidad, 999)
+
+
+def calcular_confianza(codigo: str, lenguaje: str) -> str:
+    """Calcula qué tan confiable es el análisis"""
+    if lenguaje in ['python', 'javascript', 'java', 'c', 'cpp', 'c++']:
+        return 'Alta'
+    elif lenguaje in LENGUAJES_SOPORTADOS:
+        return 'Media'
+    else:
+        return 'Baja - Análisis genérico'
+
+
+def contar_loops_anidados(escaneo: List[LineaEscaneada], lenguaje: str) -> int:
+    """Cuenta el nivel máximo de loops anidados"""
+    max_nivel = 0
+    
+    if lenguaje == 'python':
+        stack_indentacion = []
+        
+        for info in escaneo:
+            if info.ignorable:
+                continue
+            
+            # Detectar loop
+            if info.es_loop:
+                stack_indentacion.append(info.espacios)
+                max_nivel = max(max_nivel, len(stack_indentacion))
+            else:
+                # Salir de loops cuando la indentación disminuye
+                while stack_indentacion and info.espacios <= stack_indentacion[-1]:
+                    stack_indentacion.pop()
+    else:
+        nivel_actual = 0
+        for info in escaneo:
+            if info.es_loop:
+                nivel_actual += 1
+                max_nivel = max(max_nivel, nivel_actual)
+            
+            if info.cierra_llave:
+                nivel_actual = max(0, nivel_actual - 1)
+    
+    return max_nivel
+
+
+def calcular_complejidad_temporal(codigo: str, escaneo: List[LineaEscaneada], lenguaje: str,
+                                  tiene_recursion: bool) -> str:
+    """Calcula Big O temporal"""
+    loops = contar_loops_anidados(escaneo, lenguaje)
+    
+    if tiene_recursion:
+        if es_recursion_multiple(codigo):
+            return "O(2^n)"
+        elif es_recursion_dividir_conquistar(codigo):
+            return "O(n log n)"
+        else:
+            return "O(n)"
+    
+    elif loops >= 3:
+        return "O(n^3)"
+    elif loops == 2:
+        return "O(n^2)"
+    elif loops == 1:
+        if detectar_division_iterativa_en_loop(escaneo):
+            return "O(n log n)"
+        return "O(n)"
+    else:
+        return "O(1)"
+
+
+def detectar_division_iterativa_en_loop(escaneo: List[LineaEscaneada]) -> bool:
+    """Detecta si hay división iterativa DENTRO de un loop"""
+    en_loop = False
+    
+    for info in escaneo:
+        if info.inicia_loop:
+            en_loop = True
+        
+        if en_loop:
+            if info.divide_a_la_mitad:
+                return True
+            
+            if not info.ignorable and info.espacios == 0:
+                en_loop = False
+    
+    return False
+
+
+def calcular_complejidad_espacial(codigo: str, escaneo: List[LineaEscaneada], lenguaje: str,
+                                  tiene_recursion: bool) -> str:
+    """Calcula Big O espacial"""
+    if detectar_matriz(codigo, lenguaje):
+        return "O(n^2)"
+    elif tiene_recursion:
+        return "O(n)"
+    elif contar_arrays_auxiliares_significativos(codigo, escaneo, lenguaje) > 0:
+        return "O(n)"
+    else:
+        return "O(1)"
+
+
+def contar_arrays_auxiliares_significativos(codigo: str, escaneo: List[LineaEscaneada], lenguaje: str) -> int:
+    """Cuenta solo arrays auxiliares que crecen proporcionalmente con la entrada"""
+    
+    if lenguaje == 'python':
+        contador = 0
+        listas_con_append = None
+        
+        for info in escaneo:
+            if info.lista_con_datos:
+                contador += 1
+            
+            elif info.lista_vacia:
+                # Los nombres con .append( se buscan una sola vez en todo el código
+                if listas_con_append is None:
+                    listas_con_append = set(PATRON_APPEND.findall(codigo))
+                if any(nombre.endswith(info.lista_vacia) for nombre in listas_con_append):
+                    contador += 1
+        
+        return contador
+    
+    return 0
+
+
+def es_recursion_multiple(codigo: str) -> bool:
+    """Detecta recursión múltiple"""
+    return len(PATRON_RECURSION_MULTIPLE.findall(codigo)) >= 2
+
+
+def es_recursion_dividir_conquistar(codigo: str) -> bool:
+    """Detecta recursión divide y conquista"""
+    return (
+        contiene_alguna(codigo.lower(), ('mid', 'mitad', 'medio', 'pivot'))
+        or PATRON_MITAD.search(codigo) is not None
+    )
+
+
+def detectar_matriz(codigo: str, lenguaje: str) -> bool:
+    """Detecta matrices 2D"""
+    patron = PATRONES_MATRIZ.get(lenguaje, PATRON_MATRIZ_GENERICO)
+    return patron.search(codigo) is not None
+
+
+def detectar_patrones(codigo: str, texto_minusculas: str, nivel_anidamiento: int,
+                      grafo_llamadas: Dict) -> List[Dict]:
+    """Detecta patrones algorítmicos"""
+    patrones = []
+    
+    for nombre, complejidad, subcadenas, confirmacion in PATRONES_ALGORITMICOS:
+        if subcadenas is None:
+            # La fuerza bruta sale del anidamiento ya calculado, no del texto
+            encontrado = nivel_anidamiento >= 2
+        else:
+            encontrado = contiene_alguna(texto_minusculas, subcadenas) and (
+                confirmacion is None or confirmacion.search(codigo) is not None
+            )
+        
+        if encontrado:
+            patrones.append({'patron': nombre, 'complejidad': complejidad})
+    
+    # Los ciclos entre varias funciones no se ven mirando una función a la vez
+    for ciclo in grafo_llamadas['ciclos']:
+        if len(ciclo) > 1:
+            patrones.append({
+                'patron': 'Recursión Mutua',
+                'complejidad': 'Depende de la recursión',
+                'funciones': ciclo
+            })
+    
+    return patrones
+
+
+def detectar_estructuras_datos(codigo: str, texto_minusculas: str) -> List[str]:
+    """Detecta estructuras de datos"""
+    estructuras = [
+        estructura
+        for estructura, (subcadenas, alternativa) in PATRONES_ESTRUCTURAS.items()
+        if contiene_alguna(texto_minusculas, subcadenas)
+        or (alternativa is not None and alternativa.search(codigo) is not None)
+    ]
+    
+    return list(set(estructuras))
+
+
+def determinar_ganador(comp1: str, comp2: str) -> str:
+    """Determina qué código es más eficiente"""
+    orden = {
+        'O(1)': 1,
+        'O(log n)': 2,
+        'O(n)': 3,
+        'O(n log n)': 4,
+        'O(n^2)': 5,
+        'O(n^3)': 6,
+        'O(2^n)': 7,
+        'O(n!)': 8
+    }
+    
+    v1 = orden.get(comp1, 999)
+    v2 = orden.get(comp2, 999)
+    
+    if v1 < v2:
+        return 'codigo_1'
+    elif v2 < v1:
+        return 'codigo_2'
+    else:
+        return 'empate'
+
+
+# ============================================
+# ANALIZADOR PYTHON (ÁRBOL SINTÁCTICO)
+# ============================================
+
+TAMANO_CACHE_ARBOLES = 256
+
+_arboles_python = OrderedDict()
+_candado_arboles = threading.Lock()
+
+# Costo de un tramo de código: (grado del polinomio en n, factores log n)
+COSTO_CONSTANTE = (0, 0)
+COSTO_LINEAL = (1, 0)
+COSTO_LOGARITMICO = (0, 1)
+COSTO_ORDENAR = (1, 1)
+
+NOMBRES_MITAD = {'mid', 'medio', 'mitad', 'middle'}
+METODOS_CRECIMIENTO = {'append', 'appendleft', 'add', 'extend', 'insert', 'update', 'setdefault'}
+CONSTRUCTORES_COLECCION = {'list', 'dict', 'set', 'deque', 'defaultdict', 'Counter', 'OrderedDict'}
+NODOS_DEFINICION = (ast.FunctionDef, ast.AsyncFunctionDef)
+NODOS_COMPRENSION = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+NODOS_LOOP = (ast.For, ast.AsyncFor, ast.While)
+
+
+def parsear_python(codigo: str) -> Optional[ast.Module]:
+    """Árbol sintáctico del código, cacheado por hash; None si no es Python válido"""
+    clave = hashlib.sha256(codigo.encode('utf-8', 'surrogatepass')).hexdigest()
+    
+    with _candado_arboles:
+        if clave in _arboles_python:
+            _arboles_python.move_to_end(clave)
+            return _arboles_python[clave]
+    
+    try:
+        arbol = ast.parse(codigo)
+    except (SyntaxError, ValueError):
+        arbol = None
+    
+    with _candado_arboles:
+        _arboles_python[clave] = arbol
+        if len(_arboles_python) > TAMANO_CACHE_ARBOLES:
+            _arboles_python.popitem(last=False)
+    
+    return arbol
+
+
+def _sumar(costo_1: Tuple[int, int], costo_2: Tuple[int, int]) -> Tuple[int, int]:
+    return costo_1[0] + costo_2[0], costo_1[1] + costo_2[1]
+
+
+def _complejidad_de_costo(costo: Tuple[int, int]) -> str:
+    grado, logs = costo
+    if grado >= 3:
+        return 'O(n^3)'
+    if grado == 2:
+        return 'O(n^2)'
+    if grado == 1:
+        return 'O(n log n)' if logs else 'O(n)'
+    return 'O(log n)' if logs else 'O(1)'
+
+
+def _hijos(nodo) -> List[ast.AST]:
+    hijos = []
+    for campo in nodo._fields:
+        valor = getattr(nodo, campo, None)
+        if isinstance(valor, list):
+            hijos.extend(elemento for elemento in valor if isinstance(elemento, ast.AST))
+        elif isinstance(valor, ast.AST):
+            hijos.append(valor)
+    return hijos
+
+
+def _divide_a_la_mitad(nodo) -> bool:
+    """x // 2, x / 2 o x >> 1"""
+    if isinstance(nodo, ast.BinOp) and isinstance(nodo.right, ast.Constant):
+        if isinstance(nodo.op, (ast.FloorDiv, ast.Div)) and nodo.right.value == 2:
+            return True
+        if isinstance(nodo.op, ast.RShift) and nodo.right.value == 1:
+            return True
+    return False
+
+
+def _es_mitad(nodo) -> bool:
+    """x // 2, x / 2, x >> 1, o un nombre tipo 'mid'"""
+    return _divide_a_la_mitad(nodo) or isinstance(nodo, ast.Name) and nodo.id.lower() in NOMBRES_MITAD
+
+
+def _nombres_asignados(destino) -> set:
+    """Variables que escribe un destino de asignación (incluye desempaquetado: lo, hi = ...)"""
+    return {n.id for n in ast.walk(destino) if isinstance(n, ast.Name)}
+
+
+def _nombre_llamado(llamada: ast.Call) -> Optional[str]:
+    if isinstance(llamada.func, ast.Name):
+        return llamada.func.id
+    if isinstance(llamada.func, ast.Attribute):
+        return llamada.func.attr
+    return None
+
+
+def _es_matriz(nodo) -> bool:
+    """[[...] for ...], [[0] * n for ...] o [[0] * n] * m"""
+    if isinstance(nodo, ast.ListComp):
+        elemento = nodo.elt
+        return isinstance(elemento, (ast.List, ast.ListComp)) or (
+            isinstance(elemento, ast.BinOp) and isinstance(elemento.op, ast.Mult)
+            and isinstance(elemento.left, ast.List)
+        )
+    if isinstance(nodo, ast.BinOp) and isinstance(nodo.op, ast.Mult) and isinstance(nodo.left, ast.List):
+        return any(isinstance(e, (ast.List, ast.ListComp)) for e in nodo.left.elts)
+    return False
+
+
+class RecorridoPython:
+    """Una sola pasada por el árbol: costo de cada función, llamadas, anidamiento y memoria"""
+
+    def __init__(self, arbol: ast.Module):
+        self.funciones = []
+        self.costos = {}
+        self.llamadas = {}
+        self.nivel_anidamiento = 0
+        self.hay_matriz = False
+        self.hay_comprension = False
+        self.colecciones = set()
+        self.colecciones_en_loop = set()
+        # Una entrada por cada while abierto (el último es el más interno): variables de su
+        # condición, nombres que guardan una mitad (mid = (lo + hi) // 2) y si es logarítmico
+        self._whiles_abiertos = []
+        self.costo_modulo = self._visitar_bloque(arbol.body, None, 0, False)
+
+    def _visitar_bloque(self, nodos, funcion, nivel: int, en_loop: bool) -> Tuple[int, int]:
+        costo = COSTO_CONSTANTE
+        for nodo in nodos:
+            costo = max(costo, self._visitar(nodo, funcion, nivel, en_loop))
+        return costo
+
+    def _visitar(self, nodo, funcion, nivel: int, en_loop: bool) -> Tuple[int, int]:
+        # 1. Funciones anidadas: se analizan aparte y no suman al costo de quien las define
+        if isinstance(nodo, NODOS_DEFINICION):
+            self.funciones.append(nodo)
+            self.llamadas.setdefault(nodo.name, set())
+            self.costos[nodo] = self._visitar_bloque(nodo.body, nodo.name, 0, False)
+            return COSTO_CONSTANTE
+        if isinstance(nodo, (ast.Lambda, ast.ClassDef)):
+            # Se recorren para registrar métodos y llamadas, pero su cuerpo no corre aquí
+            self._visitar_bloque(_hijos(nodo), funcion, nivel, en_loop)
+            return COSTO_CONSTANTE
+
+        es_loop = isinstance(nodo, NODOS_LOOP)
+        es_comprension = isinstance(nodo, NODOS_COMPRENSION)
+        if es_loop:
+            nivel += 1
+            if isinstance(nodo, ast.While):
+                self._whiles_abiertos.append({
+                    'variables': {n.id for n in ast.walk(nodo.test) if isinstance(n, ast.Name)},
+                    'mitades': set(),
+                    'logaritmico': False,
+                })
+        elif es_comprension:
+            nivel += len(nodo.generators)
+            self.hay_comprension = self.hay_comprension or not isinstance(nodo, ast.GeneratorExp)
+        self.nivel_anidamiento = max(self.nivel_anidamiento, nivel)
+
+        # 2. Hechos puntuales del nodo
+        if isinstance(nodo, ast.Call):
+            nombre = _nombre_llamado(nodo)
+            if nombre and funcion is not None:
+                self.llamadas[funcion].add(nombre)
+            if (en_loop and nombre in METODOS_CRECIMIENTO and isinstance(nodo.func, ast.Attribute)
+                    and isinstance(nodo.func.value, ast.Name)):
+                self.colecciones_en_loop.add(nodo.func.value.id)
+        elif isinstance(nodo, ast.Assign):
+            self._registrar_asignacion(nodo, en_loop)
+        elif isinstance(nodo, ast.AugAssign) and self._whiles_abiertos and isinstance(nodo.value, ast.Constant):
+            # n //= 2 (o i *= 2) solo acorta el while más interno, y solo si n está en su condición
+            if (((isinstance(nodo.op, (ast.FloorDiv, ast.Div, ast.Mult)) and nodo.value.value == 2)
+                    or (isinstance(nodo.op, (ast.RShift, ast.LShift)) and nodo.value.value == 1))
+                    and isinstance(nodo.target, ast.Name)
+                    and nodo.target.id in self._whiles_abiertos[-1]['variables']):
+                self._whiles_abiertos[-1]['logaritmico'] = True
+        elif not self.hay_matriz and isinstance(nodo, (ast.ListComp, ast.BinOp)):
+            self.hay_matriz = _es_matriz(nodo)
+
+        # 3. Costo del camino más caro dentro del nodo
+        interior = self._visitar_bloque(_hijos(nodo), funcion, nivel, en_loop or es_loop or es_comprension)
+
+        if es_loop:
+            logaritmico = isinstance(nodo, ast.While) and self._whiles_abiertos.pop()['logaritmico']
+            return _sumar(interior, COSTO_LOGARITMICO if logaritmico else COSTO_LINEAL)
+        if es_comprension:
+            return _sumar(interior, (len(nodo.generators), 0))
+        if isinstance(nodo, ast.Call) and _nombre_llamado(nodo) in ('sorted', 'sort'):
+            return max(interior, COSTO_ORDENAR)
+        return interior
+
+    def _registrar_asignacion(self, nodo: ast.Assign, en_loop: bool) -> None:
+        valor = nodo.value
+
+        if self._whiles_abiertos:
+            self._registrar_mitad(nodo, self._whiles_abiertos[-1])
+
+        for destino in nodo.targets:
+            if isinstance(destino, ast.Name):
+                vacia = isinstance(valor, ast.List) and not valor.elts or isinstance(valor, ast.Dict) and not valor.keys
+                constructor = isinstance(valor, ast.Call) and _nombre_llamado(valor) in CONSTRUCTORES_COLECCION
+                if vacia or constructor:
+                    self.colecciones.add(destino.id)
+            elif en_loop and isinstance(destino, ast.Subscript) and isinstance(destino.value, ast.Name):
+                self.colecciones_en_loop.add(destino.value.id)
+
+    def _registrar_mitad(self, nodo: ast.Assign, abierto: dict) -> None:
+        """El while es logarítmico si una variable de su condición recibe una mitad:
+        n = n // 2 directamente, o lo = mid + 1 con mid = (lo + hi) // 2 antes"""
+        destinos = set().union(*(_nombres_asignados(destino) for destino in nodo.targets))
+        partes = list(ast.walk(nodo.value))
+        divide = any(_divide_a_la_mitad(parte) for parte in partes)
+
+        if destinos & abierto['variables']:
+            if divide or any(isinstance(parte, ast.Name) and parte.id in abierto['mitades'] for parte in partes):
+                abierto['logaritmico'] = True
+        elif divide:
+            abierto['mitades'] |= destinos
+
+    def usa_memoria_auxiliar(self) -> bool:
+        """Comprensiones o colecciones que se llenan dentro de un loop"""
+        return self.hay_comprension or not self.colecciones.isdisjoint(self.colecciones_en_loop)
+
+
+def _llamadas_por_camino(nodos, ciclo: set) -> int:
+    """Máximo de llamadas recursivas que pueden ejecutarse en una misma pasada por el bloque"""
+    total = 0
+
+    for posicion, nodo in enumerate(nodos):
+        if isinstance(nodo, NODOS_DEFINICION + (ast.Lambda, ast.ClassDef)):
+            continue
+
+        if isinstance(nodo, NODOS_LOOP):
+            # Una llamada recursiva dentro de un loop se repite: cuenta como ramificación
+            if _llamadas_por_camino(_hijos(nodo), ciclo):
+                return total + 2
+            continue
+
+        if isinstance(nodo, (ast.If, ast.IfExp)):
+            condicion = _llamadas_por_camino([nodo.test], ciclo)
+            rama_si = _llamadas_por_camino(nodo.body if isinstance(nodo, ast.If) else [nodo.body], ciclo)
+            rama_no = _llamadas_por_camino(nodo.orelse if isinstance(nodo, ast.If) else [nodo.orelse], ciclo)
+
+            # if ...: return f(...)  -> el resto del bloque es la rama alternativa
+            if isinstance(nodo, ast.If) and not nodo.orelse and isinstance(nodo.body[-1], (ast.Return, ast.Raise)):
+                rama_no = _llamadas_por_camino(nodos[posicion + 1:], ciclo)
+                return total + condicion + max(rama_si, rama_no)
+
+            total += condicion + max(rama_si, rama_no)
+            continue
+
+        if isinstance(nodo, ast.Call) and _nombre_llamado(nodo) in ciclo:
+            total += 1
+
+        total += _llamadas_por_camino(_hijos(nodo), ciclo)
+
+    return total
+
+
+def _llamadas_divididas(funcion, ciclo: set) -> bool:
+    """Alguna llamada recursiva recibe la mitad del problema (n // 2, lista[:mid], ...)"""
+    for nodo in ast.walk(funcion):
+        if isinstance(nodo, ast.Call) and nodo is not funcion and _nombre_llamado(nodo) in ciclo:
+            for argumento in nodo.args + [palabra.value for palabra in nodo.keywords]:
+                if any(_es_mitad(parte) or isinstance(parte, ast.Slice) for parte in ast.walk(argumento)):
+                    return True
+    return False
+
+
+def _complejidad_funcion(funcion, costo: Tuple[int, int], ciclo: set) -> str:
+    if not ciclo:
+        return _complejidad_de_costo(costo)
+    
+    divide = _llamadas_divididas(funcion, ciclo)
+    
+    if _llamadas_por_camino(funcion.body, ciclo) >= 2:
+        # Varias ramas: divide y conquista (merge sort) o árbol exponencial (fibonacci)
+        return _complejidad_de_costo(max(costo, COSTO_ORDENAR)) if divide else 'O(2^n)'
+    
+    # Una sola llamada por nivel: cada nivel repite el costo del cuerpo
+    return _complejidad_de_costo(_sumar(costo, COSTO_LOGARITMICO if divide else COSTO_LINEAL))
+
+
+def analizar_python_ast(codigo: str, arbol: ast.Module) -> Dict:
+    """Análisis de código Python sobre su árbol sintáctico"""
+    recorrido = RecorridoPython(arbol)
+    
+    grafo = {
+        nombre: sorted(llamadas & recorrido.llamadas.keys())
+        for nombre, llamadas in recorrido.llamadas.items()
+    }
+    ciclos = encontrar_ciclos(grafo)
+    ciclo_por_funcion = {nombre: set(ciclo) for ciclo in ciclos for nombre in ciclo}
+    grafo_llamadas = {
+        'funciones': grafo,
+        'ciclos': ciclos,
+        'recursivas': sorted(ciclo_por_funcion),
+        'recursion_mutua': any(len(ciclo) > 1 for ciclo in ciclos),
+    }
+    
+    complejidad_por_funcion = {}
+    for funcion in recorrido.funciones:
+        complejidad = _complejidad_funcion(
+            funcion, recorrido.costos[funcion], ciclo_por_funcion.get(funcion.name, set())
+        )
+        anterior = complejidad_por_funcion.get(funcion.name)
+        if anterior is None or orden_complejidad(complejidad) > orden_complejidad(anterior):
+            complejidad_por_funcion[funcion.name] = complejidad
+    
+    # El código fuera de funciones (nivel de módulo) también cuenta
+    complejidades = list(complejidad_por_funcion.values()) + [_complejidad_de_costo(recorrido.costo_modulo)]
+    
+    # Memoria: matrices, colecciones que crecen, o la pila de la recursión
+    if recorrido.hay_matriz:
+        complejidad_espacial = 'O(n^2)'
+    elif recorrido.usa_memoria_auxiliar():
+        complejidad_espacial = 'O(n)'
+    elif ciclo_por_funcion:
+        profundidad_log = all(
+            _llamadas_divididas(funcion, ciclo_por_funcion[funcion.name])
+            for funcion in recorrido.funciones if funcion.name in ciclo_por_funcion
+        )
+        complejidad_espacial = 'O(log n)' if profundidad_log else 'O(n)'
+    else:
+        complejidad_espacial = 'O(1)'
+    
+    texto_minusculas = codigo.lower()
+    
+    return {
+        'complejidad_temporal': max(complejidades, key=orden_complejidad),
+        'complejidad_espacial': complejidad_espacial,
+        'patrones_detectados': detectar_patrones(
+            codigo, texto_minusculas, recorrido.nivel_anidamiento, grafo_llamadas
+        ),
+        'nivel_anidamiento': recorrido.nivel_anidamiento,
+        'estructuras_datos': detectar_estructuras_datos(codigo, texto_minusculas),
+        'confianza_analisis': calcular_confianza(codigo, 'python'),
+        'grafo_llamadas': grafo_llamadas,
+        'complejidad_por_funcion': complejidad_por_funcion,
+        'analizador': 'ast'
+    }
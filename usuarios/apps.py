@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
+
+    def ready(self):
+        # Un cambio de rol o de activo guardado con el ORM invalida el estado cacheado del usuario
+        # (los .update() no emiten señales: quedan cubiertos por TTL_USUARIO)
+        from administrador.models import Usuarios as UsuariosAdministrador
+        from usuarios.autenticacion import _invalidar_usuario_guardado
+        from usuarios.models import Usuarios
+
+        for modelo in (Usuarios, UsuariosAdministrador):
+            post_save.connect(_invalidar_usuario_guardado, sender=modelo, dispatch_uid=f'invalidar_{modelo.__module__}')
+            post_delete.connect(_invalidar_usuario_guardado, sender=modelo, dispatch_uid=f'invalidar_borrado_{modelo.__module__}')
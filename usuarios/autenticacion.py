@@ -0,0 +1,198 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject
+
+from usuarios.models import Usuarios
+
+
+class Principal(NamedTuple):
+    """Usuario autenticado de la petición (usuario_id None si no envió un token válido)"""
+    usuario_id: Optional[int]
+    usuario: str
+    rol: str
+
+    @property
+    def autenticado(self) -> bool:
+        return self.usuario_id is not None
+
+    @property
+    def es_admin(self) -> bool:
+        return self.rol.lower() == 'admin'
+
+
+ANONIMO = Principal(None, '', '')
+
+
+def configuracion_autenticacion() -> dict:
+    """Configuración de los tokens JWT con valores por defecto"""
+    config = {
+        'ALIAS_CACHE': 'autenticacion',
+        'TTL_USUARIO': 60,
+        'DURACION_TOKEN_HORAS': 24,
+        'PERMITIR_CACHE_LOCAL': False,
+    }
+    config.update(getattr(settings, 'AUTENTICACION', {}))
+    return config
+
+
+def _cache():
+    return caches[configuracion_autenticacion()['ALIAS_CACHE']]
+
+
+def verificar_cache_compartida() -> None:
+    """La revocación de tokens solo vale si todos los procesos ven la misma caché: con una caché
+    por proceso (LocMemCache) o sin caché (DummyCache) se niega a arrancar"""
+    config = configuracion_autenticacion()
+    if config['PERMITIR_CACHE_LOCAL']:
+        return
+
+    if isinstance(_cache(), (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"La caché '{config['ALIAS_CACHE']}' de AUTENTICACION no es compartida entre procesos: "
+            "cerrar_sesion solo revocaría el token en uno. Use DatabaseCache o Redis, o "
+            "AUTENTICACION['PERMITIR_CACHE_LOCAL'] = True con un único proceso."
+        )
+
+
+def emitir_token(usuario_obj) -> str:
+    """JWT de la sesión; jti identifica el token para poder revocarlo"""
+    ahora = datetime.now(timezone.utc)
+    payload = {
+        'usuario_id': usuario_obj.id,
+        'usuario': usuario_obj.usuario,
+        'rol': usuario_obj.rol.nombre,
+        'exp': ahora + timedelta(hours=configuracion_autenticacion()['DURACION_TOKEN_HORAS']),
+        'iat': ahora,
+        'jti': uuid.uuid4().hex,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def estado_usuario(usuario_id: int) -> Optional[Dict]:
+    """{'usuario', 'rol', 'activo'} del usuario, o None si no existe. Cada petición con token lo
+    consulta para rechazar usuarios desactivados; se guarda TTL_USUARIO segundos (también la
+    ausencia), así la BD solo se consulta cuando la entrada venció."""
+    clave = f'usuario:{usuario_id}'
+    estado = _cache().get(clave)
+
+    if estado is None:
+        fila = Usuarios.objects.filter(id=usuario_id).values('usuario', 'activo', 'rol__nombre').first()
+        estado = {'usuario': fila['usuario'], 'rol': fila['rol__nombre'], 'activo': bool(fila['activo'])} if fila else {}
+        _cache().set(clave, estado, configuracion_autenticacion()['TTL_USUARIO'])
+
+    return estado or None
+
+
+def invalidar_usuario(usuario_id: int) -> None:
+    _cache().delete(f'usuario:{usuario_id}')
+
+
+def _invalidar_usuario_guardado(sender, instance, **kwargs) -> None:
+    """Receptor de post_save / post_delete de Usuarios (ver UsuariosConfig.ready)"""
+    invalidar_usuario(instance.pk)
+
+
+def revocar_token(payload: Dict) -> None:
+    """Revoca el token hasta su vencimiento (la lista solo guarda tokens que todavía valdrían).
+    Los tokens sin jti, emitidos antes de que existiera, se revocan con todos los del usuario."""
+    restante = max(int(payload.get('exp', 0) - time.time()), 1)
+
+    if payload.get('jti'):
+        _cache().set(f"revocado:{payload['jti']}", True, restante)
+    else:
+        revocar_tokens_usuario(payload['usuario_id'])
+
+
+def revocar_tokens_usuario(usuario_id: int) -> None:
+    """Revoca todos los tokens del usuario emitidos hasta ahora"""
+    duracion = configuracion_autenticacion()['DURACION_TOKEN_HORAS'] * 3600
+    # Segundos enteros como iat: también caen los emitidos en el mismo segundo
+    _cache().set(f'revocado_desde:{usuario_id}', int(time.time()), duracion)
+
+
+def _revocado(payload: Dict) -> bool:
+    claves = [f"revocado_desde:{payload['usuario_id']}"]
+    if payload.get('jti'):
+        claves.append(f"revocado:{payload['jti']}")
+
+    revocados = _cache().get_many(claves)
+    if payload.get('jti') and revocados.get(claves[-1]):
+        return True
+
+    desde = revocados.get(claves[0])
+    return desde is not None and payload.get('iat', 0) <= desde
+
+
+def _decodificar(request):
+    auth_header = request.META.get('HTTP_AUTHORIZATION')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+
+    try:
+        payload = jwt.decode(auth_header.split(' ')[1], settings.SECRET_KEY, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return {'error': 'Token expirado'}
+    except jwt.InvalidTokenError:
+        return {'error': 'Token inválido'}
+
+    if 'usuario_id' not in payload:
+        return {'error': 'Token inválido'}
+    if _revocado(payload):
+        return {'error': 'Token revocado'}
+
+    estado = estado_usuario(payload['usuario_id'])
+    if not estado or not estado['activo']:
+        return {'error': 'Usuario inactivo o inexistente'}
+
+    # El rol vigente es el de la BD (cacheado), no el que tenía el usuario al iniciar sesión
+    payload['rol'] = estado['rol']
+    return payload
+
+
+def validar_token(request):
+    """Valida el token JWT del header Authorization: retorna el payload, None sin token o
+    {'error': ...}. Se decodifica una sola vez por petición."""
+    if not hasattr(request, '_payload_jwt'):
+        request._payload_jwt = _decodificar(request)
+    return request._payload_jwt
+
+
+def obtener_principal(request) -> Principal:
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return ANONIMO
+    return Principal(payload['usuario_id'], payload.get('usuario', ''), payload['rol'])
+
+
+class AutenticacionJWTMiddleware:
+    """Agrega request.principal. Se resuelve al usarlo: las vistas sin token (y las async,
+    que no consultan la BD desde aquí) no pagan el JWT ni la caché."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        verificar_cache_compartida()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.principal = SimpleLazyObject(lambda: obtener_principal(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.principal = SimpleLazyObject(lambda: obtener_principal(request))
+        return await self.get_response(request)
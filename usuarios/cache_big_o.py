@@ -0,0 +1,84 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from usuarios.analisis_big_o import VERSION_ANALIZADOR
+
+_locales = OrderedDict()
+_candado = threading.Lock()
+
+
+def configuracion_cache() -> dict:
+    """Tamaño del LRU en memoria y alias opcional de la caché compartida"""
+    config = {
+        'TAMANO_CACHE_LOCAL': 2048,
+        'CACHE_COMPARTIDA': None,
+    }
+    config.update(getattr(settings, 'ANALISIS_BIG_O', {}))
+    return config
+
+
+def normalizar_codigo(codigo: str) -> str:
+    """Unifica saltos de línea y quita espacios finales; el análisis se hace sobre este texto"""
+    lineas = codigo.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(linea.rstrip() for linea in lineas).strip('\n')
+
+
+def clave_analisis(codigo_normalizado: str, lenguaje: str) -> str:
+    """SHA-256 del código normalizado, el lenguaje y la versión del analizador"""
+    contenido = f'{VERSION_ANALIZADOR}\0{lenguaje}\0{codigo_normalizado}'
+    return 'big_o:' + hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _cache_compartida():
+    alias = configuracion_cache()['CACHE_COMPARTIDA']
+    if alias and alias in settings.CACHES:
+        return caches[alias]
+    return None
+
+
+def obtener_analisis(clave: str) -> Optional[Dict]:
+    """Busca primero en el LRU del proceso y después en la caché compartida"""
+    with _candado:
+        analisis = _locales.get(clave)
+        if analisis is not None:
+            _locales.move_to_end(clave)
+            # Copia para que quien la use no altere la entrada guardada
+            return copy.deepcopy(analisis)
+
+    compartida = _cache_compartida()
+    if compartida is None:
+        return None
+
+    analisis = compartida.get(clave)
+    if analisis is not None:
+        _guardar_local(clave, analisis)
+    return analisis
+
+
+def guardar_analisis(clave: str, analisis: Dict) -> None:
+    _guardar_local(clave, analisis)
+
+    compartida = _cache_compartida()
+    if compartida is not None:
+        compartida.set(clave, analisis)
+
+
+def _guardar_local(clave: str, analisis: Dict) -> None:
+    tamano = configuracion_cache()['TAMANO_CACHE_LOCAL']
+
+    with _candado:
+        _locales[clave] = analisis
+        _locales.move_to_end(clave)
+        while len(_locales) > tamano:
+            _locales.popitem(last=False)
+
+
+def limpiar_cache_local() -> None:
+    with _candado:
+        _locales.clear()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+from django.core.cache import caches
+
+# Cambiar este número invalida todas las entradas guardadas
+VERSION_CLAVE = 1
+
+ALIAS_CACHE = 'similitud_ia'
+
+CLAVE_ACIERTOS = 'metricas:aciertos'
+CLAVE_FALLOS = 'metricas:fallos'
+CLAVE_MS_AHORRADOS = 'metricas:ms_ahorrados'
+CLAVE_TOKENS_AHORRADOS = 'metricas:tokens_ahorrados'
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def normalizar_codigo(codigo: str) -> str:
+    """Quita diferencias que no cambian el código: saltos de línea, espacios finales y líneas vacías"""
+    lineas = codigo.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(linea.rstrip() for linea in lineas if linea.strip())
+
+
+def _hash(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def clave_comparacion(codigo_1: str, codigo_2: str, model_name: str, prompt_config, temperatura,
+                      max_tokens=None) -> str:
+    """Clave por contenido; el orden de los dos códigos no importa.
+
+    Del prompt entra el texto de la plantilla y no su versión (texto libre y opcional): editar la
+    plantilla sin cambiar la versión no debe devolver respuestas del prompt anterior.
+    """
+    hashes_codigo = sorted([
+        _hash(normalizar_codigo(codigo_1)),
+        _hash(normalizar_codigo(codigo_2)),
+    ])
+
+    partes = {
+        'v': VERSION_CLAVE,
+        'codigos': hashes_codigo,
+        'modelo': model_name,
+        'prompt': [prompt_config.pk, _hash(prompt_config.template_prompt)],
+        'temperatura': str(temperatura) if temperatura is not None else None,
+        'max_tokens': max_tokens,
+    }
+    return 'comparacion:' + _hash(json.dumps(partes, sort_keys=True))
+
+
+def _incrementar(clave: str, cantidad: int = 1) -> None:
+    cache = _cache()
+    # add() no sobreescribe si otro proceso ya creó el contador
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave, cantidad)
+    except ValueError:
+        cache.set(clave, cantidad, timeout=None)
+
+
+def obtener_resultado(clave: str) -> Optional[Dict]:
+    """Busca un resultado guardado y registra el acierto o fallo"""
+    resultado = _cache().get(clave)
+
+    if resultado is None:
+        _incrementar(CLAVE_FALLOS)
+        return None
+
+    _incrementar(CLAVE_ACIERTOS)
+    _incrementar(CLAVE_MS_AHORRADOS, int(resultado.get('tiempo_respuesta', 0) * 1000))
+    _incrementar(CLAVE_TOKENS_AHORRADOS, int(resultado.get('tokens_usados', 0)))
+    return resultado
+
+
+def guardar_resultado(clave: str, respuesta_ia: str, porcentaje_similitud: int,
+                      tokens_usados: int, tiempo_respuesta: float) -> None:
+    """Guarda la respuesta del proveedor con el TTL configurado en CACHES"""
+    _cache().set(clave, {
+        'respuesta_ia': respuesta_ia,
+        'porcentaje_similitud': porcentaje_similitud,
+        'tokens_usados': tokens_usados,
+        'tiempo_respuesta': tiempo_respuesta,
+    })
+
+
+def obtener_metricas() -> Dict:
+    """Aciertos, fallos y lo que se dejó de gastar en el proveedor"""
+    valores = _cache().get_many([
+        CLAVE_ACIERTOS, CLAVE_FALLOS, CLAVE_MS_AHORRADOS, CLAVE_TOKENS_AHORRADOS
+    ])
+
+    aciertos = valores.get(CLAVE_ACIERTOS, 0)
+    fallos = valores.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+
+    return {
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': round(aciertos / total, 4) if total else 0.0,
+        'segundos_ahorrados': round(valores.get(CLAVE_MS_AHORRADOS, 0) / 1000, 2),
+        'tokens_ahorrados': valores.get(CLAVE_TOKENS_AHORRADOS, 0),
+    }
@@ -0,0 +1,121 @@
+import json
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Una sesión por endpoint (esquema + host), compartida por todos los hilos del proceso
+_sesiones = {}
+_candado_sesiones = threading.Lock()
+
+
+def configuracion_http() -> dict:
+    """Configuración del cliente HTTP de proveedores con valores por defecto"""
+    config = {
+        'CONEXIONES_POR_HOST': 10,
+        'CONEXIONES_ASYNC': 500,
+        'REINTENTOS': 3,
+        'FACTOR_ESPERA': 0.5,
+        'ESPERA_MAXIMA_REINTENTO': 5,
+        'STATUS_REINTENTABLES': [500, 502, 503, 504],
+    }
+    config.update(getattr(settings, 'PROVEEDORES_IA_HTTP', {}))
+    return config
+
+
+class _RetryAcotado(Retry):
+    """Retry que respeta Retry-After sin esperar más de ESPERA_MAXIMA_REINTENTO"""
+
+    # Solo se reintentan los status de STATUS_REINTENTABLES, aunque otro (429) traiga Retry-After
+    RETRY_AFTER_STATUS_CODES = frozenset()
+
+    def get_retry_after(self, response):
+        espera = super().get_retry_after(response)
+        if espera is None:
+            return None
+        return min(espera, configuracion_http()['ESPERA_MAXIMA_REINTENTO'])
+
+
+def _crear_sesion() -> requests.Session:
+    """Sesión con pool de conexiones keep-alive y reintentos con espera exponencial"""
+    config = configuracion_http()
+
+    # Los 429 no se reintentan aquí: mientras se espera se retiene el cupo y el lugar entre las
+    # llamadas simultáneas; los resuelven el limitador, el respaldo y la cola de trabajos
+    reintentos = _RetryAcotado(
+        total=config['REINTENTOS'],
+        connect=config['REINTENTOS'],
+        read=0,  # No repetir una petición que ya llegó al proveedor y se quedó sin respuesta
+        status=config['REINTENTOS'],
+        backoff_factor=config['FACTOR_ESPERA'],
+        status_forcelist=config['STATUS_REINTENTABLES'],
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Retornar la última respuesta para que el llamador la reporte
+    )
+
+    adaptador = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config['CONEXIONES_POR_HOST'],
+        max_retries=reintentos
+    )
+
+    sesion = requests.Session()
+    sesion.mount('https://', adaptador)
+    sesion.mount('http://', adaptador)
+    return sesion
+
+
+def obtener_sesion(url: str) -> requests.Session:
+    """Retorna la sesión del endpoint, creándola la primera vez"""
+    partes = urlsplit(url)
+    clave = (partes.scheme, partes.netloc)
+
+    sesion = _sesiones.get(clave)
+    if sesion is None:
+        with _candado_sesiones:
+            sesion = _sesiones.get(clave)
+            if sesion is None:
+                sesion = _crear_sesion()
+                _sesiones[clave] = sesion
+
+    return sesion
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """Equivalente a requests.post reutilizando la conexión del endpoint"""
+    return obtener_sesion(url).post(url, **kwargs)
+
+
+def eventos_sse(response: requests.Response):
+    """Recorre una respuesta text/event-stream y entrega el JSON de cada evento"""
+    datos = []
+
+    # chunk_size=None entrega cada bloque apenas llega, sin esperar a juntar 512 bytes
+    for linea in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if linea is None:
+            continue
+        if linea.startswith('data:'):
+            datos.append(linea[5:].strip())
+            continue
+        # Línea vacía: termina el evento (event:, id: y comentarios se ignoran)
+        if not linea and datos:
+            contenido = '\n'.join(datos)
+            datos = []
+            if contenido == '[DONE]':
+                return
+            yield json.loads(contenido)
+
+    if datos and datos != ['[DONE]']:
+        yield json.loads('\n'.join(datos))
+
+
+def cerrar_sesiones() -> None:
+    """Cierra todas las conexiones abiertas (útil al terminar un proceso trabajador)"""
+    with _candado_sesiones:
+        for sesion in _sesiones.values():
+            sesion.close()
+        _sesiones.clear()
@@ -0,0 +1,108 @@
+import asyncio
+import email.utils
+import time
+
+import httpx
+
+from usuarios.cliente_http import configuracion_http
+
+# Un cliente por event loop: httpx.AsyncClient no puede usarse desde otro loop
+_clientes = {}
+# Tarea por loop que cierra su cliente cuando el loop termina (y mantiene viva la referencia)
+_guardianes = {}
+
+
+async def _cerrar_al_terminar(loop, cliente: httpx.AsyncClient) -> None:
+    """Espera hasta que el loop cancele sus tareas al apagarse (asyncio.run, async_to_sync)
+    y cierra el pool de conexiones del cliente antes de que el loop se cierre"""
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if _clientes.get(loop) is cliente:
+            del _clientes[loop]
+            _guardianes.pop(loop, None)
+        await cliente.aclose()
+
+
+def obtener_cliente() -> httpx.AsyncClient:
+    """Cliente asíncrono del loop actual, con pool de conexiones keep-alive"""
+    loop = asyncio.get_running_loop()
+
+    # Respaldo: un loop cerrado sin cancelar sus tareas no alcanzó a cerrar su cliente
+    for loop_cerrado in [otro for otro in _clientes if otro.is_closed()]:
+        del _clientes[loop_cerrado]
+        _guardianes.pop(loop_cerrado, None)
+
+    cliente = _clientes.get(loop)
+
+    if cliente is None or cliente.is_closed:
+        config = configuracion_http()
+        cliente = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config['CONEXIONES_ASYNC'],
+                max_keepalive_connections=config['CONEXIONES_POR_HOST']
+            )
+        )
+        _clientes[loop] = cliente
+        # Bajo WSGI cada vista async corre en un loop propio que se cierra al terminar
+        anterior = _guardianes.get(loop)
+        _guardianes[loop] = loop.create_task(_cerrar_al_terminar(loop, cliente))
+        if anterior is not None:
+            anterior.cancel()
+
+    return cliente
+
+
+def _espera_reintento(response, intento: int, config: dict) -> float:
+    """Segundos a esperar: Retry-After si el proveedor lo envía (hasta ESPERA_MAXIMA_REINTENTO),
+    si no espera exponencial"""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    exponencial = config['FACTOR_ESPERA'] * (2 ** intento)
+
+    if not retry_after:
+        return exponencial
+
+    if retry_after.isdigit():
+        espera = float(retry_after)
+    else:
+        try:
+            fecha = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            # Retry-After mal formado: se usa la espera exponencial
+            return exponencial
+        espera = max(0.0, fecha.timestamp() - time.time())
+
+    return min(espera, config['ESPERA_MAXIMA_REINTENTO'])
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    """POST asíncrono con los mismos reintentos que cliente_http (conexión y 5xx)"""
+    config = configuracion_http()
+    cliente = obtener_cliente()
+
+    for intento in range(config['REINTENTOS'] + 1):
+        ultimo = intento == config['REINTENTOS']
+
+        try:
+            response = await cliente.post(url, **kwargs)
+        except httpx.ConnectError:
+            # La petición no llegó al proveedor: se puede repetir sin riesgo
+            if ultimo:
+                raise
+            await asyncio.sleep(_espera_reintento(None, intento, config))
+            continue
+
+        if response.status_code not in config['STATUS_REINTENTABLES'] or ultimo:
+            return response
+
+        await asyncio.sleep(_espera_reintento(response, intento, config))
+
+
+async def cerrar_clientes() -> None:
+    """Cierra los clientes abiertos (al apagar el servidor ASGI)"""
+    for guardian in list(_guardianes.values()):
+        guardian.cancel()
+    for cliente in list(_clientes.values()):
+        await cliente.aclose()
+    _clientes.clear()
+    _guardianes.clear()
@@ -0,0 +1,117 @@
+import json
+from string import Formatter
+from typing import Dict, Tuple
+
+from usuarios.analisis_big_o import grafo_llamadas_codigo, resolver_lenguaje
+from usuarios.compactacion_prompt import compactar_par
+from usuarios.comparacion_ia import ErrorComparacionIA
+from usuarios.models import ComentariosEficienciaIndividual
+
+
+def construir_prompt_eficiencia(resultado_eficiencia, adaptador, config) -> Tuple[object, str, Dict]:
+    """Valida el prompt de eficiencia de la configuración y retorna
+    (prompt, texto con los datos del análisis, informe de compactación de los códigos).
+
+    Un placeholder desconocido en la plantilla se propaga como KeyError.
+    """
+    if not config:
+        raise ErrorComparacionIA('No hay configuración activa para este modelo de IA', status=404)
+
+    prompt_eficiencia = config.id_prompt_eficiencia
+
+    # 1. Verificar que el prompt de eficiencia exista y esté activo
+    if not prompt_eficiencia:
+        raise ErrorComparacionIA('No hay prompt de eficiencia configurado para este modelo', status=400)
+
+    if not prompt_eficiencia.activo:
+        raise ErrorComparacionIA('El prompt de eficiencia configurado no está activo', status=400)
+
+    # 2. Reemplazar placeholders en el prompt con los datos de la comparación y análisis
+    #    (el grafo de llamadas queda disponible para las plantillas que lo usen)
+    comparacion = resultado_eficiencia.id_comparacion_individual
+    lenguaje_analisis = resolver_lenguaje(
+        comparacion.lenguaje.nombre, comparacion.lenguaje.extension
+    ) if comparacion.lenguaje else None
+    codigo_1, codigo_2, compactacion = compactar_par(
+        comparacion.codigo_1, comparacion.codigo_2, lenguaje_analisis, adaptador.nombre
+    )
+
+    prompt_procesado = prompt_eficiencia.template_prompt.format(
+        lenguaje=comparacion.lenguaje.nombre if comparacion.lenguaje else 'No especificado',
+        codigo_1=codigo_1,
+        codigo_2=codigo_2,
+        codigo_1_complejidad_temporal=resultado_eficiencia.codigo_1_complejidad_temporal,
+        codigo_1_complejidad_espacial=resultado_eficiencia.codigo_1_complejidad_espacial,
+        codigo_1_nivel_anidamiento=resultado_eficiencia.codigo_1_nivel_anidamiento or 0,
+        codigo_1_patrones_detectados=json.dumps(resultado_eficiencia.codigo_1_patrones_detectados or {}, indent=2),
+        codigo_1_estructuras_datos=json.dumps(resultado_eficiencia.codigo_1_estructuras_datos or {}, indent=2),
+        codigo_1_confianza_analisis=resultado_eficiencia.codigo_1_confianza_analisis or 'No especificada',
+        codigo_2_complejidad_temporal=resultado_eficiencia.codigo_2_complejidad_temporal,
+        codigo_2_complejidad_espacial=resultado_eficiencia.codigo_2_complejidad_espacial,
+        codigo_2_nivel_anidamiento=resultado_eficiencia.codigo_2_nivel_anidamiento or 0,
+        codigo_2_patrones_detectados=json.dumps(resultado_eficiencia.codigo_2_patrones_detectados or {}, indent=2),
+        codigo_2_estructuras_datos=json.dumps(resultado_eficiencia.codigo_2_estructuras_datos or {}, indent=2),
+        codigo_2_confianza_analisis=resultado_eficiencia.codigo_2_confianza_analisis or 'No especificada',
+        codigo_1_grafo_llamadas=json.dumps(grafo_llamadas_codigo(comparacion.codigo_1, lenguaje_analisis), indent=2),
+        codigo_2_grafo_llamadas=json.dumps(grafo_llamadas_codigo(comparacion.codigo_2, lenguaje_analisis), indent=2)
+    )
+
+    return prompt_eficiencia, prompt_procesado, compactacion
+
+
+def prefijo_eficiencia(prompt_eficiencia) -> str:
+    """Texto de la plantilla anterior al primer placeholder (con las llaves dobles ya resueltas)"""
+    for texto, campo, _, _ in Formatter().parse(prompt_eficiencia.template_prompt):
+        return texto if campo is not None else prompt_eficiencia.template_prompt
+    return ''
+
+
+def guardar_comentario_eficiencia(resultado_eficiencia, modelo_ia, adaptador, config, prompt_eficiencia,
+                                  comentario_ia: str, tokens_usados: int, tiempo_respuesta: float,
+                                  compactacion: Dict = None, tokens_cache: Dict = None) -> Dict:
+    """Reemplaza el comentario del resultado de eficiencia y arma la respuesta"""
+    # 1. Guardar el comentario en la base de datos
+    # Eliminar comentario anterior si existe (para evitar duplicados)
+    ComentariosEficienciaIndividual.objects.filter(
+        id_resultado_eficiencia_individual=resultado_eficiencia
+    ).delete()
+
+    # Crear nuevo comentario
+    comentario = ComentariosEficienciaIndividual.objects.create(
+        id_resultado_eficiencia_individual=resultado_eficiencia,
+        comentario=comentario_ia
+    )
+
+    # 2. Retornar resultado
+    return {
+        'mensaje': 'Comentario de eficiencia generado exitosamente',
+        'comentario_id': comentario.id_comentario_eficiencia,
+        'resultado_eficiencia_id': resultado_eficiencia.id_resultado_eficiencia_individual,
+        'modelo_usado': modelo_ia.nombre,
+        'proveedor': adaptador.nombre,
+        'model_name': config.model_name,
+        'prompt_usado': {
+            'id': prompt_eficiencia.id_prompt_eficiencia,
+            'version': prompt_eficiencia.version,
+            'descripcion': prompt_eficiencia.descripcion,
+            'tipo_analisis': prompt_eficiencia.tipo_analisis
+        },
+        'tiempo_respuesta_segundos': round(tiempo_respuesta, 2),
+        'tokens_usados': tokens_usados,
+        'tokens_cache': tokens_cache,
+        'compactacion': compactacion,
+        'analisis_big_o': {
+            'codigo_1': {
+                'temporal': resultado_eficiencia.codigo_1_complejidad_temporal,
+                'espacial': resultado_eficiencia.codigo_1_complejidad_espacial,
+                'ganador': resultado_eficiencia.ganador == 'codigo_1'
+            },
+            'codigo_2': {
+                'temporal': resultado_eficiencia.codigo_2_complejidad_temporal,
+                'espacial': resultado_eficiencia.codigo_2_complejidad_espacial,
+                'ganador': resultado_eficiencia.ganador == 'codigo_2'
+            }
+        },
+        'comentario': comentario_ia,  # ← AGREGAR ESTA LÍNEA
+        'comentario_preview': comentario_ia[:500] + '...' if len(comentario_ia) > 500 else comentario_ia
+    }
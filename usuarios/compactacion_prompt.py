@@ -0,0 +1,186 @@
+import math
+import re
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+from usuarios.similitud_local import CADENA, COMENTARIOS_DEFECTO, COMENTARIOS_POR_LENGUAJE, NUMERO
+
+# Lenguajes donde la sangría es parte de la sintaxis
+SANGRIA_SIGNIFICATIVA = frozenset(['python'])
+
+# Líneas que se conservan al resumir la parte central de un código largo (firmas y tipos)
+PATRON_FIRMA = re.compile(
+    r'^\s*(?:(?:public|private|protected|static|async|export|override|final|abstract|pub)\s+)*'
+    r'(?:def|class|function|func|fn|fun|struct|interface|enum|impl|trait|module)\b'
+    r'|^\s*[\w<>\[\],\s*&:]+\s+\w+\s*\([^;]*\)\s*(?:const\s*)?(?:throws\s+[\w.,\s]+)?\{?\s*$'
+)
+
+_patrones_por_lenguaje = {}
+
+
+def configuracion_compactacion() -> dict:
+    """Configuración de la compactación de código antes de enviarlo a la IA con valores por defecto"""
+    config = {
+        'ACTIVA': True,
+        'QUITAR_COMENTARIOS': True,
+        'MAX_LITERAL': 200,
+        'MAX_ELEMENTOS_LITERALES': 20,
+        'PRESUPUESTO_TOKENS_CODIGO': 6000,
+        'CARACTERES_POR_TOKEN': {
+            'Claude': 3.5,
+            'OpenAI': 4.0,
+            'DeepSeek': 4.0,
+            'Gemini': 4.0,
+        },
+    }
+    config.update(getattr(settings, 'COMPACTACION_PROMPT', {}))
+    return config
+
+
+def estimar_tokens_texto(texto: str, proveedor: str = None) -> int:
+    """Tokens aproximados del texto según la proporción caracteres/token del proveedor"""
+    proporcion = configuracion_compactacion()['CARACTERES_POR_TOKEN'].get(proveedor, 4.0)
+    return math.ceil(len(texto) / proporcion)
+
+
+def _patron_literales(lenguaje: str, max_elementos: int):
+    """Comentarios, listas largas de literales y cadenas en una sola pasada (una expresión por lenguaje)"""
+    clave = (lenguaje, max_elementos)
+    patron = _patrones_por_lenguaje.get(clave)
+
+    if patron is None:
+        comentarios = '|'.join(COMENTARIOS_POR_LENGUAJE.get(lenguaje, COMENTARIOS_DEFECTO))
+        literal = rf'(?:{CADENA}|-?{NUMERO})'
+        patron = re.compile(
+            rf'(?P<comentario>{comentarios})'
+            rf'|(?P<lista>(?:{literal}\s*,\s*){{{max_elementos},}}{literal})'
+            rf'|(?P<cadena>{CADENA})',
+            re.DOTALL | re.MULTILINE
+        )
+        _patrones_por_lenguaje[clave] = patron
+
+    return patron
+
+
+def _acortar_cadena(cadena: str, maximo: int) -> str:
+    """Deja el inicio de una cadena larga con sus comillas y cuántos caracteres se omitieron"""
+    comillas = cadena[:3] if cadena[:3] in ('"""', "'''") else cadena[0]
+    contenido = cadena[len(comillas):-len(comillas)]
+    if len(contenido) <= maximo:
+        return cadena
+    return f'{comillas}{contenido[:maximo // 2]}…[+{len(contenido) - maximo // 2} caracteres]{comillas}'
+
+
+def _acortar_lista(lista: str, patron_elemento) -> str:
+    """Deja los primeros elementos de una lista larga de literales y cuántos se omitieron"""
+    elementos = patron_elemento.findall(lista)
+    visibles = ', '.join(elementos[:5])
+    return f'{visibles}, …[+{len(elementos) - 5} elementos]'
+
+
+def limpiar_codigo(codigo: str, lenguaje: str = None) -> str:
+    """Quita comentarios, líneas vacías y espacios finales; colapsa cadenas y listas de literales largas"""
+    config = configuracion_compactacion()
+    patron_elemento = re.compile(rf'{CADENA}|-?{NUMERO}', re.DOTALL)
+
+    def reemplazar(match):
+        tipo = match.lastgroup
+        if tipo == 'comentario':
+            return '' if config['QUITAR_COMENTARIOS'] else match.group()
+        if tipo == 'lista':
+            return _acortar_lista(match.group(), patron_elemento)
+        return _acortar_cadena(match.group(), config['MAX_LITERAL'])
+
+    codigo = _patron_literales(lenguaje, config['MAX_ELEMENTOS_LITERALES']).sub(reemplazar, codigo)
+
+    lineas = [linea.rstrip() for linea in codigo.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    lineas = [linea for linea in lineas if linea]
+
+    # Sin sangría significativa basta un espacio por nivel para que se lea la estructura
+    if lenguaje not in SANGRIA_SIGNIFICATIVA:
+        lineas = _un_espacio_por_nivel(lineas)
+
+    return '\n'.join(lineas)
+
+
+def _un_espacio_por_nivel(lineas: List[str]) -> List[str]:
+    """Cambia la sangría por un espacio por nivel; el nivel se mide con la sangría más chica del
+    código (tabs, 2 o 4 espacios)"""
+    lineas = [linea.expandtabs(4) for linea in lineas]
+    sangrias = [len(linea) - len(linea.lstrip()) for linea in lineas]
+    unidad = min((sangria for sangria in sangrias if sangria), default=1)
+    return [' ' * (sangria // unidad) + linea.lstrip() for linea, sangria in zip(lineas, sangrias)]
+
+
+def resumir_codigo(codigo: str, presupuesto: int, proveedor: str = None) -> str:
+    """Recorta un código que no entra en el presupuesto: inicio y final completos y, del medio, solo las firmas"""
+    lineas = codigo.split('\n')
+    # Se reservan unos caracteres para las marcas de líneas omitidas
+    presupuesto_caracteres = presupuesto * len(codigo) // max(1, estimar_tokens_texto(codigo, proveedor)) - 120
+
+    # 1. Inicio (60%) y final (25%) del presupuesto
+    inicio, usados = [], 0
+    for linea in lineas:
+        if usados + len(linea) + 1 > presupuesto_caracteres * 0.60:
+            break
+        inicio.append(linea)
+        usados += len(linea) + 1
+
+    final, usados_final = [], 0
+    for linea in reversed(lineas[len(inicio):]):
+        if usados_final + len(linea) + 1 > presupuesto_caracteres * 0.25:
+            break
+        final.insert(0, linea)
+        usados_final += len(linea) + 1
+
+    # 2. Del medio, las firmas de funciones y clases mientras quede presupuesto
+    medio = lineas[len(inicio):len(lineas) - len(final)]
+    restante = presupuesto_caracteres - usados - usados_final
+    firmas = []
+    for linea in medio:
+        if PATRON_FIRMA.match(linea) and len(linea) + 1 <= restante:
+            firmas.append(linea)
+            restante -= len(linea) + 1
+
+    omitidas = len(medio) - len(firmas)
+    if not firmas:
+        return '\n'.join(inicio + [f'… [{omitidas} líneas omitidas] …'] + final)
+    return '\n'.join(inicio + [f'… [{omitidas} líneas omitidas; se muestran solo las firmas] …'] + firmas + ['…'] + final)
+
+
+def compactar_codigo(codigo: str, lenguaje: str = None, proveedor: str = None) -> Tuple[str, Dict]:
+    """Retorna (código listo para el prompt, informe de tokens antes y después)"""
+    config = configuracion_compactacion()
+    tokens_originales = estimar_tokens_texto(codigo, proveedor)
+
+    if not config['ACTIVA']:
+        return codigo, {'tokens_originales': tokens_originales, 'tokens_enviados': tokens_originales, 'recortado': False}
+
+    compacto = limpiar_codigo(codigo, lenguaje)
+    recortado = estimar_tokens_texto(compacto, proveedor) > config['PRESUPUESTO_TOKENS_CODIGO']
+    if recortado:
+        compacto = resumir_codigo(compacto, config['PRESUPUESTO_TOKENS_CODIGO'], proveedor)
+
+    return compacto, {
+        'tokens_originales': tokens_originales,
+        'tokens_enviados': estimar_tokens_texto(compacto, proveedor),
+        'recortado': recortado,
+    }
+
+
+def compactar_par(codigo_1: str, codigo_2: str, lenguaje: str = None, proveedor: str = None) -> Tuple[str, str, Dict]:
+    """Compacta los dos códigos de una comparación y suma el ahorro estimado"""
+    compacto_1, informe_1 = compactar_codigo(codigo_1, lenguaje, proveedor)
+    compacto_2, informe_2 = compactar_codigo(codigo_2, lenguaje, proveedor)
+
+    originales = informe_1['tokens_originales'] + informe_2['tokens_originales']
+    enviados = informe_1['tokens_enviados'] + informe_2['tokens_enviados']
+
+    return compacto_1, compacto_2, {
+        'tokens_originales': originales,
+        'tokens_enviados': enviados,
+        'tokens_ahorrados': originales - enviados,
+        'codigo_1_recortado': informe_1['recortado'],
+        'codigo_2_recortado': informe_2['recortado'],
+    }
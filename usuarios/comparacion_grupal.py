@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from itertools import combinations
+from typing import Dict
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from usuarios.analisis_big_o import analizar_codigo_big_o, orden_complejidad, resolver_lenguaje
+from usuarios.comparacion_ia import (
+    ErrorComparacionIA,
+    comparar_codigos_ia,
+    resolver_configuracion_comparacion,
+)
+from usuarios.limites_proveedor import en_hilo
+from usuarios.models import (
+    CodigosFuente,
+    ResultadosEficienciaGrupal,
+    ResultadosSimilitudGrupal,
+)
+from usuarios.similitud_local import configuracion_similitud_local, huellas, jaccard
+
+
+def configuracion_grupal() -> dict:
+    """Configuración del motor grupal con valores por defecto"""
+    config = {
+        'UMBRAL_CANDIDATO': 0.30,
+        'CONCURRENCIA_IA': 8,
+    }
+    config.update(getattr(settings, 'COMPARACION_GRUPAL', {}))
+    return config
+
+
+def puntuacion_eficiencia(complejidad: str) -> int:
+    """Convierte una complejidad temporal en un puntaje de 0 a 100 (O(1) = 100, O(n!) = 0)"""
+    orden = orden_complejidad(complejidad)
+    if orden > 8:
+        return 0
+    return round(100 * (8 - orden) / 7)
+
+
+def ejecutar_comparacion_grupal(comparacion_grupal) -> Dict:
+    """Calcula la similitud de todos los pares y la eficiencia de cada código del grupo"""
+    config_grupal = configuracion_grupal()
+
+    # 1. Obtener los códigos del grupo
+    codigos = list(CodigosFuente.objects.filter(
+        comparacion_grupal_id=comparacion_grupal.pk
+    ).order_by('orden'))
+
+    if len(codigos) < 2:
+        raise ErrorComparacionIA('La comparación grupal necesita al menos 2 códigos', status=400)
+
+    # 2. Prefiltro local: huellas de cada código y similitud de cada par
+    lenguaje = resolver_lenguaje(comparacion_grupal.lenguaje.nombre, comparacion_grupal.lenguaje.extension)
+    huellas_por_codigo = {codigo.pk: huellas(codigo.codigo, lenguaje) for codigo in codigos}
+    pares = [
+        {
+            'codigo_1': codigo_1,
+            'codigo_2': codigo_2,
+            'similitud_local': jaccard(huellas_por_codigo[codigo_1.pk], huellas_por_codigo[codigo_2.pk]),
+            'resultado_ia': None,
+            'error': None
+        }
+        for codigo_1, codigo_2 in combinations(codigos, 2)
+    ]
+
+    # 3. Solo los pares sospechosos se envían a la IA, en paralelo con un límite;
+    #    los prácticamente idénticos no necesitan la opinión del modelo
+    config_local = configuracion_similitud_local()
+    umbral_identico = config_local['UMBRAL_IDENTICO'] if config_local['OMITIR_IA'] else float('inf')
+    candidatos = [
+        par for par in pares
+        if config_grupal['UMBRAL_CANDIDATO'] <= par['similitud_local'] < umbral_identico
+    ]
+    modelo_ia = comparacion_grupal.id_modelo_ia
+
+    if candidatos and modelo_ia:
+        adaptador, config, prompt_config = resolver_configuracion_comparacion(modelo_ia)
+        hilos = min(config_grupal['CONCURRENCIA_IA'], len(candidatos))
+
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            futuros = {
+                ejecutor.submit(
+                    en_hilo(comparar_codigos_ia),
+                    adaptador, config, prompt_config,
+                    par['codigo_1'].codigo, par['codigo_2'].codigo,
+                    lenguaje=lenguaje
+                ): par
+                for par in candidatos
+            }
+
+            for futuro in as_completed(futuros):
+                par = futuros[futuro]
+                try:
+                    par['resultado_ia'] = futuro.result()
+                except ErrorComparacionIA as e:
+                    par['error'] = e.mensaje
+                except requests.RequestException as e:
+                    par['error'] = f'Error en la petición HTTP: {str(e)}'
+
+    # 4. Armar los resultados de similitud (IA si hay porcentaje, si no la estimación local)
+    resultados_similitud = []
+    pares_con_ia = 0
+
+    for par in pares:
+        resultado_ia = par['resultado_ia']
+
+        if resultado_ia and resultado_ia['porcentaje_similitud'] is not None:
+            porcentaje = Decimal(resultado_ia['porcentaje_similitud'])
+            explicacion = resultado_ia['respuesta_ia']
+            pares_con_ia += 1
+        else:
+            porcentaje = Decimal(str(round(par['similitud_local'] * 100, 2)))
+            explicacion = 'Similitud estimada localmente por huellas de winnowing (sin análisis de IA).'
+            if par['error']:
+                explicacion += f' La IA no respondió: {par["error"]}'
+
+        resultados_similitud.append(ResultadosSimilitudGrupal(
+            comparacion_grupal_id=comparacion_grupal.pk,
+            codigo_fuente_1=par['codigo_1'],
+            codigo_fuente_2=par['codigo_2'],
+            porcentaje_similitud=porcentaje,
+            explicacion=explicacion
+        ))
+
+    # 5. Eficiencia de cada código (análisis Big O local)
+    resultados_eficiencia = []
+
+    if lenguaje:
+        analisis = {codigo.pk: analizar_codigo_big_o(codigo.codigo, lenguaje) for codigo in codigos}
+        mejor_orden = min(orden_complejidad(a['complejidad_temporal']) for a in analisis.values())
+
+        for codigo in codigos:
+            complejidad_temporal = analisis[codigo.pk]['complejidad_temporal']
+            resultados_eficiencia.append(ResultadosEficienciaGrupal(
+                comparacion_grupal_id=comparacion_grupal.pk,
+                codigo_fuente=codigo,
+                complejidad_temporal=complejidad_temporal,
+                complejidad_espacial=analisis[codigo.pk]['complejidad_espacial'],
+                puntuacion_eficiencia=puntuacion_eficiencia(complejidad_temporal),
+                es_mas_eficiente=orden_complejidad(complejidad_temporal) == mejor_orden
+            ))
+
+    # 6. Reemplazar los resultados anteriores en una sola transacción
+    with transaction.atomic():
+        ResultadosSimilitudGrupal.objects.filter(comparacion_grupal_id=comparacion_grupal.pk).delete()
+        ResultadosEficienciaGrupal.objects.filter(comparacion_grupal_id=comparacion_grupal.pk).delete()
+        ResultadosSimilitudGrupal.objects.bulk_create(resultados_similitud, batch_size=500)
+        ResultadosEficienciaGrupal.objects.bulk_create(resultados_eficiencia, batch_size=500)
+
+    return {
+        'mensaje': 'Comparación grupal procesada',
+        'comparacion_id': comparacion_grupal.pk,
+        'total_codigos': len(codigos),
+        'total_pares': len(pares),
+        'pares_enviados_ia': len(candidatos) if modelo_ia else 0,
+        'pares_con_resultado_ia': pares_con_ia,
+        'pares_con_error_ia': sum(1 for par in pares if par['error']),
+        'umbral_candidato': config_grupal['UMBRAL_CANDIDATO'],
+        'eficiencia_analizada': bool(resultados_eficiencia)
+    }
@@ -0,0 +1,495 @@
+import math
+import re
+import time
+from typing import Dict, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+
+from usuarios import cliente_http, cliente_http_async
+from usuarios.analisis_big_o import resolver_lenguaje
+from usuarios.cache_similitud import clave_comparacion, guardar_resultado, obtener_resultado
+from usuarios.compactacion_prompt import compactar_par
+from usuarios.limites_proveedor import Cupo, areservar_cupo, reservar_cupo
+from usuarios.models import ResultadosSimilitudIndividual
+from usuarios.proveedores import aresolver_configuracion, resolver_configuracion
+from usuarios.respaldo_ia import (
+    Cancelacion,
+    acadena_respaldos,
+    aejecutar_con_respaldo,
+    cadena_respaldos,
+    ejecutar_con_respaldo,
+    registrar_latencia,
+)
+from usuarios.similitud_local import comparar_local
+
+
+class ErrorComparacionIA(Exception):
+    """Error controlado al ejecutar una comparación con IA"""
+
+    def __init__(self, mensaje, status=500, detalle=None):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+        self.detalle = detalle
+
+    def como_dict(self) -> Dict:
+        datos = {'error': self.mensaje}
+        if self.detalle is not None:
+            datos['detalle'] = self.detalle
+        return datos
+
+
+class LimiteProveedorExcedido(ErrorComparacionIA):
+    """El modelo no tuvo cupo libre dentro de la espera máxima (la petición no llegó al proveedor)"""
+
+    def __init__(self, proveedor: str, reintentar_en: float):
+        super().__init__(
+            f'Límite de uso de la API {proveedor} alcanzado, intente nuevamente en unos segundos',
+            status=429,
+            detalle={'reintentar_en_segundos': math.ceil(reintentar_en)}
+        )
+        self.reintentar_en = reintentar_en
+
+
+def reservar_cupo_proveedor(adaptador, config, prompt: str, timeout: float) -> Cupo:
+    """Espera turno según los límites del modelo o lanza LimiteProveedorExcedido"""
+    cupo, espera = reservar_cupo(adaptador, config, prompt, timeout)
+    if cupo is None:
+        raise LimiteProveedorExcedido(adaptador.nombre, espera)
+    return cupo
+
+
+async def areservar_cupo_proveedor(adaptador, config, prompt: str, timeout: float) -> Cupo:
+    cupo, espera = await areservar_cupo(adaptador, config, prompt, timeout)
+    if cupo is None:
+        raise LimiteProveedorExcedido(adaptador.nombre, espera)
+    return cupo
+
+
+def resolver_configuracion_comparacion(modelo_ia):
+    """Retorna (adaptador, configuración, prompt) activos para comparar con el modelo"""
+    adaptador, config = resolver_configuracion(modelo_ia, 'id_prompt')
+    return _validar_configuracion_comparacion(adaptador, config)
+
+
+async def aresolver_configuracion_comparacion(modelo_ia):
+    adaptador, config = await aresolver_configuracion(modelo_ia, 'id_prompt')
+    return _validar_configuracion_comparacion(adaptador, config)
+
+
+def _validar_configuracion_comparacion(adaptador, config):
+    prompt_config = config.id_prompt if config else None
+
+    if not config or not prompt_config:
+        raise ErrorComparacionIA('No hay configuración activa para este modelo de IA', status=404)
+
+    # Verificar que el prompt esté activo
+    if not prompt_config.activo:
+        raise ErrorComparacionIA('El prompt configurado no está activo', status=400)
+
+    return adaptador, config, prompt_config
+
+
+def resolver_candidatos(modelo_ia) -> List[Tuple]:
+    """[(modelo, adaptador, configuración, prompt)] del modelo y de sus respaldos con configuración activa"""
+    candidatos = [(modelo_ia, *resolver_configuracion_comparacion(modelo_ia))]
+
+    for respaldo in cadena_respaldos(modelo_ia):
+        try:
+            candidatos.append((respaldo, *resolver_configuracion_comparacion(respaldo)))
+        except ErrorComparacionIA:
+            continue  # Un respaldo sin configuración activa se salta
+
+    return candidatos
+
+
+async def aresolver_candidatos(modelo_ia) -> List[Tuple]:
+    candidatos = [(modelo_ia, *await aresolver_configuracion_comparacion(modelo_ia))]
+
+    for respaldo in await acadena_respaldos(modelo_ia):
+        try:
+            candidatos.append((respaldo, *await aresolver_configuracion_comparacion(respaldo)))
+        except ErrorComparacionIA:
+            continue
+
+    return candidatos
+
+
+def construir_prompt_comparacion(adaptador, prompt_config, codigo_1: str, codigo_2: str,
+                                 lenguaje: str = None) -> Tuple[str, Dict]:
+    """Reemplaza los placeholders del prompt con los dos códigos compactados.
+
+    Retorna (prompt, informe de compactación con los tokens estimados antes y después).
+    """
+    codigo_1, codigo_2, compactacion = compactar_par(codigo_1, codigo_2, lenguaje, adaptador.nombre)
+    prompt = prompt_config.template_prompt.replace(
+        '{{codigo_a}}', codigo_1
+    ).replace(
+        '{{codigo_b}}', codigo_2
+    )
+    return prompt, compactacion
+
+
+def prefijo_comparacion(prompt_config) -> str:
+    """Parte de la plantilla anterior al primer código: igual en todas las llamadas con este prompt"""
+    template = prompt_config.template_prompt
+    posiciones = [template.find(marcador) for marcador in ('{{codigo_a}}', '{{codigo_b}}')]
+    posiciones = [posicion for posicion in posiciones if posicion >= 0]
+    return template[:min(posiciones)] if posiciones else template
+
+
+def clave_cache_comparacion(config, prompt_config, codigo_1: str, codigo_2: str) -> str:
+    """Clave de caché para el mismo par de códigos, modelo y prompt"""
+    return clave_comparacion(
+        codigo_1,
+        codigo_2,
+        config.model_name,
+        prompt_config,
+        getattr(config, 'temperature', None),
+        getattr(config, 'max_tokens', None)
+    )
+
+
+def comparar_codigos_ia(adaptador, config, prompt_config, codigo_1: str, codigo_2: str,
+                        timeout: float = 60, lenguaje: str = None, cancelacion: Cancelacion = None) -> Dict:
+    """Envía un par de códigos al proveedor (o toma la respuesta de la caché) y extrae el porcentaje.
+    Con cancelacion (llamada de una cobertura) se puede detener desde el hilo que espera."""
+    # 1. Buscar una respuesta previa para el mismo par de códigos, modelo y prompt
+    clave = clave_cache_comparacion(config, prompt_config, codigo_1, codigo_2)
+    inicio = time.time()
+    en_cache = obtener_resultado(clave)
+    compactacion = tokens_cache = None
+
+    if en_cache:
+        respuesta_ia = en_cache['respuesta_ia']
+        tokens_usados = en_cache['tokens_usados']
+    else:
+        # 2. Compactar los códigos y reemplazar placeholders en el prompt
+        prompt_procesado, compactacion = construir_prompt_comparacion(
+            adaptador, prompt_config, codigo_1, codigo_2, lenguaje
+        )
+
+        # 3. Esperar turno según los límites del modelo (o rechazar antes de llamar)
+        cupo = reservar_cupo_proveedor(adaptador, config, prompt_procesado, timeout)
+        tokens_usados = None
+
+        try:
+            if cancelacion:
+                # Si la cobertura ya tiene ganador no se llama al proveedor; si no, al cancelarla
+                # se libera el hueco de la llamada (los tokens enviados quedan descontados)
+                cancelacion.verificar()
+                cancelacion.al_cancelar(lambda: cupo.liberar(cupo.tokens_reservados))
+
+            # 4. Preparar url, headers y payload según el proveedor (instrucciones fijas primero, cacheables)
+            url, headers, payload = adaptador.construir_peticion(
+                config, prompt_procesado, prefijo_comparacion(prompt_config)
+            )
+
+            # 5. Hacer la petición (con cancelacion el cuerpo se lee aparte para poder cortarlo)
+            response = cliente_http.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=timeout,
+                stream=cancelacion is not None
+            )
+            if cancelacion:
+                cancelacion.al_cancelar(response.close)
+                cancelacion.verificar()
+
+            # 6. Verificar respuesta
+            if response.status_code != 200:
+                raise ErrorComparacionIA(
+                    f'Error de la API {adaptador.nombre}: {response.status_code}',
+                    status=response.status_code,
+                    detalle=response.text
+                )
+
+            # 7. Extraer la respuesta y los tokens servidos desde la caché del proveedor
+            response_data = response.json()
+            respuesta_ia, tokens_usados = adaptador.extraer_respuesta(response_data)
+            tokens_cache = adaptador.tokens_cache(adaptador.uso_respuesta(response_data))
+        finally:
+            cupo.liberar(tokens_usados)
+
+    return completar_resultado_ia(
+        clave, respuesta_ia, tokens_usados, time.time() - inicio, bool(en_cache), compactacion, tokens_cache
+    )
+
+
+def completar_resultado_ia(clave: str, respuesta_ia: str, tokens_usados: int,
+                           tiempo_respuesta: float, desde_cache: bool, compactacion: Dict = None,
+                           tokens_cache: Dict = None) -> Dict:
+    """Extrae el porcentaje de la respuesta y la guarda en caché si es nueva"""
+    porcentaje_similitud = extraer_porcentaje_similitud(respuesta_ia)
+
+    # Solo se guardan en caché las respuestas con porcentaje válido
+    if porcentaje_similitud is not None and not desde_cache:
+        guardar_resultado(clave, respuesta_ia, porcentaje_similitud, tokens_usados, tiempo_respuesta)
+
+    return {
+        'respuesta_ia': respuesta_ia,
+        'tokens_usados': tokens_usados,
+        'porcentaje_similitud': porcentaje_similitud,
+        'tiempo_respuesta': tiempo_respuesta,
+        'desde_cache': desde_cache,
+        'compactacion': compactacion,
+        'tokens_cache': tokens_cache
+    }
+
+
+def ejecutar_comparacion_ia(comparacion) -> Dict:
+    """Llama al proveedor de IA, guarda el resultado y retorna la respuesta completa"""
+    # 1. Obtener el modelo IA
+    if not comparacion.id_modelo_ia:
+        raise ErrorComparacionIA('La comparación no tiene un modelo de IA asignado', status=400)
+
+    # 2. Similitud local: línea base inmediata y control cruzado del número de la IA
+    similitud_local = similitud_local_comparacion(comparacion)
+
+    if similitud_local['omitir_ia']:
+        return resultado_solo_local(comparacion, similitud_local)
+
+    # 3. Configuración del modelo y de sus respaldos
+    candidatos = resolver_candidatos(comparacion.id_modelo_ia)
+    lenguaje = lenguaje_comparacion(comparacion)
+
+    def intentar(candidato, timeout, cancelacion=None):
+        modelo_ia, adaptador, config, prompt_config = candidato
+        resultado_ia = comparar_codigos_ia(
+            adaptador, config, prompt_config, comparacion.codigo_1, comparacion.codigo_2, timeout, lenguaje,
+            cancelacion
+        )
+        if not resultado_ia['desde_cache']:
+            registrar_latencia(modelo_ia.id, resultado_ia['tiempo_respuesta'])
+        return resultado_ia
+
+    # 4. Comparar con la IA (pasando al respaldo si el proveedor falla o tarda)
+    (modelo_ia, adaptador, config, prompt_config), resultado_ia, informe = ejecutar_con_respaldo(
+        candidatos, intentar, bool(comparacion.id_modelo_ia.cobertura_activa)
+    )
+
+    # 5. Guardar y armar la respuesta
+    return con_informe_respaldo(guardar_resultado_comparacion(
+        comparacion, adaptador, config, prompt_config, resultado_ia, similitud_local, modelo_ia=modelo_ia
+    ), candidatos, informe)
+
+
+async def acomparar_codigos_ia(adaptador, config, prompt_config, codigo_1: str, codigo_2: str,
+                               timeout: float = 60, lenguaje: str = None) -> Dict:
+    """Versión asíncrona de comparar_codigos_ia: la espera al proveedor no ocupa un hilo"""
+    clave = clave_cache_comparacion(config, prompt_config, codigo_1, codigo_2)
+    inicio = time.time()
+    compactacion = tokens_cache = None
+
+    # La caché puede ser de red (Redis, Memcached): se consulta fuera del loop
+    en_cache = await sync_to_async(obtener_resultado, thread_sensitive=False)(clave)
+
+    if en_cache:
+        respuesta_ia = en_cache['respuesta_ia']
+        tokens_usados = en_cache['tokens_usados']
+    else:
+        prompt_procesado, compactacion = construir_prompt_comparacion(
+            adaptador, prompt_config, codigo_1, codigo_2, lenguaje
+        )
+        cupo = await areservar_cupo_proveedor(adaptador, config, prompt_procesado, timeout)
+        tokens_usados = None
+
+        try:
+            url, headers, payload = adaptador.construir_peticion(
+                config, prompt_procesado, prefijo_comparacion(prompt_config)
+            )
+
+            response = await cliente_http_async.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=timeout
+            )
+
+            if response.status_code != 200:
+                raise ErrorComparacionIA(
+                    f'Error de la API {adaptador.nombre}: {response.status_code}',
+                    status=response.status_code,
+                    detalle=response.text
+                )
+
+            response_data = response.json()
+            respuesta_ia, tokens_usados = adaptador.extraer_respuesta(response_data)
+            tokens_cache = adaptador.tokens_cache(adaptador.uso_respuesta(response_data))
+        finally:
+            await cupo.aliberar(tokens_usados)
+
+    return await sync_to_async(completar_resultado_ia, thread_sensitive=False)(
+        clave, respuesta_ia, tokens_usados, time.time() - inicio, bool(en_cache), compactacion, tokens_cache
+    )
+
+
+async def aejecutar_comparacion_ia(comparacion) -> Dict:
+    """Versión asíncrona de ejecutar_comparacion_ia (la comparación debe venir con id_modelo_ia y lenguaje)"""
+    if not comparacion.id_modelo_ia:
+        raise ErrorComparacionIA('La comparación no tiene un modelo de IA asignado', status=400)
+
+    similitud_local = similitud_local_comparacion(comparacion)
+
+    if similitud_local['omitir_ia']:
+        return await sync_to_async(resultado_solo_local)(comparacion, similitud_local)
+
+    candidatos = await aresolver_candidatos(comparacion.id_modelo_ia)
+    lenguaje = lenguaje_comparacion(comparacion)
+
+    async def aintentar(candidato, timeout):
+        modelo_ia, adaptador, config, prompt_config = candidato
+        resultado_ia = await acomparar_codigos_ia(
+            adaptador, config, prompt_config, comparacion.codigo_1, comparacion.codigo_2, timeout, lenguaje
+        )
+        if not resultado_ia['desde_cache']:
+            registrar_latencia(modelo_ia.id, resultado_ia['tiempo_respuesta'])
+        return resultado_ia
+
+    (modelo_ia, adaptador, config, prompt_config), resultado_ia, informe = await aejecutar_con_respaldo(
+        candidatos, aintentar, bool(comparacion.id_modelo_ia.cobertura_activa)
+    )
+
+    return con_informe_respaldo(await sync_to_async(guardar_resultado_comparacion)(
+        comparacion, adaptador, config, prompt_config, resultado_ia, similitud_local, modelo_ia=modelo_ia
+    ), candidatos, informe)
+
+
+def con_informe_respaldo(resultado: Dict, candidatos: List[Tuple], informe: Dict) -> Dict:
+    """Agrega a la respuesta qué modelo contestó cuando el modelo tiene respaldos"""
+    if len(candidatos) > 1:
+        resultado['respaldo'] = informe
+    return resultado
+
+
+def lenguaje_comparacion(comparacion) -> str:
+    """Nombre normalizado del lenguaje de la comparación (para quitar comentarios y tokenizar)"""
+    return resolver_lenguaje(comparacion.lenguaje.nombre, comparacion.lenguaje.extension)
+
+
+def similitud_local_comparacion(comparacion) -> Dict:
+    """Similitud por huellas del par, con el lenguaje de la comparación"""
+    return comparar_local(comparacion.codigo_1, comparacion.codigo_2, lenguaje_comparacion(comparacion))
+
+
+def guardar_resultado_comparacion(comparacion, adaptador, config, prompt_config,
+                                  resultado_ia: Dict, similitud_local: Dict, modelo_ia=None) -> Dict:
+    """Guarda el resultado de la IA (si trae porcentaje) y retorna la respuesta completa.
+
+    modelo_ia permite guardar la opinión de un modelo distinto al asignado a la comparación.
+    """
+    modelo_ia = modelo_ia or comparacion.id_modelo_ia
+    respuesta_ia = resultado_ia['respuesta_ia']
+    porcentaje_similitud = resultado_ia['porcentaje_similitud']
+
+    if porcentaje_similitud is not None:
+        similitud_local['diferencia_con_ia'] = porcentaje_similitud - similitud_local['porcentaje_similitud']
+
+    # 1. Guardar en la base de datos
+    if porcentaje_similitud is not None:
+        # Eliminar el resultado anterior del mismo modelo (y el local, que queda reemplazado)
+        ResultadosSimilitudIndividual.objects.filter(
+            Q(id_modelo_ia=modelo_ia) | Q(id_modelo_ia__isnull=True),
+            id_comparacion_individual=comparacion
+        ).delete()
+
+        # Crear nuevo resultado
+        ResultadosSimilitudIndividual.objects.create(
+            id_comparacion_individual=comparacion,
+            id_modelo_ia=modelo_ia,
+            porcentaje_similitud=porcentaje_similitud,
+            explicacion=respuesta_ia
+        )
+
+        mensaje_guardado = 'Resultado guardado exitosamente'
+    else:
+        mensaje_guardado = 'No se pudo extraer el porcentaje de similitud. Respuesta no guardada.'
+
+    # 2. Retornar resultado
+    return {
+        'mensaje': 'Comparación exitosa',
+        'origen': 'ia',
+        'guardado': mensaje_guardado,
+        'comparacion_id': comparacion.id,
+        'modelo_usado': modelo_ia.nombre,
+        'proveedor': adaptador.nombre,
+        'model_name': config.model_name,
+        'prompt_usado': {
+            'version': prompt_config.version,
+            'descripcion': prompt_config.descripcion
+        },
+        'tiempo_respuesta_segundos': round(resultado_ia['tiempo_respuesta'], 2),
+        'tokens_usados': resultado_ia['tokens_usados'],
+        'tokens_cache': resultado_ia.get('tokens_cache'),
+        'compactacion': resultado_ia.get('compactacion'),
+        'desde_cache': resultado_ia['desde_cache'],
+        'porcentaje_similitud': porcentaje_similitud,
+        'respuesta_ia': respuesta_ia,
+        'similitud_local': similitud_local,
+        'codigos_comparados': {
+            'codigo_1': comparacion.codigo_1[:100] + '...' if len(comparacion.codigo_1) > 100 else comparacion.codigo_1,
+            'codigo_2': comparacion.codigo_2[:100] + '...' if len(comparacion.codigo_2) > 100 else comparacion.codigo_2
+        }
+    }
+
+
+def explicacion_solo_local(similitud_local: Dict) -> str:
+    """Explicación guardada cuando el par es claramente idéntico o sin relación y no se consultó a la IA"""
+    if similitud_local['veredicto'] == 'identico':
+        explicacion = 'Los códigos son prácticamente idénticos tras normalizar nombres, literales y comentarios.'
+    else:
+        explicacion = 'Los códigos no comparten fragmentos de estructura; no se consultó a la IA.'
+
+    return explicacion + f" SIMILITUD GENERAL: {similitud_local['porcentaje_similitud']}%"
+
+
+def resultado_solo_local(comparacion, similitud_local: Dict) -> Dict:
+    """Guarda la similitud local cuando el par es claramente idéntico o sin relación"""
+    explicacion = explicacion_solo_local(similitud_local)
+
+    ResultadosSimilitudIndividual.objects.filter(
+        id_comparacion_individual=comparacion
+    ).delete()
+
+    ResultadosSimilitudIndividual.objects.create(
+        id_comparacion_individual=comparacion,
+        porcentaje_similitud=similitud_local['porcentaje_similitud'],
+        explicacion=explicacion
+    )
+
+    return {
+        'mensaje': 'Comparación exitosa',
+        'origen': 'local',
+        'guardado': 'Resultado guardado exitosamente',
+        'comparacion_id': comparacion.id,
+        'modelo_usado': comparacion.id_modelo_ia.nombre,
+        'tiempo_respuesta_segundos': round(similitud_local['tiempo_ms'] / 1000, 2),
+        'tokens_usados': 0,
+        'desde_cache': False,
+        'porcentaje_similitud': similitud_local['porcentaje_similitud'],
+        'respuesta_ia': explicacion,
+        'similitud_local': similitud_local,
+        'codigos_comparados': {
+            'codigo_1': comparacion.codigo_1[:100] + '...' if len(comparacion.codigo_1) > 100 else comparacion.codigo_1,
+            'codigo_2': comparacion.codigo_2[:100] + '...' if len(comparacion.codigo_2) > 100 else comparacion.codigo_2
+        }
+    }
+
+
+def extraer_porcentaje_similitud(respuesta_ia: str):
+    """Extrae el número que la IA escribe después de 'SIMILITUD GENERAL:'"""
+    patron_similitud = r'SIMILITUD GENERAL:\s*(\d+)'
+    match = re.search(patron_similitud, respuesta_ia, re.IGNORECASE)
+
+    if match:
+        return int(match.group(1))
+
+    # Si no encuentra el patrón, intentar otros formatos comunes
+    patron_alternativo = r'similitud general[:\s]*(\d+)%?'
+    match_alt = re.search(patron_alternativo, respuesta_ia, re.IGNORECASE)
+    if match_alt:
+        return int(match_alt.group(1))
+
+    return None
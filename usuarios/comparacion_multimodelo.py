@@ -0,0 +1,254 @@
+import asyncio
+import json
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from usuarios.comparacion_ia import (
+    ErrorComparacionIA,
+    acomparar_codigos_ia,
+    aresolver_configuracion_comparacion,
+    comparar_codigos_ia,
+    explicacion_solo_local,
+    guardar_resultado_comparacion,
+    lenguaje_comparacion,
+    resolver_configuracion_comparacion,
+    similitud_local_comparacion,
+)
+from usuarios.limites_proveedor import en_hilo
+from usuarios.models import ResultadosSimilitudIndividual
+
+
+def configuracion_multimodelo() -> dict:
+    """Configuración de la comparación con varios modelos con valores por defecto"""
+    config = {
+        'MAX_MODELOS': 8,
+    }
+    config.update(getattr(settings, 'COMPARACION_MULTIMODELO', {}))
+    return config
+
+
+def agregar_porcentajes(porcentajes: List[int]) -> Dict:
+    """Media, mediana y dispersión de los porcentajes de los modelos que respondieron"""
+    if not porcentajes:
+        return None
+
+    return {
+        'modelos_con_porcentaje': len(porcentajes),
+        'media': round(statistics.mean(porcentajes), 2),
+        'mediana': statistics.median(porcentajes),
+        'desviacion_estandar': round(statistics.pstdev(porcentajes), 2),
+        'minimo': min(porcentajes),
+        'maximo': max(porcentajes),
+        'rango': max(porcentajes) - min(porcentajes),
+    }
+
+
+def _armar_respuesta(comparacion, resultados: List[Dict], errores: List[Dict], similitud_local: Dict) -> Dict:
+    porcentajes = [
+        resultado['porcentaje_similitud'] for resultado in resultados
+        if resultado['porcentaje_similitud'] is not None
+    ]
+
+    return {
+        'mensaje': 'Comparación con varios modelos completada',
+        'comparacion_id': comparacion.id,
+        'agregado': agregar_porcentajes(porcentajes),
+        'resultados': resultados,
+        'errores': errores,
+        'similitud_local': similitud_local,
+        # Las llamadas son simultáneas: la espera total es la del modelo más lento
+        'tiempo_respuesta_segundos': max((resultado['tiempo_respuesta_segundos'] for resultado in resultados), default=0),
+    }
+
+
+def _error_modelo(modelo_ia, mensaje: str, status: int = 500) -> Dict:
+    return {'modelo_ia_id': modelo_ia.id, 'modelo_usado': modelo_ia.nombre, 'error': mensaje, 'status': status}
+
+
+def resultado_solo_local_multimodelo(comparacion, modelos: List, similitud_local: Dict) -> Dict:
+    """Par claramente idéntico o sin relación: cada modelo pedido queda con la similitud local,
+    sin tocar los resultados de los demás modelos de la comparación"""
+    explicacion = explicacion_solo_local(similitud_local)
+    porcentaje = similitud_local['porcentaje_similitud']
+
+    with transaction.atomic():
+        # El resultado local sin modelo queda reemplazado, igual que al guardar una opinión de la IA
+        ResultadosSimilitudIndividual.objects.filter(
+            Q(id_modelo_ia__in=modelos) | Q(id_modelo_ia__isnull=True),
+            id_comparacion_individual=comparacion
+        ).delete()
+        ResultadosSimilitudIndividual.objects.bulk_create([
+            ResultadosSimilitudIndividual(
+                id_comparacion_individual=comparacion,
+                id_modelo_ia=modelo_ia,
+                porcentaje_similitud=porcentaje,
+                explicacion=explicacion
+            )
+            for modelo_ia in modelos
+        ])
+
+    resultados = [
+        {
+            'origen': 'local',
+            'guardado': 'Resultado guardado exitosamente',
+            'modelo_ia_id': modelo_ia.id,
+            'modelo_usado': modelo_ia.nombre,
+            'tiempo_respuesta_segundos': round(similitud_local['tiempo_ms'] / 1000, 2),
+            'tokens_usados': 0,
+            'desde_cache': False,
+            'porcentaje_similitud': porcentaje,
+            'respuesta_ia': explicacion,
+            'diferencia_con_local': 0,
+        }
+        for modelo_ia in modelos
+    ]
+
+    return _armar_respuesta(comparacion, resultados, [], similitud_local)
+
+
+def ejecutar_comparacion_multimodelo(comparacion, modelos: List) -> Dict:
+    """Consulta la comparación con todos los modelos a la vez y guarda un resultado por modelo"""
+    # 1. Similitud local: si el par es claro ningún modelo necesita opinar
+    similitud_local = similitud_local_comparacion(comparacion)
+
+    if similitud_local['omitir_ia']:
+        return resultado_solo_local_multimodelo(comparacion, modelos, similitud_local)
+
+    # 2. Configuración activa de cada modelo (los que no tienen quedan como error)
+    configuraciones = []
+    errores = []
+
+    for modelo_ia in modelos:
+        try:
+            configuraciones.append((modelo_ia, *resolver_configuracion_comparacion(modelo_ia)))
+        except ErrorComparacionIA as e:
+            errores.append(_error_modelo(modelo_ia, e.mensaje, e.status))
+
+    # 3. Un hilo por modelo: las esperas al proveedor se solapan
+    resultados = []
+    lenguaje = lenguaje_comparacion(comparacion)
+
+    if configuraciones:
+        with ThreadPoolExecutor(max_workers=len(configuraciones)) as ejecutor:
+            futuros = [
+                ejecutor.submit(
+                    en_hilo(comparar_codigos_ia),
+                    adaptador, config, prompt_config,
+                    comparacion.codigo_1, comparacion.codigo_2,
+                    lenguaje=lenguaje
+                )
+                for _, adaptador, config, prompt_config in configuraciones
+            ]
+
+            # 4. Guardar en este hilo (la conexión a la BD es del hilo de la petición)
+            for (modelo_ia, adaptador, config, prompt_config), futuro in zip(configuraciones, futuros):
+                try:
+                    resultado_ia = futuro.result()
+                except ErrorComparacionIA as e:
+                    errores.append(_error_modelo(modelo_ia, e.mensaje, e.status))
+                    continue
+                except requests.RequestException as e:
+                    errores.append(_error_modelo(modelo_ia, f'Error en la petición HTTP: {str(e)}', 502))
+                    continue
+
+                resultados.append(_resultado_modelo(
+                    comparacion, modelo_ia, adaptador, config, prompt_config, resultado_ia, similitud_local
+                ))
+
+    return _armar_respuesta(comparacion, resultados, errores, similitud_local)
+
+
+async def aejecutar_comparacion_multimodelo(comparacion, modelos: List) -> Dict:
+    """Versión asíncrona: las llamadas se lanzan juntas con asyncio.gather"""
+    similitud_local = similitud_local_comparacion(comparacion)
+
+    if similitud_local['omitir_ia']:
+        return await sync_to_async(resultado_solo_local_multimodelo)(comparacion, modelos, similitud_local)
+
+    configuraciones = []
+    errores = []
+
+    for modelo_ia in modelos:
+        try:
+            configuraciones.append((modelo_ia, *await aresolver_configuracion_comparacion(modelo_ia)))
+        except ErrorComparacionIA as e:
+            errores.append(_error_modelo(modelo_ia, e.mensaje, e.status))
+
+    lenguaje = lenguaje_comparacion(comparacion)
+    respuestas = await asyncio.gather(*(
+        acomparar_codigos_ia(
+            adaptador, config, prompt_config, comparacion.codigo_1, comparacion.codigo_2, lenguaje=lenguaje
+        )
+        for _, adaptador, config, prompt_config in configuraciones
+    ), return_exceptions=True)
+
+    resultados = []
+
+    for (modelo_ia, adaptador, config, prompt_config), resultado_ia in zip(configuraciones, respuestas):
+        if isinstance(resultado_ia, ErrorComparacionIA):
+            errores.append(_error_modelo(modelo_ia, resultado_ia.mensaje, resultado_ia.status))
+            continue
+        if isinstance(resultado_ia, httpx.HTTPError):
+            errores.append(_error_modelo(modelo_ia, f'Error en la petición HTTP: {str(resultado_ia)}', 502))
+            continue
+        if isinstance(resultado_ia, BaseException):
+            raise resultado_ia
+
+        resultados.append(await sync_to_async(_resultado_modelo)(
+            comparacion, modelo_ia, adaptador, config, prompt_config, resultado_ia, similitud_local
+        ))
+
+    return _armar_respuesta(comparacion, resultados, errores, similitud_local)
+
+
+def _resultado_modelo(comparacion, modelo_ia, adaptador, config, prompt_config,
+                      resultado_ia: Dict, similitud_local: Dict) -> Dict:
+    """Guarda la opinión del modelo y deja solo lo propio de él (lo común va una vez en la respuesta)"""
+    resultado = guardar_resultado_comparacion(
+        comparacion, adaptador, config, prompt_config, resultado_ia, dict(similitud_local), modelo_ia=modelo_ia
+    )
+    resultado['modelo_ia_id'] = modelo_ia.id
+    resultado['diferencia_con_local'] = resultado['similitud_local'].get('diferencia_con_ia')
+
+    for campo in ('mensaje', 'comparacion_id', 'codigos_comparados', 'similitud_local'):
+        resultado.pop(campo, None)
+
+    return resultado
+
+
+def leer_ids_modelos(cuerpo: bytes) -> List[int]:
+    """Lee {"modelos": [ids]} del body; sin repetidos y respetando el máximo configurado"""
+    try:
+        data = json.loads(cuerpo or b'{}')
+    except json.JSONDecodeError:
+        raise ErrorComparacionIA('JSON inválido en el body', status=400)
+
+    ids = data.get('modelos') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        raise ErrorComparacionIA('El campo modelos debe ser una lista de IDs de modelos de IA', status=400)
+
+    ids = list(dict.fromkeys(ids))
+    max_modelos = configuracion_multimodelo()['MAX_MODELOS']
+    if len(ids) > max_modelos:
+        raise ErrorComparacionIA(f'Máximo {max_modelos} modelos por comparación', status=400)
+
+    return ids
+
+
+def ordenar_modelos(ids: List[int], modelos: List) -> List:
+    """Modelos en el orden pedido; falla si alguno no existe o está inactivo"""
+    por_id = {modelo.id: modelo for modelo in modelos}
+    faltantes = [id_modelo for id_modelo in ids if id_modelo not in por_id]
+
+    if faltantes:
+        raise ErrorComparacionIA('Modelos de IA no encontrados o inactivos', status=404, detalle=faltantes)
+
+    return [por_id[id_modelo] for id_modelo in ids]
@@ -0,0 +1,234 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from usuarios.analisis_big_o import (
+    LENGUAJES_SOPORTADOS,
+    VERSION_ANALIZADOR,
+    analizar_codigo_big_o,
+    determinar_ganador,
+    resolver_lenguaje,
+)
+from usuarios.cache_big_o import clave_analisis, guardar_analisis, normalizar_codigo, obtener_analisis
+from usuarios.models import HistorialEficienciaIndividual, ResultadosEficienciaIndividual
+
+# Columnas que se reemplazan cuando la comparación ya tiene resultado para la versión actual
+CAMPOS_ACTUALIZABLES = [
+    'codigo_1_complejidad_temporal',
+    'codigo_1_complejidad_espacial',
+    'codigo_1_nivel_anidamiento',
+    'codigo_1_patrones_detectados',
+    'codigo_1_estructuras_datos',
+    'codigo_1_confianza_analisis',
+    'codigo_2_complejidad_temporal',
+    'codigo_2_complejidad_espacial',
+    'codigo_2_nivel_anidamiento',
+    'codigo_2_patrones_detectados',
+    'codigo_2_estructuras_datos',
+    'codigo_2_confianza_analisis',
+    'ganador',
+    'lenguaje',
+    'lenguaje_analizado',
+    'fecha_analisis',
+]
+
+_pool = None
+_candado_pool = threading.Lock()
+
+
+def configuracion_analisis() -> dict:
+    """Configuración del análisis Big O en paralelo con valores por defecto"""
+    config = {
+        'PROCESOS': None,
+        'MIN_CARACTERES_PARALELO': 16384,
+        'MAX_LOTE': 500,
+        'CONTEXTO': 'spawn',
+    }
+    config.update(getattr(settings, 'ANALISIS_BIG_O', {}))
+    config['PROCESOS'] = config['PROCESOS'] or os.cpu_count() or 1
+    return config
+
+
+def obtener_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido por el proceso web, creado la primera vez que se usa"""
+    global _pool
+
+    with _candado_pool:
+        if _pool is None:
+            config = configuracion_analisis()
+            _pool = ProcessPoolExecutor(
+                max_workers=config['PROCESOS'],
+                mp_context=multiprocessing.get_context(config['CONTEXTO'])
+            )
+        return _pool
+
+
+def cerrar_pool() -> None:
+    global _pool
+
+    with _candado_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(cerrar_pool)
+
+
+def analizar_codigos(tareas: List[Tuple[str, str]]) -> List[Dict]:
+    """Analiza pares (código, lenguaje) manteniendo el orden; solo se calculan los que no están en caché"""
+    claves = []
+    resultados = {}
+    pendientes = {}
+
+    # 1. Buscar cada código en la caché (un mismo código repetido en el lote se analiza una vez)
+    for codigo, lenguaje in tareas:
+        codigo_normalizado = normalizar_codigo(codigo)
+        clave = clave_analisis(codigo_normalizado, lenguaje)
+        claves.append(clave)
+
+        if clave in resultados or clave in pendientes:
+            continue
+
+        analisis = obtener_analisis(clave)
+        if analisis is None:
+            pendientes[clave] = (codigo_normalizado, lenguaje)
+        else:
+            resultados[clave] = analisis
+
+    # 2. Analizar los faltantes y guardarlos
+    nuevos = _analizar_en_pool(list(pendientes.values()))
+    for clave, analisis in zip(pendientes, nuevos):
+        guardar_analisis(clave, analisis)
+        resultados[clave] = analisis
+
+    return [resultados[clave] for clave in claves]
+
+
+def _analizar_en_pool(tareas: List[Tuple[str, str]]) -> List[Dict]:
+    """Reparte los análisis entre los núcleos; mantiene el orden"""
+    if not tareas:
+        return []
+
+    config = configuracion_analisis()
+    total_caracteres = sum(len(codigo) for codigo, _ in tareas)
+
+    # Para códigos chicos cuesta más enviar el trabajo a otro proceso que analizarlo
+    if len(tareas) < 2 or config['PROCESOS'] < 2 or total_caracteres < config['MIN_CARACTERES_PARALELO']:
+        return [analizar_codigo_big_o(codigo, lenguaje) for codigo, lenguaje in tareas]
+
+    tamano_bloque = max(1, len(tareas) // (config['PROCESOS'] * 4))
+
+    codigos, lenguajes = zip(*tareas)
+
+    # Los procesos solo importan analisis_big_o (sin Django), por eso se envía la función directamente
+    try:
+        return list(obtener_pool().map(analizar_codigo_big_o, codigos, lenguajes, chunksize=tamano_bloque))
+    except BrokenProcessPool:
+        # Un proceso del pool murió: se recrea en la próxima llamada y esta se resuelve aquí
+        cerrar_pool()
+        return [analizar_codigo_big_o(codigo, lenguaje) for codigo, lenguaje in tareas]
+
+
+def analizar_eficiencia_comparaciones(comparaciones) -> Tuple[List[Dict], List[Dict]]:
+    """Analiza ambos códigos de cada comparación y deja una fila vigente por comparación y versión"""
+    analizables = []
+    omitidas = []
+
+    # 1. Resolver el lenguaje de cada comparación (una sola vez por comparación)
+    for comparacion in {comparacion.id: comparacion for comparacion in comparaciones}.values():
+        lenguaje = resolver_lenguaje(comparacion.lenguaje.nombre, comparacion.lenguaje.extension)
+        if not lenguaje:
+            omitidas.append({
+                'comparacion_id': comparacion.id,
+                'advertencia': f'Lenguaje "{comparacion.lenguaje.nombre}" no completamente soportado.'
+            })
+            continue
+        analizables.append((comparacion, lenguaje))
+
+    # 2. Analizar todos los códigos (dos por comparación) en el pool
+    tareas = []
+    for comparacion, lenguaje in analizables:
+        tareas.append((comparacion.codigo_1, lenguaje))
+        tareas.append((comparacion.codigo_2, lenguaje))
+
+    analisis = analizar_codigos(tareas)
+
+    # 3. Armar las filas y las respuestas
+    filas = []
+    historial = []
+    resultados = []
+    fecha_analisis = timezone.now()
+
+    for posicion, (comparacion, lenguaje) in enumerate(analizables):
+        analisis_1 = analisis[2 * posicion]
+        analisis_2 = analisis[2 * posicion + 1]
+
+        ganador = determinar_ganador(
+            analisis_1['complejidad_temporal'],
+            analisis_2['complejidad_temporal']
+        )
+
+        filas.append(ResultadosEficienciaIndividual(
+            id_comparacion_individual_id=comparacion.id,
+            codigo_1_complejidad_temporal=analisis_1['complejidad_temporal'],
+            codigo_1_complejidad_espacial=analisis_1['complejidad_espacial'],
+            codigo_1_nivel_anidamiento=analisis_1['nivel_anidamiento'],
+            codigo_1_patrones_detectados=analisis_1['patrones_detectados'],
+            codigo_1_estructuras_datos=analisis_1['estructuras_datos'],
+            codigo_1_confianza_analisis=analisis_1['confianza_analisis'],
+            codigo_2_complejidad_temporal=analisis_2['complejidad_temporal'],
+            codigo_2_complejidad_espacial=analisis_2['complejidad_espacial'],
+            codigo_2_nivel_anidamiento=analisis_2['nivel_anidamiento'],
+            codigo_2_patrones_detectados=analisis_2['patrones_detectados'],
+            codigo_2_estructuras_datos=analisis_2['estructuras_datos'],
+            codigo_2_confianza_analisis=analisis_2['confianza_analisis'],
+            ganador=ganador,
+            lenguaje=comparacion.lenguaje.nombre,
+            lenguaje_analizado=LENGUAJES_SOPORTADOS[lenguaje]['nombre'],
+            version_analizador=VERSION_ANALIZADOR,
+            fecha_analisis=fecha_analisis
+        ))
+
+        historial.append(HistorialEficienciaIndividual(
+            id_comparacion_individual_id=comparacion.id,
+            version_analizador=VERSION_ANALIZADOR,
+            codigo_1_complejidad_temporal=analisis_1['complejidad_temporal'],
+            codigo_2_complejidad_temporal=analisis_2['complejidad_temporal'],
+            ganador=ganador,
+            fecha_analisis=fecha_analisis
+        ))
+
+        resultados.append({
+            'comparacion_id': comparacion.id,
+            'codigo_1': analisis_1,
+            'codigo_2': analisis_2,
+            'ganador': ganador,
+            'lenguaje': comparacion.lenguaje.nombre,
+            'lenguaje_analizado': LENGUAJES_SOPORTADOS[lenguaje]['nombre']
+        })
+
+    # 4. INSERT ... ON CONFLICT DO UPDATE: repetir el análisis reemplaza la fila en lugar de
+    #    acumular otra (PostgreSQL devuelve el ID de la fila insertada o actualizada)
+    with transaction.atomic():
+        ResultadosEficienciaIndividual.objects.bulk_create(
+            filas,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['id_comparacion_individual', 'version_analizador'],
+            update_fields=CAMPOS_ACTUALIZABLES
+        )
+        HistorialEficienciaIndividual.objects.bulk_create(historial, batch_size=500)
+
+    for resultado, fila in zip(resultados, filas):
+        resultado['resultado_id'] = fila.id_resultado_eficiencia_individual
+
+    return resultados, omitidas
@@ -0,0 +1,122 @@
+import hashlib
+from io import BytesIO
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.signing import Signer
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional: sin él no se generan miniaturas
+    Image = None
+
+# Firmas de los formatos que se aceptan (SVG no: puede traer scripts)
+FIRMAS_IMAGEN = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+class ErrorImagenModelo(Exception):
+    """Imagen subida inválida (formato o tamaño)"""
+
+    def __init__(self, mensaje):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = 400
+
+    def como_dict(self) -> Dict:
+        return {'error': self.mensaje}
+
+
+def configuracion_imagenes() -> dict:
+    """Configuración de las imágenes de los modelos con valores por defecto"""
+    config = {
+        'TAMANO_MAXIMO': 2 * 1024 * 1024,
+        'MINIATURAS': True,
+        'LADO_MINIATURA': 128,
+        'MAX_AGE_VERSIONADA': 60 * 60 * 24 * 365,
+        'MAX_AGE': 300,
+    }
+    config.update(getattr(settings, 'IMAGENES_MODELOS', {}))
+    return config
+
+
+def tipo_imagen(datos: bytes) -> Optional[str]:
+    """Content-Type según los primeros bytes, o None si no es un formato aceptado"""
+    for firma, tipo in FIRMAS_IMAGEN:
+        if datos.startswith(firma):
+            return tipo
+    if datos[:4] == b'RIFF' and datos[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def huella_imagen(datos: bytes) -> str:
+    return hashlib.sha256(datos).hexdigest()
+
+
+def generar_miniatura(datos: bytes) -> Optional[bytes]:
+    """PNG reducido al lado configurado; None sin Pillow o si la imagen ya es chica"""
+    config = configuracion_imagenes()
+    if Image is None or not config['MINIATURAS']:
+        return None
+
+    lado = config['LADO_MINIATURA']
+    try:
+        with Image.open(BytesIO(datos)) as imagen:
+            if imagen.width <= lado and imagen.height <= lado:
+                return None
+            imagen.thumbnail((lado, lado))
+            salida = BytesIO()
+            imagen.save(salida, format='PNG', optimize=True)
+            return salida.getvalue()
+    except (OSError, ValueError):
+        return None
+
+
+def campos_imagen(archivo) -> Dict:
+    """Columnas de modelos_ia para la imagen subida ({} si no se subió ninguna)"""
+    if archivo is None:
+        return {}
+
+    config = configuracion_imagenes()
+    if archivo.size > config['TAMANO_MAXIMO']:
+        raise ErrorImagenModelo(f"La imagen supera el máximo de {config['TAMANO_MAXIMO'] // 1024} KB")
+
+    datos = archivo.read()
+    if tipo_imagen(datos) is None:
+        raise ErrorImagenModelo('La imagen debe ser PNG, JPEG, GIF o WEBP')
+
+    return {
+        'imagen_ia': datos,
+        'imagen_hash': huella_imagen(datos),
+        'imagen_miniatura': generar_miniatura(datos),
+        'fecha_imagen': timezone.now(),
+    }
+
+
+def _firma_imagen(id_modelo: int, version: str, miniatura: bool) -> str:
+    return Signer(salt='usuarios.imagen_modelo').signature(f'{id_modelo}:{version}:{int(miniatura)}')
+
+
+def url_imagen(id_modelo: int, imagen_hash: Optional[str], miniatura: bool = False) -> Optional[str]:
+    """URL versionada con la huella: cambia cuando cambia la imagen y se puede cachear sin revalidar.
+    Va firmada: solo la conoce quien recibió el modelo en un listado que tiene permitido ver."""
+    if not imagen_hash:
+        return None
+
+    version = imagen_hash[:16]
+    url = f"{reverse('obtener_imagen_modelo', args=[id_modelo])}?v={version}"
+    if miniatura:
+        url += '&miniatura=1'
+    return f'{url}&firma={_firma_imagen(id_modelo, version, miniatura)}'
+
+
+def firma_imagen_valida(id_modelo: int, version: str, miniatura: bool, firma: str) -> bool:
+    return bool(version and firma) and constant_time_compare(firma, _firma_imagen(id_modelo, version, miniatura))
@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from usuarios.models import (
+    CodigosFuente,
+    ComentariosEficienciaIndividual,
+    ComparacionesGrupales,
+    ComparacionesIndividuales,
+    ModelosIa,
+    ResultadosEficienciaGrupal,
+    ResultadosEficienciaIndividual,
+    ResultadosSimilitudGrupal,
+    ResultadosSimilitudIndividual,
+)
+from usuarios.paginacion import ordenar_por_cursor
+
+# Cursor de ejemplo para revisar el plan de las páginas siguientes a la primera
+CURSOR_EJEMPLO = (datetime(2100, 1, 1, tzinfo=timezone.utc), 2 ** 31 - 1)
+
+
+def consultas_frecuentes(valor: int) -> List[Dict]:
+    """Consultas de los listados y páginas de resultados con el índice que debe resolverlas.
+
+    valor es el id del usuario o de la comparación que se consulta. 'solo_indice' marca los
+    listados que el índice cubre con INCLUDE: en PostgreSQL deben resolverse con Index Only Scan.
+    """
+    return [
+        {
+            'nombre': 'listar_comparaciones_individuales',
+            'indice': 'idx_comparaciones_individuales_usuario_cursor',
+            'solo_indice': True,
+            'consulta': ordenar_por_cursor(
+                ComparacionesIndividuales.objects.filter(usuario_id=valor).values(
+                    'id', 'nombre_comparacion', 'fecha_creacion', 'estado'
+                ), '-fecha_creacion', CURSOR_EJEMPLO
+            )[:50],
+        },
+        {
+            'nombre': 'listar_comparaciones_grupales',
+            'indice': 'idx_comparaciones_grupales_usuario_cursor',
+            'solo_indice': True,
+            'consulta': ordenar_por_cursor(
+                ComparacionesGrupales.objects.filter(usuario_id=valor).values(
+                    'id', 'nombre_comparacion', 'fecha_creacion', 'estado'
+                ), '-fecha_creacion', CURSOR_EJEMPLO
+            )[:50],
+        },
+        {
+            'nombre': 'listar_comparaciones_admin',
+            'indice': 'idx_comparaciones_individuales_cursor',
+            'consulta': ordenar_por_cursor(
+                ComparacionesIndividuales.objects.defer('codigo_1', 'codigo_2'), '-fecha_creacion', CURSOR_EJEMPLO
+            )[:50],
+        },
+        {
+            'nombre': 'resultados_similitud_individual',
+            'indice': 'idx_resultados_similitud_individual_comparacion',
+            'consulta': ResultadosSimilitudIndividual.objects.filter(id_comparacion_individual=valor),
+        },
+        {
+            'nombre': 'resultados_eficiencia_individual',
+            'indice': 'uq_resultados_eficiencia_individual_version',
+            'consulta': ResultadosEficienciaIndividual.objects.filter(
+                id_comparacion_individual=valor
+            ).order_by('-version_analizador')[:1],
+        },
+        {
+            'nombre': 'comentarios_eficiencia_individual',
+            'indice': 'idx_comentarios_eficiencia_individual_resultado',
+            'consulta': ComentariosEficienciaIndividual.objects.filter(id_resultado_eficiencia_individual=valor),
+        },
+        {
+            'nombre': 'codigos_fuente',
+            'indice': 'idx_codigos_fuente_comparacion_orden',
+            'consulta': CodigosFuente.objects.filter(comparacion_grupal_id=valor).order_by('orden'),
+        },
+        {
+            'nombre': 'listar_modelos_usuario',
+            'indice': 'idx_modelos_ia_usuario_activos_cursor',
+            'consulta': ordenar_por_cursor(
+                ModelosIa.objects.filter(id_usuario=valor, activo=True).values('id', 'nombre', 'fecha_creacion'),
+                '-fecha_creacion', CURSOR_EJEMPLO
+            )[:50],
+        },
+        {
+            'nombre': 'resultados_similitud_grupal',
+            'indice': 'idx_resultados_similitud_grupal_comparacion',
+            'consulta': ResultadosSimilitudGrupal.objects.filter(
+                comparacion_grupal_id=valor
+            ).order_by('-porcentaje_similitud'),
+        },
+        {
+            'nombre': 'resultados_eficiencia_grupal',
+            'indice': 'idx_resultados_eficiencia_grupal_comparacion',
+            'consulta': ResultadosEficienciaGrupal.objects.filter(
+                comparacion_grupal_id=valor
+            ).order_by('-puntuacion_eficiencia'),
+        },
+    ]
+
+
+def _columna(columna: str, quote) -> str:
+    descendente = columna.startswith('-')
+    nombre = quote(columna.lstrip('-'))
+    return f'{nombre} DESC' if descendente else nombre
+
+
+def sql_crear_indice(indice: Dict, vendor: str, quote) -> str:
+    """CREATE INDEX del índice; en PostgreSQL sin bloquear las escrituras (CONCURRENTLY).
+
+    indice trae 'nombre', 'tabla' y 'columnas' ('-' adelante es DESC); 'incluir' agrega columnas
+    para que la consulta se resuelva solo con el índice (INCLUDE solo existe en PostgreSQL),
+    'condicion' lo hace parcial y 'unico' lo crea UNIQUE. Las migraciones guardan su propia copia de estas definiciones,
+    con los nombres de tablas y columnas de ese momento.
+    """
+    columnas = ', '.join(_columna(columna, quote) for columna in indice['columnas'])
+    concurrente = 'CONCURRENTLY ' if vendor == 'postgresql' else ''
+    unico = 'UNIQUE ' if indice.get('unico') else ''
+    sql = f"CREATE {unico}INDEX {concurrente}IF NOT EXISTS {quote(indice['nombre'])} ON {quote(indice['tabla'])} ({columnas})"
+
+    if indice.get('incluir') and vendor == 'postgresql':
+        sql += f" INCLUDE ({', '.join(_columna(columna, quote) for columna in indice['incluir'])})"
+    if indice.get('condicion'):
+        sql += f" WHERE {indice['condicion']}"
+
+    return sql
+
+
+def sql_borrar_indice(indice: Dict, vendor: str, quote) -> str:
+    concurrente = 'CONCURRENTLY ' if vendor == 'postgresql' else ''
+    return f"DROP INDEX {concurrente}IF EXISTS {quote(indice['nombre'])}"
+
+
+def ejecutar_indices(schema_editor, crear: List[Dict], borrar: List[Dict]) -> None:
+    """Para las operaciones RunPython: crea los índices que falten y después borra los reemplazados"""
+    conexion = schema_editor.connection
+    for indice in crear:
+        schema_editor.execute(sql_crear_indice(indice, conexion.vendor, schema_editor.quote_name))
+    for indice in borrar:
+        schema_editor.execute(sql_borrar_indice(indice, conexion.vendor, schema_editor.quote_name))
@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from usuarios.compactacion_prompt import estimar_tokens_texto
+from usuarios.models import CuposProveedorIa, LlamadasEnCursoIa
+
+
+def configuracion_limites() -> dict:
+    """Configuración del limitador de llamadas a los proveedores con valores por defecto"""
+    config = {
+        'ESPERA_MAXIMA': 10,
+        'INTERVALO_ESPERA': 0.25,
+        'MARGEN_VENCIMIENTO': 30,
+    }
+    config.update(getattr(settings, 'LIMITES_PROVEEDORES_IA', {}))
+    return config
+
+
+def en_hilo(funcion: Callable) -> Callable:
+    """Envuelve lo que se envía a un ThreadPoolExecutor: el limitador reserva y libera cupos en la
+    BD desde ese hilo, que abre su propia conexión; se cierra al terminar para no dejarla abierta"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        close_old_connections()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            connection.close()
+
+    return envoltura
+
+
+class Cupo:
+    """Llamada autorizada al proveedor; al liberarla se corrigen los tokens con los realmente usados"""
+
+    def __init__(self, clave: Optional[str] = None, tokens_reservados: int = 0, id_llamada: Optional[int] = None):
+        self.clave = clave
+        self.tokens_reservados = tokens_reservados
+        self.id_llamada = id_llamada
+        self.liberado = clave is None
+        # La cobertura puede liberar el cupo de la llamada perdedora desde otro hilo
+        self._candado = threading.Lock()
+
+    def liberar(self, tokens_usados: Optional[int] = None) -> None:
+        """Termina la llamada; sin tokens_usados (error) se devuelven todos los reservados"""
+        with self._candado:
+            if self.liberado:
+                return
+            self.liberado = True
+
+        if self.id_llamada is not None:
+            LlamadasEnCursoIa.objects.filter(id_llamada=self.id_llamada).delete()
+
+        if self.tokens_reservados:
+            diferencia = self.tokens_reservados - (tokens_usados or 0)
+            if diferencia:
+                CuposProveedorIa.objects.filter(clave=self.clave).update(
+                    tokens_disponibles=F('tokens_disponibles') + diferencia
+                )
+
+    async def aliberar(self, tokens_usados: Optional[int] = None) -> None:
+        if not self.liberado:
+            await sync_to_async(self.liberar)(tokens_usados)
+
+
+def limites_configuracion(config) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """(peticiones por minuto, tokens por minuto, llamadas simultáneas) de la configuración del modelo"""
+    return (
+        getattr(config, 'limite_peticiones_minuto', None),
+        getattr(config, 'limite_tokens_minuto', None),
+        getattr(config, 'max_llamadas_simultaneas', None),
+    )
+
+
+def clave_cupo(adaptador, config) -> str:
+    """Clave compartida por las configuraciones que usan el mismo modelo con la misma API key
+    (el proveedor las cuenta juntas); la API key se guarda solo como huella"""
+    huella = hashlib.sha256(config.api_key.encode('utf-8')).hexdigest()[:16]
+    return f'{adaptador.nombre}:{huella}:{config.model_name}'[:150]
+
+
+def estimar_tokens(adaptador, config, prompt: str) -> int:
+    """Tokens de entrada aproximados (según el proveedor) más el máximo de salida pedido"""
+    return estimar_tokens_texto(prompt, adaptador.nombre) + (config.max_tokens or 0)
+
+
+def intentar_reservar(clave: str, limites: Tuple, tokens: int, duracion: float) -> Tuple[Optional[Cupo], float]:
+    """Un intento de reserva: retorna (cupo, 0) o (None, segundos que faltan para que haya cupo)"""
+    peticiones_minuto, tokens_minuto, simultaneas = limites
+    ahora = timezone.now()
+
+    # Una reserva mayor que el balde nunca cabría: se pide como mucho el balde lleno
+    tokens = min(tokens, tokens_minuto) if tokens_minuto else 0
+
+    with transaction.atomic():
+        # 1. Bloquear la fila de la clave (se crea llena la primera vez)
+        cupo = CuposProveedorIa.objects.select_for_update().filter(clave=clave).first()
+        if cupo is None:
+            CuposProveedorIa.objects.bulk_create([CuposProveedorIa(
+                clave=clave,
+                peticiones_disponibles=peticiones_minuto or 0,
+                tokens_disponibles=tokens_minuto or 0,
+                fecha_actualizacion=ahora
+            )], ignore_conflicts=True)
+            cupo = CuposProveedorIa.objects.select_for_update().get(clave=clave)
+
+        # 2. Rellenar los baldes con lo acumulado desde la última reserva
+        transcurrido = max(0.0, (ahora - cupo.fecha_actualizacion).total_seconds())
+        if peticiones_minuto:
+            cupo.peticiones_disponibles = min(
+                peticiones_minuto, cupo.peticiones_disponibles + transcurrido * peticiones_minuto / 60
+            )
+        if tokens_minuto:
+            cupo.tokens_disponibles = min(
+                tokens_minuto, cupo.tokens_disponibles + transcurrido * tokens_minuto / 60
+            )
+
+        # 3. Calcular cuánto falta para cumplir cada límite
+        espera = 0.0
+        if peticiones_minuto and cupo.peticiones_disponibles < 1:
+            espera = (1 - cupo.peticiones_disponibles) * 60 / peticiones_minuto
+        if tokens_minuto and cupo.tokens_disponibles < tokens:
+            espera = max(espera, (tokens - cupo.tokens_disponibles) * 60 / tokens_minuto)
+        if simultaneas:
+            LlamadasEnCursoIa.objects.filter(clave=clave, fecha_vencimiento__lte=ahora).delete()
+            if LlamadasEnCursoIa.objects.filter(clave=clave).count() >= simultaneas:
+                # No se sabe cuándo termina otra llamada: se vuelve a consultar en un momento
+                espera = max(espera, configuracion_limites()['INTERVALO_ESPERA'])
+
+        if espera > 0:
+            return None, espera
+
+        # 4. Descontar y registrar la llamada en curso
+        if peticiones_minuto:
+            cupo.peticiones_disponibles -= 1
+        cupo.tokens_disponibles -= tokens
+        cupo.fecha_actualizacion = ahora
+        cupo.save(update_fields=['peticiones_disponibles', 'tokens_disponibles', 'fecha_actualizacion'])
+
+        id_llamada = None
+        if simultaneas:
+            id_llamada = LlamadasEnCursoIa.objects.create(
+                clave=clave,
+                fecha_vencimiento=ahora + timedelta(seconds=duracion)
+            ).id_llamada
+
+    return Cupo(clave, tokens, id_llamada), 0.0
+
+
+def _preparar_reserva(adaptador, config, prompt: str, timeout: float):
+    """Retorna (clave, límites, tokens, duración) o None si el modelo no tiene límites"""
+    limites = limites_configuracion(config)
+    if not any(limites):
+        return None
+
+    duracion = timeout + configuracion_limites()['MARGEN_VENCIMIENTO']
+    return clave_cupo(adaptador, config), limites, estimar_tokens(adaptador, config, prompt), duracion
+
+
+def reservar_cupo(adaptador, config, prompt: str, timeout: float) -> Tuple[Optional[Cupo], float]:
+    """Espera cupo hasta ESPERA_MAXIMA; retorna (cupo, 0) o (None, segundos sugeridos para reintentar).
+
+    Si el cupo no se libera antes del límite la petición se rechaza de inmediato, en lugar de
+    ocupar un trabajador hasta el timeout del proveedor.
+    """
+    reserva = _preparar_reserva(adaptador, config, prompt, timeout)
+    if reserva is None:
+        return Cupo(), 0.0
+
+    limite = time.monotonic() + configuracion_limites()['ESPERA_MAXIMA']
+
+    while True:
+        cupo, espera = intentar_reservar(*reserva)
+        if cupo:
+            return cupo, 0.0
+        if espera > limite - time.monotonic():
+            return None, espera
+        time.sleep(espera)
+
+
+async def areservar_cupo(adaptador, config, prompt: str, timeout: float) -> Tuple[Optional[Cupo], float]:
+    """Versión asíncrona de reservar_cupo: la espera no bloquea el event loop"""
+    reserva = _preparar_reserva(adaptador, config, prompt, timeout)
+    if reserva is None:
+        return Cupo(), 0.0
+
+    limite = time.monotonic() + configuracion_limites()['ESPERA_MAXIMA']
+
+    while True:
+        cupo, espera = await sync_to_async(intentar_reservar)(*reserva)
+        if cupo:
+            return cupo, 0.0
+        if espera > limite - time.monotonic():
+            return None, espera
+        await asyncio.sleep(espera)
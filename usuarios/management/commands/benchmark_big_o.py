@@ -0,0 +1,128 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuarios.analisis_big_o import analizar_codigo_big_o
+
+# Fragmentos representativos de lo que se pega en la comparación individual
+MUESTRAS = {
+    'python': '''
+def buscar_pares(numeros, objetivo):
+    # Fuerza bruta con dos loops
+    pares = []
+    for i in range(len(numeros)):
+        for j in range(i + 1, len(numeros)):
+            if numeros[i] + numeros[j] == objetivo:
+                pares.append((numeros[i], numeros[j]))
+    return pares
+
+def busqueda_binaria(lista, valor):
+    izquierda, derecha = 0, len(lista) - 1
+    while izquierda <= derecha:
+        mitad = (izquierda + derecha) // 2
+        if lista[mitad] == valor:
+            return mitad
+        if lista[mitad] < valor:
+            izquierda = mitad + 1
+        else:
+            derecha = mitad - 1
+    return -1
+
+def contar_palabras(texto):
+    conteo = {}
+    for palabra in texto.split():
+        conteo[palabra] = conteo.get(palabra, 0) + 1
+    return conteo
+''',
+    'java': '''
+public class Ordenamiento {
+    public static void burbuja(int[] arreglo) {
+        for (int i = 0; i < arreglo.length; i++) {
+            for (int j = 0; j < arreglo.length - i - 1; j++) {
+                if (arreglo[j] > arreglo[j + 1]) {
+                    int temporal = arreglo[j];
+                    arreglo[j] = arreglo[j + 1];
+                    arreglo[j + 1] = temporal;
+                }
+            }
+        }
+    }
+
+    public static int sumar(int[] arreglo) {
+        int total = 0;
+        for (int i = 0; i < arreglo.length; i++) {
+            total += arreglo[i];
+        }
+        return total;
+    }
+}
+''',
+    'c': '''
+int maximo(int *arreglo, int n) {
+    int mayor = arreglo[0];
+    for (int i = 1; i < n; i++) {
+        if (arreglo[i] > mayor) {
+            mayor = arreglo[i];
+        }
+    }
+    return mayor;
+}
+
+void multiplicar(int a[10][10], int b[10][10], int c[10][10], int n) {
+    for (int i = 0; i < n; i++) {
+        for (int j = 0; j < n; j++) {
+            c[i][j] = 0;
+            for (int k = 0; k < n; k++) {
+                c[i][j] += a[i][k] * b[k][j];
+            }
+        }
+    }
+}
+''',
+}
+
+
+def generar_codigo(muestra: str, kilobytes: int) -> str:
+    """Repite la muestra hasta alcanzar el tamaño pedido"""
+    repeticiones = max(1, (kilobytes * 1024) // len(muestra))
+    return muestra * repeticiones
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de analizar_codigo_big_o por KB de código para distintos tamaños de archivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            default='1,10,50',
+            help='Tamaños en KB separados por coma (por defecto 1,10,50)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=5,
+            help='Ejecuciones por caso; se reporta la mediana'
+        )
+
+    def handle(self, *args, **options):
+        tamanos = [int(tamano) for tamano in options['tamanos'].split(',') if tamano.strip()]
+        repeticiones = max(1, options['repeticiones'])
+
+        self.stdout.write(f'{"lenguaje":<10} {"KB":>6} {"ms total":>10} {"ms/KB":>10}')
+
+        for lenguaje, muestra in MUESTRAS.items():
+            for kilobytes in tamanos:
+                codigo = generar_codigo(muestra, kilobytes)
+                tiempos = []
+
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    analizar_codigo_big_o(codigo, lenguaje)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+                mediana = statistics.median(tiempos)
+                tamano_real = len(codigo.encode('utf-8')) / 1024
+                self.stdout.write(
+                    f'{lenguaje:<10} {tamano_real:>6.1f} {mediana:>10.2f} {mediana / tamano_real:>10.3f}'
+                )
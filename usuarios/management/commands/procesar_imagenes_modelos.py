@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuarios.imagenes_modelo import generar_miniatura, huella_imagen
+from usuarios.models import ModelosIa
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula la huella y la miniatura de las imágenes de modelos cargadas antes de '
+        'imagen_hash (o de todas con --todas, p. ej. al cambiar LADO_MINIATURA)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenerar también las imágenes que ya tienen huella')
+
+    def handle(self, *args, **options):
+        modelos = ModelosIa.objects.filter(imagen_ia__isnull=False)
+        if not options['todas']:
+            modelos = modelos.filter(imagen_hash__isnull=True)
+
+        # Se leen los ids primero y la imagen de a una para no cargar todos los bytes juntos
+        procesadas = 0
+        for id_modelo in list(modelos.values_list('id', flat=True)):
+            datos = bytes(ModelosIa.objects.filter(id=id_modelo).values_list('imagen_ia', flat=True).first() or b'')
+            if not datos:
+                continue
+
+            ModelosIa.objects.filter(id=id_modelo).update(
+                imagen_hash=huella_imagen(datos),
+                imagen_miniatura=generar_miniatura(datos),
+                fecha_imagen=timezone.now(),
+            )
+            procesadas += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{procesadas} imágenes procesadas'))
@@ -0,0 +1,56 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from usuarios.cliente_http import cerrar_sesiones
+from usuarios.trabajos import (
+    configuracion_trabajos,
+    ejecutar_trabajador,
+    recuperar_trabajos_abandonados,
+)
+
+
+class Command(BaseCommand):
+    help = 'Inicia un grupo de trabajadores que procesan la cola de comparaciones con IA'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trabajadores',
+            type=int,
+            default=None,
+            help='Cantidad de hilos trabajadores (por defecto TRABAJOS_IA["TRABAJADORES"])'
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options['trabajadores'] or configuracion_trabajos()['TRABAJADORES']
+        detener = threading.Event()
+
+        # Detener ordenadamente con Ctrl+C o SIGTERM
+        signal.signal(signal.SIGINT, lambda *_: detener.set())
+        signal.signal(signal.SIGTERM, lambda *_: detener.set())
+
+        recuperados = recuperar_trabajos_abandonados()
+        if recuperados:
+            self.stdout.write(f'{recuperados} trabajos abandonados devueltos a la cola')
+
+        hilos = [
+            threading.Thread(target=ejecutar_trabajador, args=(detener,), name=f'trabajador-ia-{i + 1}')
+            for i in range(cantidad)
+        ]
+
+        for hilo in hilos:
+            hilo.start()
+
+        self.stdout.write(self.style.SUCCESS(f'{cantidad} trabajadores de IA en ejecución'))
+
+        # Revisar periódicamente si hay trabajos de procesos caídos
+        while not detener.wait(configuracion_trabajos()['TIEMPO_MAXIMO_PROCESO']):
+            recuperar_trabajos_abandonados()
+
+        for hilo in hilos:
+            hilo.join()
+
+        cerrar_sesiones()
+
+        self.stdout.write('Trabajadores detenidos')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from usuarios.proveedor_falso import ProveedorFalso
+
+
+class Command(BaseCommand):
+    help = 'Levanta un proveedor de IA falso (formatos Anthropic, OpenAI/DeepSeek y Gemini) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--puerto', type=int, default=9100)
+        parser.add_argument(
+            '--latencia',
+            type=float,
+            default=1.0,
+            help='Segundos que tarda cada respuesta (en streaming, repartidos entre los fragmentos)'
+        )
+        parser.add_argument('--variacion', type=float, default=0.0,
+                            help='Segundos extra aleatorios (0 a este valor) sumados a la latencia')
+        parser.add_argument('--tasa-error', type=float, default=0.0,
+                            help='Fracción de respuestas con error (0 a 1)')
+        parser.add_argument('--status-error', type=int, default=500,
+                            help='Status de las respuestas con error (429 agrega Retry-After)')
+        parser.add_argument('--fragmentos', type=int, default=20,
+                            help='Eventos en que se divide la respuesta en streaming')
+
+    def handle(self, *args, **options):
+        import uvicorn
+
+        self.stdout.write(
+            f"Proveedor falso en http://{options['host']}:{options['puerto']} "
+            f"(latencia {options['latencia']}s + hasta {options['variacion']}s, "
+            f"errores {options['tasa_error']:.0%} con status {options['status_error']}). "
+            f"Apuntar endpoint_url de la configuración del modelo aquí."
+        )
+        uvicorn.run(
+            ProveedorFalso(
+                latencia=options['latencia'],
+                variacion=options['variacion'],
+                tasa_error=options['tasa_error'],
+                status_error=options['status_error'],
+                fragmentos=options['fragmentos']
+            ),
+            host=options['host'],
+            port=options['puerto'],
+            log_level='warning'
+        )
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import uuid
+
+import jwt
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from usuarios.prueba_carga import Mediciones, formatear_resumen
+
+# Par base: comparten la primera función y difieren en la segunda, para que la similitud local
+# quede en la zona que requiere a la IA
+FUNCION_COMUN = '''
+def ordenar(numeros):
+    for i in range(len(numeros)):
+        for j in range(len(numeros) - i - 1):
+            if numeros[j] > numeros[j + 1]:
+                numeros[j], numeros[j + 1] = numeros[j + 1], numeros[j]
+    return numeros
+'''
+
+FUNCION_CODIGO_1 = '''
+def buscar(lista, valor):
+    izquierda, derecha = 0, len(lista) - 1
+    while izquierda <= derecha:
+        mitad = (izquierda + derecha) // 2
+        if lista[mitad] == valor:
+            return mitad
+        if lista[mitad] < valor:
+            izquierda = mitad + 1
+        else:
+            derecha = mitad - 1
+    return -1
+'''
+
+FUNCION_CODIGO_2 = '''
+def contar(texto):
+    conteo = {}
+    for palabra in texto.split():
+        conteo[palabra] = conteo.get(palabra, 0) + 1
+    return conteo
+'''
+
+
+def generar_par() -> tuple:
+    """Par de códigos único por iteración (el comentario cambia la clave de caché, no la similitud)"""
+    marca = f'# carga {uuid.uuid4().hex}\n'
+    return marca + FUNCION_COMUN + FUNCION_CODIGO_1, marca + FUNCION_COMUN + FUNCION_CODIGO_2
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de extremo a extremo: login, crear comparación, comparación con IA, análisis Big O y '
+        'comentario de eficiencia. Reporta p50/p95/p99 y req/s por endpoint. Pensado para usarse con el '
+        'modelo apuntando a manage.py proveedor_falso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del backend')
+        parser.add_argument('--usuario', required=True)
+        parser.add_argument('--contrasena', required=True)
+        parser.add_argument('--modelo-ia', type=int, required=True, help='ID del modelo (apuntando al proveedor falso)')
+        parser.add_argument('--lenguaje', type=int, required=True, help='ID del lenguaje Python')
+        parser.add_argument('--usuarios', type=int, default=20, help='Usuarios virtuales simultáneos')
+        parser.add_argument('--iteraciones', type=int, default=5, help='Flujos completos por usuario virtual')
+        parser.add_argument('--asincrono', action='store_true',
+                            help='Usar las vistas ASGI (_async) para la comparación con IA y el comentario')
+        parser.add_argument('--timeout', type=float, default=300)
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 1 or options['iteraciones'] < 1:
+            raise CommandError('--usuarios y --iteraciones deben ser mayores que cero')
+
+        mediciones = Mediciones()
+        inicio = time.perf_counter()
+        completos = asyncio.run(self.ejecutar(options, mediciones))
+        duracion = time.perf_counter() - inicio
+
+        total = options['usuarios'] * options['iteraciones']
+        self.stdout.write(
+            f"{options['usuarios']} usuarios x {options['iteraciones']} iteraciones, "
+            f"{completos}/{total} flujos completos en {duracion:.1f}s"
+        )
+        self.stdout.write(formatear_resumen(mediciones.resumen(duracion)))
+
+    async def ejecutar(self, options, mediciones: Mediciones) -> int:
+        import httpx
+
+        base = options['url'].rstrip('/')
+        sufijo = '_async' if options['asincrono'] else ''
+        consulta_ia = '' if options['asincrono'] else '?sincrono=true'
+
+        async with httpx.AsyncClient(
+            timeout=options['timeout'],
+            limits=httpx.Limits(max_connections=options['usuarios'] * 2)
+        ) as cliente:
+
+            async def paso(endpoint: str, url: str, esperado: int, **kwargs):
+                """POST medido; retorna el JSON si el status es el esperado, si no None"""
+                inicio = time.perf_counter()
+                try:
+                    response = await cliente.post(url, **kwargs)
+                    exito = response.status_code == esperado
+                except httpx.HTTPError:
+                    exito = False
+                mediciones.registrar(endpoint, time.perf_counter() - inicio, exito)
+                return response.json() if exito else None
+
+            async def usuario_virtual() -> int:
+                # 1. Login (una vez por usuario virtual)
+                datos = await paso('login', base + reverse('login_usuario'), 200, data={
+                    'usuario': options['usuario'],
+                    'contraseña': options['contrasena'],
+                })
+                if not datos:
+                    return 0
+
+                token = datos['token']
+                usuario_id = jwt.decode(token, options={'verify_signature': False})['usuario_id']
+                headers = {'Authorization': f'Bearer {token}'}
+                completos = 0
+
+                for _ in range(options['iteraciones']):
+                    # 2. Crear la comparación
+                    codigo_1, codigo_2 = generar_par()
+                    datos = await paso('crear_comparacion', base + reverse('crear_comparacion_individual'), 201,
+                                       headers=headers, data={
+                                           'usuario_id': usuario_id,
+                                           'modelo_ia_id': options['modelo_ia'],
+                                           'lenguaje_id': options['lenguaje'],
+                                           'nombre_comparacion': 'Prueba de carga',
+                                           'codigo_1': codigo_1,
+                                           'codigo_2': codigo_2,
+                                       })
+                    if not datos:
+                        continue
+                    id_comparacion = datos['id']
+
+                    # 3. Comparación con IA
+                    url = base + reverse('crear_comparacion_ia' + sufijo, args=[id_comparacion]) + consulta_ia
+                    if not await paso('comparacion_ia' + sufijo, url, 200, headers=headers):
+                        continue
+
+                    # 4. Análisis Big O
+                    url = base + reverse('analisis_big_o_individual', args=[id_comparacion])
+                    datos = await paso('analisis_big_o', url, 200, headers=headers)
+                    if not datos or 'resultado_id' not in datos:
+                        continue
+
+                    # 5. Comentario de eficiencia
+                    url = base + reverse('crear_comentario_eficiencia_individual' + sufijo, args=[datos['resultado_id']])
+                    if await paso('comentario_eficiencia' + sufijo, url, 200, headers=headers):
+                        completos += 1
+
+                return completos
+
+            return sum(await asyncio.gather(*(usuario_virtual() for _ in range(options['usuarios']))))
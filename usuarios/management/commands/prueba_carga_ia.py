@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from usuarios.prueba_carga import Mediciones, formatear_resumen
+
+# Vista síncrona y su versión asíncrona por endpoint. La comparación repetida sobre el mismo par
+# sale de la caché de similitud desde la segunda petición: para medir llamadas reales al proveedor
+# conviene el comentario de eficiencia, que no se guarda en caché.
+ENDPOINTS = {
+    'comentario': ('crear_comentario_eficiencia_individual', 'crear_comentario_eficiencia_individual_async', ''),
+    'comparacion': ('crear_comparacion_ia', 'crear_comparacion_ia_async', '?sincrono=true'),
+}
+
+
+async def ejecutar_carga(nombre: str, url: str, peticiones: int, concurrencia: int, timeout: float,
+                         mediciones: Mediciones) -> float:
+    """Envía `peticiones` POST con a lo sumo `concurrencia` en vuelo; retorna la duración total"""
+    import httpx
+
+    limite = asyncio.Semaphore(concurrencia)
+
+    async with httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    ) as cliente:
+
+        async def una_peticion():
+            async with limite:
+                inicio = time.perf_counter()
+                try:
+                    response = await cliente.post(url)
+                    exito = response.status_code == 200
+                except httpx.HTTPError:
+                    exito = False
+                mediciones.registrar(nombre, time.perf_counter() - inicio, exito)
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(una_peticion() for _ in range(peticiones)))
+        return time.perf_counter() - inicio_total
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento concurrente de la vista WSGI y la vista ASGI de un endpoint que llama al '
+        'proveedor de IA. Requiere los dos servidores levantados (p. ej. gunicorn app.wsgi y uvicorn '
+        'app.asgi:application, un proceso cada uno) y el modelo apuntando a manage.py proveedor_falso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help='URL base del servidor WSGI')
+        parser.add_argument('--asgi', default='http://127.0.0.1:8001', help='URL base del servidor ASGI')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='comentario')
+        parser.add_argument('--id', type=int, required=True,
+                            help='ID del resultado de eficiencia (comentario) o de la comparación')
+        parser.add_argument('--peticiones', type=int, default=200)
+        parser.add_argument('--concurrencia', type=int, default=100)
+        parser.add_argument('--timeout', type=float, default=300)
+
+    def handle(self, *args, **options):
+        if options['peticiones'] < 1 or options['concurrencia'] < 1:
+            raise CommandError('--peticiones y --concurrencia deben ser mayores que cero')
+
+        vista_wsgi, vista_asgi, consulta = ENDPOINTS[options['endpoint']]
+        rutas = {
+            'WSGI': options['wsgi'].rstrip('/') + reverse(vista_wsgi, args=[options['id']]) + consulta,
+            'ASGI': options['asgi'].rstrip('/') + reverse(vista_asgi, args=[options['id']]),
+        }
+
+        self.stdout.write(f"{options['peticiones']} peticiones, {options['concurrencia']} simultáneas")
+
+        filas = []
+        for nombre, url in rutas.items():
+            mediciones = Mediciones()
+            duracion = asyncio.run(ejecutar_carga(
+                nombre, url, options['peticiones'], options['concurrencia'], options['timeout'], mediciones
+            ))
+            filas.extend(mediciones.resumen(duracion))
+
+        self.stdout.write(formatear_resumen(filas))
@@ -0,0 +1,176 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+from usuarios.indices import consultas_frecuentes
+from usuarios.models import ResultadosEficienciaIndividual
+
+# Por debajo de estas filas el planificador prefiere recorrer la tabla y el plan no dice nada
+MIN_FILAS_VEREDICTO = 10000
+
+# Campos enteros que forman parte de un índice único y deben cambiar en cada copia
+CAMPOS_VARIABLES = {
+    ResultadosEficienciaIndividual: 'version_analizador',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Revisa con EXPLAIN que las consultas frecuentes usen su índice (sin recorrer la tabla ni '
+        'ordenar en memoria, y solo con el índice en los listados cubiertos). Con --filas simula '
+        'tablas grandes dentro de una transacción que se revierte'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--valor', type=int, default=0,
+                            help='ID de usuario o comparación con el que se arman las consultas')
+        parser.add_argument('--filas', type=int, default=0,
+                            help='Filas de prueba que se agregan a cada tabla antes del EXPLAIN (se revierten)')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--consulta', action='append',
+                            help='Revisar solo esta consulta (se puede repetir)')
+
+    def handle(self, *args, **options):
+        consultas = consultas_frecuentes(options['valor'])
+        if options['consulta']:
+            consultas = [consulta for consulta in consultas if consulta['nombre'] in options['consulta']]
+
+        fallidas = []
+
+        with transaction.atomic():
+            # 1. Volumen simulado: copias de una fila existente de cada tabla
+            if options['filas']:
+                for consulta in consultas:
+                    self._generar_filas(consulta['consulta'].model, options['filas'], options['lote'])
+                self._analizar_tablas({consulta['consulta'].model for consulta in consultas})
+
+            # 2. Plan de cada consulta
+            for consulta in consultas:
+                if not self._revisar(consulta):
+                    fallidas.append(consulta['nombre'])
+
+            transaction.set_rollback(True)
+
+        if fallidas:
+            raise CommandError(f"Consultas sin su índice: {', '.join(fallidas)}")
+
+        self.stdout.write(self.style.SUCCESS('Ninguna consulta recorre su tabla ni ordena en memoria'))
+
+    def _generar_filas(self, modelo, cantidad: int, lote: int) -> None:
+        """Inserta copias de la primera fila (mismas claves foráneas) con los textos vacíos"""
+        original = modelo.objects.order_by('pk').first()
+        tabla = modelo._meta.db_table
+
+        if original is None:
+            self.stdout.write(f'{tabla}: sin filas para copiar, no se agrega volumen')
+            return
+
+        campo_variable = CAMPOS_VARIABLES.get(modelo)
+        inicio = time.time()
+
+        for desde in range(0, cantidad, lote):
+            copias = []
+            for numero in range(desde, min(desde + lote, cantidad)):
+                copia = modelo(**{
+                    campo.attname: self._valor_copia(campo, getattr(original, campo.attname), numero)
+                    for campo in modelo._meta.concrete_fields if not campo.primary_key
+                })
+                if campo_variable:
+                    setattr(copia, campo_variable, getattr(original, campo_variable) + numero + 1)
+                copias.append(copia)
+            modelo.objects.bulk_create(copias)
+
+        self.stdout.write(f'{tabla}: {cantidad} filas agregadas en {time.time() - inicio:.1f}s')
+
+    @staticmethod
+    def _valor_copia(campo, valor, numero: int):
+        if campo.unique and isinstance(campo, models.CharField):
+            return f'{valor}-{numero}'[-campo.max_length:]
+        if isinstance(campo, models.TextField) and not campo.null:
+            return ''
+        return valor
+
+    def _analizar_tablas(self, modelos) -> None:
+        """Actualiza las estadísticas para que el planificador vea el volumen nuevo"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for modelo in modelos:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(modelo._meta.db_table)}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def _revisar(self, consulta) -> bool:
+        """Imprime el plan y retorna False si la consulta recorre la tabla, ordena, no usa su índice
+        o, siendo un listado cubierto, no se resuelve solo con el índice"""
+        queryset = consulta['consulta']
+        tabla = queryset.model._meta.db_table
+        filas = queryset.model.objects.count()
+
+        if connection.vendor == 'postgresql':
+            plan = self._plan_postgresql(json.loads(queryset.explain(format='json'))[0]['Plan'], tabla)
+        elif connection.vendor == 'sqlite':
+            plan = self._plan_sqlite(queryset.explain(), tabla)
+        else:
+            self.stdout.write(f"{consulta['nombre']}: sin verificación para {connection.vendor}\n{queryset.explain()}")
+            return True
+
+        usa_indice = consulta['indice'] in plan['indices']
+        # INCLUDE solo existe en PostgreSQL: en otras bases el índice no cubre el listado
+        cubierta = consulta.get('solo_indice', False) and connection.vendor == 'postgresql'
+        falta_solo_indice = cubierta and not plan['solo_indice']
+        correcto = usa_indice and not plan['recorre_tabla'] and not plan['ordena'] and not falta_solo_indice
+        detalle = (
+            f"{consulta['nombre']} ({filas} filas): índices {', '.join(plan['indices']) or 'ninguno'}"
+            f"{', solo índice' if plan['solo_indice'] else ''}"
+            f"{', recorre la tabla' if plan['recorre_tabla'] else ''}"
+            f"{', ordena en memoria' if plan['ordena'] else ''}"
+        )
+
+        if correcto:
+            self.stdout.write(self.style.SUCCESS(f'OK    {detalle}'))
+            return True
+
+        # Que el índice cubra la consulta no depende del volumen: eso falla aunque la tabla sea chica
+        if filas < MIN_FILAS_VEREDICTO and not (usa_indice and falta_solo_indice):
+            self.stdout.write(self.style.WARNING(
+                f'AVISO {detalle} (tabla chica: el planificador puede preferir recorrerla; usar --filas)'
+            ))
+            return True
+
+        esperado = f"{consulta['indice']}{' (solo índice)' if cubierta else ''}"
+        self.stdout.write(self.style.ERROR(f'FALLA {detalle}; se esperaba {esperado}'))
+        return False
+
+    def _plan_postgresql(self, nodo, tabla: str, plan=None):
+        plan = plan or {'indices': [], 'solo_indice': False, 'recorre_tabla': False, 'ordena': False}
+        tipo = nodo.get('Node Type')
+
+        if nodo.get('Index Name'):
+            plan['indices'].append(nodo['Index Name'])
+        if tipo == 'Index Only Scan':
+            plan['solo_indice'] = True
+        if tipo == 'Seq Scan' and nodo.get('Relation Name') == tabla:
+            plan['recorre_tabla'] = True
+        if tipo in ('Sort', 'Incremental Sort'):
+            plan['ordena'] = True
+
+        for hijo in nodo.get('Plans', []):
+            self._plan_postgresql(hijo, tabla, plan)
+        return plan
+
+    @staticmethod
+    def _plan_sqlite(texto: str, tabla: str):
+        plan = {'indices': [], 'solo_indice': False, 'recorre_tabla': False, 'ordena': False}
+
+        for linea in texto.splitlines():
+            if ' INDEX ' in linea:
+                plan['indices'].append(linea.split(' INDEX ')[1].split(' ')[0])
+                plan['solo_indice'] = plan['solo_indice'] or 'COVERING INDEX' in linea
+            elif f'SCAN {tabla}' in linea:
+                plan['recorre_tabla'] = True
+            if 'TEMP B-TREE' in linea:
+                plan['ordena'] = True
+
+        return plan
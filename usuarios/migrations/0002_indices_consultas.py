@@ -0,0 +1,72 @@
+from django.db import migrations
+
+from usuarios.indices import ejecutar_indices
+
+# Definición congelada: tablas y columnas reales al escribir la migración, no las del modelo actual
+INDICES = [
+    {
+        'nombre': 'idx_comparaciones_individuales_usuario_fecha',
+        'tabla': 'comparaciones_individuales',
+        'columnas': ['usuario_id', '-fecha_creacion'],
+        'incluir': ['id', 'nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_comparaciones_grupales_usuario_fecha',
+        'tabla': 'comparaciones_grupales',
+        'columnas': ['usuario_id', '-fecha_creacion'],
+        'incluir': ['id', 'nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_comentarios_eficiencia_individual_resultado',
+        'tabla': 'comentarios_eficiencia_individual',
+        'columnas': ['id_resultado_eficiencia_individual'],
+    },
+    {
+        'nombre': 'idx_codigos_fuente_comparacion_orden',
+        'tabla': 'codigos_fuente',
+        'columnas': ['comparacion_grupal_id', 'orden'],
+    },
+    {
+        'nombre': 'idx_modelos_ia_usuario_activos',
+        'tabla': 'modelos_ia',
+        'columnas': ['id_usuario', '-fecha_creacion'],
+        'condicion': 'activo',
+    },
+    {
+        'nombre': 'idx_resultados_similitud_grupal_comparacion',
+        'tabla': 'resultados_similitud_grupal',
+        'columnas': ['comparacion_grupal_id', '-porcentaje_similitud'],
+    },
+    {
+        'nombre': 'idx_resultados_eficiencia_grupal_comparacion',
+        'tabla': 'resultados_eficiencia_grupal',
+        'columnas': ['comparacion_grupal_id', '-puntuacion_eficiencia'],
+    },
+]
+
+
+def crear_indices(apps, schema_editor):
+    ejecutar_indices(schema_editor, INDICES, [])
+
+
+def borrar_indices(apps, schema_editor):
+    ejecutar_indices(schema_editor, [], INDICES)
+
+
+class Migration(migrations.Migration):
+    """Índices de las consultas frecuentes (las tablas no las administra Django: managed = False).
+
+    No es atómica porque PostgreSQL no permite CREATE INDEX CONCURRENTLY dentro de una transacción;
+    si se corta a la mitad se puede volver a ejecutar (IF NOT EXISTS). Un índice que quedó inválido
+    por un corte debe borrarse a mano antes de reintentar.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices, atomic=False),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+from usuarios.indices import ejecutar_indices
+
+# Definición congelada (ver 0002_indices_consultas)
+INDICES = [
+    {
+        'nombre': 'idx_comparaciones_individuales_usuario_cursor',
+        'tabla': 'comparaciones_individuales',
+        'columnas': ['usuario_id', '-fecha_creacion', '-id'],
+        'incluir': ['nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_comparaciones_grupales_usuario_cursor',
+        'tabla': 'comparaciones_grupales',
+        'columnas': ['usuario_id', '-fecha_creacion', '-id'],
+        'incluir': ['nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_comparaciones_individuales_cursor',
+        'tabla': 'comparaciones_individuales',
+        'columnas': ['-fecha_creacion', '-id'],
+    },
+    {
+        'nombre': 'idx_modelos_ia_usuario_activos_cursor',
+        'tabla': 'modelos_ia',
+        'columnas': ['id_usuario', '-fecha_creacion', '-id'],
+        'condicion': 'activo',
+    },
+]
+
+# Los de 0002_indices_consultas con las mismas columnas sin el id
+REEMPLAZADOS = [
+    {
+        'nombre': 'idx_comparaciones_individuales_usuario_fecha',
+        'tabla': 'comparaciones_individuales',
+        'columnas': ['usuario_id', '-fecha_creacion'],
+        'incluir': ['id', 'nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_comparaciones_grupales_usuario_fecha',
+        'tabla': 'comparaciones_grupales',
+        'columnas': ['usuario_id', '-fecha_creacion'],
+        'incluir': ['id', 'nombre_comparacion', 'estado'],
+    },
+    {
+        'nombre': 'idx_modelos_ia_usuario_activos',
+        'tabla': 'modelos_ia',
+        'columnas': ['id_usuario', '-fecha_creacion'],
+        'condicion': 'activo',
+    },
+]
+
+
+def crear_indices_paginacion(apps, schema_editor):
+    ejecutar_indices(schema_editor, INDICES, REEMPLAZADOS)
+
+
+def borrar_indices_paginacion(apps, schema_editor):
+    ejecutar_indices(schema_editor, REEMPLAZADOS, INDICES)
+
+
+class Migration(migrations.Migration):
+    """Índices (fecha_creacion, id) de la paginación por cursor de los listados.
+
+    Los nuevos se crean antes de borrar los que reemplazan, para que los listados no queden sin
+    índice mientras corre. No es atómica por CREATE INDEX CONCURRENTLY (ver 0002_indices_consultas).
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('usuarios', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_paginacion, borrar_indices_paginacion, atomic=False),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from usuarios.indices import ejecutar_indices
+
+# Definición congelada (ver 0002_indices_consultas)
+INDICES = [
+    {
+        'nombre': 'idx_resultados_similitud_individual_comparacion',
+        'tabla': 'resultados_similitud_individual',
+        'columnas': ['id_comparacion_individual', 'id_modelo_ia'],
+    },
+]
+
+
+def crear_indices(apps, schema_editor):
+    ejecutar_indices(schema_editor, INDICES, [])
+
+
+def borrar_indices(apps, schema_editor):
+    ejecutar_indices(schema_editor, [], INDICES)
+
+
+class Migration(migrations.Migration):
+    """Índice de los resultados de una comparación individual (uno por modelo), que bd.sql ya crea
+    en las bases nuevas. No es atómica por CREATE INDEX CONCURRENTLY (ver 0002_indices_consultas).
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('usuarios', '0003_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices, atomic=False),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+from usuarios.indices import ejecutar_indices
+
+# Definición congelada (ver 0002_indices_consultas)
+INDICES = [
+    {
+        'nombre': 'uq_resultados_eficiencia_individual_version',
+        'tabla': 'resultados_eficiencia_individual',
+        'columnas': ['id_comparacion_individual', 'version_analizador'],
+        'unico': True,
+    },
+]
+
+# Filas repetidas por comparación y versión: se conserva la más reciente
+REPETIDAS = """
+    SELECT r.id_resultado_eficiencia_individual FROM resultados_eficiencia_individual r
+     WHERE EXISTS (SELECT 1 FROM resultados_eficiencia_individual m
+                    WHERE m.id_comparacion_individual = r.id_comparacion_individual
+                      AND m.version_analizador = r.version_analizador
+                      AND m.id_resultado_eficiencia_individual > r.id_resultado_eficiencia_individual)
+"""
+
+
+def crear_indices(apps, schema_editor):
+    conexion = schema_editor.connection
+
+    # 1. Columna version_analizador en las bases anteriores al análisis por versión
+    with conexion.cursor() as cursor:
+        columnas = [
+            columna.name for columna in
+            conexion.introspection.get_table_description(cursor, 'resultados_eficiencia_individual')
+        ]
+    if 'version_analizador' not in columnas:
+        schema_editor.execute(
+            'ALTER TABLE resultados_eficiencia_individual ADD COLUMN version_analizador INTEGER NOT NULL DEFAULT 1'
+        )
+
+    # 2. Quitar las filas repetidas (y sus comentarios) que impedirían el índice único
+    schema_editor.execute(
+        f'DELETE FROM comentarios_eficiencia_individual WHERE id_resultado_eficiencia_individual IN ({REPETIDAS})'
+    )
+    schema_editor.execute(
+        f'DELETE FROM resultados_eficiencia_individual WHERE id_resultado_eficiencia_individual IN ({REPETIDAS})'
+    )
+
+    # 3. Índice único, destino del ON CONFLICT de analizar_big_o_individual
+    ejecutar_indices(schema_editor, INDICES, [])
+
+
+def borrar_indices(apps, schema_editor):
+    ejecutar_indices(schema_editor, [], INDICES)
+
+
+class Migration(migrations.Migration):
+    """Índice único por comparación y versión del analizador que bd.sql ya crea en las bases nuevas;
+    sin él falla el INSERT ... ON CONFLICT del análisis Big O. Antes agrega la columna si falta y
+    deja una sola fila por comparación y versión. No es atómica por CREATE INDEX CONCURRENTLY
+    (ver 0002_indices_consultas); al deshacerla la columna se conserva.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('usuarios', '0004_indice_resultados_similitud_individual'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices, atomic=False),
+    ]
@@ -77,6 +77,11 @@ class ModelosIa(models.Model):
     imagen_ia = models.BinaryField(blank=True, null=True)
     color_ia = models.CharField(max_length=7, blank=True, null=True)
     id_usuario = models.ForeignKey('Usuarios', models.DO_NOTHING, db_column='id_usuario', blank=True, null=True)
+    id_modelo_respaldo = models.ForeignKey('self', models.DO_NOTHING, db_column='id_modelo_respaldo', blank=True, null=True)
+    cobertura_activa = models.BooleanField(blank=True, null=True)
+    imagen_hash = models.CharField(max_length=64, blank=True, null=True)
+    imagen_miniatura = models.BinaryField(blank=True, null=True)
+    fecha_imagen = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = False
@@ -106,6 +111,9 @@ class ConfiguracionClaude(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     anthropic_version = models.CharField(max_length=20, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -125,6 +133,9 @@ class ConfiguracionDeepseek(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -144,6 +155,9 @@ class ConfiguracionGemini(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -163,6 +177,9 @@ class ConfiguracionOpenai(models.Model):
     model_name = models.CharField(max_length=100)
     max_tokens = models.IntegerField(blank=True, null=True)
     temperature = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    limite_peticiones_minuto = models.IntegerField(blank=True, null=True)
+    limite_tokens_minuto = models.IntegerField(blank=True, null=True)
+    max_llamadas_simultaneas = models.IntegerField(blank=True, null=True)
     activo = models.BooleanField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(blank=True, null=True)
     fecha_modificacion = models.DateTimeField(blank=True, null=True)
@@ -243,6 +260,7 @@ class ResultadosEficienciaIndividual(models.Model):
     ganador = models.CharField(max_length=20, blank=True, null=True)
     lenguaje = models.CharField(max_length=50, blank=True, null=True)
     lenguaje_analizado = models.CharField(max_length=50, blank=True, null=True)
+    version_analizador = models.IntegerField(default=1)
     fecha_analisis = models.DateTimeField(blank=True, null=True)
 
     class Meta:
@@ -250,6 +268,20 @@ class ResultadosEficienciaIndividual(models.Model):
         db_table = 'resultados_eficiencia_individual'
         app_label = 'app'
 
+class HistorialEficienciaIndividual(models.Model):
+    id_historial_eficiencia = models.AutoField(primary_key=True)
+    id_comparacion_individual = models.ForeignKey(ComparacionesIndividuales, models.DO_NOTHING, db_column='id_comparacion_individual')
+    version_analizador = models.IntegerField()
+    codigo_1_complejidad_temporal = models.CharField(max_length=50)
+    codigo_2_complejidad_temporal = models.CharField(max_length=50)
+    ganador = models.CharField(max_length=20, blank=True, null=True)
+    fecha_analisis = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'historial_eficiencia_individual'
+        app_label = 'app'
+
 class ResultadosSimilitudGrupal(models.Model):
     comparacion_grupal = models.ForeignKey(ComparacionesGrupales, models.DO_NOTHING)
     codigo_fuente_1 = models.ForeignKey(CodigosFuente, models.DO_NOTHING)
@@ -265,6 +297,7 @@ class ResultadosSimilitudGrupal(models.Model):
 class ResultadosSimilitudIndividual(models.Model):
     id_resultado_similitud_individual = models.AutoField(primary_key=True)
     id_comparacion_individual = models.ForeignKey(ComparacionesIndividuales, models.DO_NOTHING, db_column='id_comparacion_individual')
+    id_modelo_ia = models.ForeignKey('ModelosIa', models.DO_NOTHING, db_column='id_modelo_ia', blank=True, null=True)
     porcentaje_similitud = models.IntegerField()
     explicacion = models.TextField(blank=True, null=True)
 
@@ -282,6 +315,47 @@ class Roles(models.Model):
         db_table = 'roles'
         app_label = 'app'
 
+class TrabajosComparacionIa(models.Model):
+    id_trabajo = models.AutoField(primary_key=True)
+    tipo = models.CharField(max_length=20, default='individual')
+    id_comparacion_individual = models.ForeignKey(ComparacionesIndividuales, models.DO_NOTHING, db_column='id_comparacion_individual', blank=True, null=True)
+    id_comparacion_grupal = models.ForeignKey(ComparacionesGrupales, models.DO_NOTHING, db_column='id_comparacion_grupal', blank=True, null=True)
+    estado = models.CharField(max_length=20)
+    intentos = models.IntegerField(default=0)
+    esperas_limite = models.IntegerField(default=0)
+    disponible_desde = models.DateTimeField(blank=True, null=True)
+    resultado = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(blank=True, null=True)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'trabajos_comparacion_ia'
+        app_label = 'app'
+
+class CuposProveedorIa(models.Model):
+    clave = models.CharField(primary_key=True, max_length=150)
+    peticiones_disponibles = models.FloatField(default=0)
+    tokens_disponibles = models.FloatField(default=0)
+    fecha_actualizacion = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'cupos_proveedor_ia'
+        app_label = 'app'
+
+class LlamadasEnCursoIa(models.Model):
+    id_llamada = models.AutoField(primary_key=True)
+    clave = models.CharField(max_length=150)
+    fecha_vencimiento = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'llamadas_en_curso_ia'
+        app_label = 'app'
+
 class Usuarios(models.Model):
     usuario = models.CharField(unique=True, max_length=50)
     contrasenia = models.CharField(max_length=255)
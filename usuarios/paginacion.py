@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+
+class ErrorPaginacion(Exception):
+    """Parámetro de paginación inválido (limit, cursor o fields)"""
+
+    def __init__(self, mensaje):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = 400
+
+    def como_dict(self) -> Dict:
+        return {'error': self.mensaje}
+
+
+def configuracion_paginacion() -> dict:
+    """Configuración de la paginación de los listados con valores por defecto"""
+    config = {
+        'LIMITE_POR_DEFECTO': 50,
+        'LIMITE_MAXIMO': 200,
+    }
+    config.update(getattr(settings, 'PAGINACION', {}))
+    return config
+
+
+def leer_limite(request) -> int:
+    """?limit=N acotado al máximo configurado"""
+    config = configuracion_paginacion()
+    valor = request.GET.get('limit')
+
+    if valor in (None, ''):
+        return config['LIMITE_POR_DEFECTO']
+
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise ErrorPaginacion('El parámetro limit debe ser un número entero')
+
+    if limite < 1:
+        raise ErrorPaginacion('El parámetro limit debe ser mayor a 0')
+
+    return min(limite, config['LIMITE_MAXIMO'])
+
+
+def leer_campos(request, permitidos: List[str]) -> List[str]:
+    """?fields=a,b con los campos pedidos (en el orden de permitidos); sin el parámetro, todos"""
+    valor = request.GET.get('fields')
+    if not valor:
+        return list(permitidos)
+
+    pedidos = {campo.strip() for campo in valor.split(',') if campo.strip()}
+    desconocidos = sorted(pedidos - set(permitidos))
+
+    if desconocidos:
+        raise ErrorPaginacion(
+            f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(permitidos)}"
+        )
+
+    return [campo for campo in permitidos if campo in pedidos]
+
+
+def proyectar(fila: Dict, campos: List[str]) -> Dict:
+    return {campo: fila[campo] for campo in campos}
+
+
+def codificar_cursor(valor, pk: int) -> str:
+    """Cursor opaco con el valor de orden y el id de la última fila entregada"""
+    # isoformat conserva los microsegundos (DjangoJSONEncoder los recorta y se repetirían filas)
+    valor = valor.isoformat() if hasattr(valor, 'isoformat') else valor
+    return base64.urlsafe_b64encode(json.dumps([valor, pk]).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str, campo_modelo) -> Tuple:
+    try:
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return campo_modelo.to_python(valor), int(pk)
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        raise ErrorPaginacion('Cursor inválido')
+
+
+def ordenar_por_cursor(queryset, orden: str, cursor: Optional[Tuple] = None):
+    """Ordena por (orden, pk) y, con cursor (valor, pk), deja solo las filas posteriores.
+
+    La condición repite el límite del campo (campo <= valor) para que la base de datos la resuelva
+    como un rango del índice en vez de recorrer todas las filas anteriores.
+    """
+    campo = orden.lstrip('-')
+    descendente = orden.startswith('-')
+    pk = queryset.model._meta.pk.name
+    queryset = queryset.order_by(orden, f'-{pk}' if descendente else pk)
+
+    if cursor is None:
+        return queryset
+
+    valor, valor_pk = cursor
+    posterior = 'lt' if descendente else 'gt'
+    # NULL va primero si se ordena como el mayor en orden descendente (PostgreSQL) o como el menor en ascendente
+    nulos_primero = descendente == connection.features.nulls_order_largest
+    admite_nulos = queryset.model._meta.get_field(campo).null
+
+    if valor is None:
+        condicion = Q(**{f'{campo}__isnull': True, f'{pk}__{posterior}': valor_pk})
+        if nulos_primero:
+            condicion |= Q(**{f'{campo}__isnull': False})
+        return queryset.filter(condicion)
+
+    condicion = Q(**{f'{campo}__{posterior}e': valor}) & (
+        Q(**{f'{campo}__{posterior}': valor}) | Q(**{f'{pk}__{posterior}': valor_pk})
+    )
+    if admite_nulos and not nulos_primero:
+        condicion |= Q(**{f'{campo}__isnull': True})
+
+    return queryset.filter(condicion)
+
+
+def paginar(queryset, request, orden: str = '-fecha_creacion') -> Tuple[List, Optional[str]]:
+    """Retorna (filas de la página, next_cursor o None si es la última).
+
+    Con un queryset de values() deben estar incluidos el campo de orden y la clave primaria.
+    """
+    limite = leer_limite(request)
+    campo = orden.lstrip('-')
+    pk = queryset.model._meta.pk.name
+    cursor = request.GET.get('cursor')
+
+    if cursor:
+        cursor = decodificar_cursor(cursor, queryset.model._meta.get_field(campo))
+
+    # Una fila de más indica si hay otra página
+    filas = list(ordenar_por_cursor(queryset, orden, cursor or None)[:limite + 1])
+
+    if len(filas) <= limite:
+        return filas, None
+
+    filas = filas[:limite]
+    ultima = filas[-1]
+    if isinstance(ultima, dict):
+        return filas, codificar_cursor(ultima[campo], ultima[pk])
+    return filas, codificar_cursor(getattr(ultima, campo), getattr(ultima, pk))
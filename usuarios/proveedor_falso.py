@@ -0,0 +1,159 @@
+import asyncio
+import json
+import random
+
+# Texto que devuelve el proveedor falso; incluye el formato que buscan los extractores de porcentaje
+RESPUESTA_FALSA = (
+    'Ambos códigos resuelven el problema con la misma estrategia y difieren en nombres '
+    'y en el orden de algunas instrucciones. SIMILITUD GENERAL: 72%'
+)
+
+
+class ProveedorFalso:
+    """Aplicación ASGI que imita las APIs de Anthropic, OpenAI/DeepSeek y Gemini.
+
+    Sirve para pruebas de carga sin gastar tokens: se apunta el endpoint_url de una
+    configuración de modelo a este servidor. El formato se elige por la ruta:
+    ':generateContent'/':streamGenerateContent' para Gemini, '/messages' para Anthropic
+    y cualquier otra para OpenAI/DeepSeek. Cada respuesta tarda `latencia` más un extra
+    aleatorio de hasta `variacion` segundos, y una fracción `tasa_error` responde
+    `status_error` (con Retry-After si es 429). Los bloques con cache_control (Anthropic)
+    se cuentan como escritos en caché la primera vez y como leídos las siguientes.
+    """
+
+    def __init__(self, latencia: float = 1.0, variacion: float = 0.0, tasa_error: float = 0.0,
+                 status_error: int = 500, fragmentos: int = 20):
+        self.latencia = latencia
+        self.variacion = variacion
+        self.tasa_error = tasa_error
+        self.status_error = status_error
+        self.fragmentos = fragmentos
+        self.prefijos_en_cache = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                mensaje = await receive()
+                if mensaje['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif mensaje['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        cuerpo = b''
+        while True:
+            mensaje = await receive()
+            cuerpo += mensaje.get('body', b'')
+            if not mensaje.get('more_body'):
+                break
+
+        payload = json.loads(cuerpo or b'{}')
+        ruta = scope['path']
+        formato = 'gemini' if ':' in ruta.rsplit('/', 1)[-1] else 'claude' if ruta.endswith('/messages') else 'openai'
+        en_stream = payload.get('stream') or ':streamGenerateContent' in ruta
+        latencia = self.latencia + random.uniform(0, self.variacion)
+        uso_cache = self._uso_cache(payload) if formato == 'claude' else {}
+
+        if random.random() < self.tasa_error:
+            await asyncio.sleep(latencia / 10)
+            await self._responder_error(send)
+        elif en_stream:
+            await self._responder_stream(send, formato, latencia, uso_cache)
+        else:
+            await asyncio.sleep(latencia)
+            await self._responder_json(send, formato, uso_cache)
+
+    def _uso_cache(self, payload: dict) -> dict:
+        bloques = [
+            bloque for mensaje in payload.get('messages', []) if isinstance(mensaje.get('content'), list)
+            for bloque in mensaje['content'] if bloque.get('cache_control')
+        ]
+        uso = {'cache_read_input_tokens': 0, 'cache_creation_input_tokens': 0}
+        for bloque in bloques:
+            campo = 'cache_read_input_tokens' if bloque['text'] in self.prefijos_en_cache else 'cache_creation_input_tokens'
+            uso[campo] += len(bloque['text']) // 4
+            self.prefijos_en_cache.add(bloque['text'])
+        return uso
+
+    async def _responder_error(self, send):
+        headers = [(b'content-type', b'application/json')]
+        if self.status_error == 429:
+            headers.append((b'retry-after', b'1'))
+
+        await send({'type': 'http.response.start', 'status': self.status_error, 'headers': headers})
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps({'error': {'message': 'Error simulado por el proveedor falso'}}).encode('utf-8'),
+        })
+
+    async def _responder_json(self, send, formato: str, uso_cache: dict):
+        respuesta = _respuesta_completa(formato, RESPUESTA_FALSA)
+        respuesta.get('usage', {}).update(uso_cache)
+        datos = json.dumps(respuesta).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/json')],
+        })
+        await send({'type': 'http.response.body', 'body': datos})
+
+    async def _responder_stream(self, send, formato: str, latencia: float, uso_cache: dict):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream')],
+        })
+
+        if formato == 'claude':
+            inicio = {'type': 'message_start', 'message': {'usage': {'input_tokens': 100, **uso_cache}}}
+            await send({
+                'type': 'http.response.body',
+                'body': f'data: {json.dumps(inicio)}\n\n'.encode('utf-8'),
+                'more_body': True,
+            })
+
+        # La latencia total se reparte entre los fragmentos, como un modelo generando tokens
+        palabras = RESPUESTA_FALSA.split(' ')
+        tamano = max(1, len(palabras) // self.fragmentos)
+        partes = [' '.join(palabras[i:i + tamano]) + ' ' for i in range(0, len(palabras), tamano)]
+
+        for parte in partes:
+            await asyncio.sleep(latencia / len(partes))
+            await send({
+                'type': 'http.response.body',
+                'body': _evento_stream(formato, parte),
+                'more_body': True,
+            })
+
+        await send({'type': 'http.response.body', 'body': _fin_stream(formato)})
+
+
+def _respuesta_completa(formato: str, texto: str) -> dict:
+    if formato == 'claude':
+        return {'content': [{'type': 'text', 'text': texto}], 'usage': {'input_tokens': 100, 'output_tokens': 50}}
+    if formato == 'gemini':
+        return {
+            'candidates': [{'content': {'parts': [{'text': texto}]}}],
+            'usageMetadata': {'promptTokenCount': 100, 'candidatesTokenCount': 50},
+        }
+    return {'choices': [{'message': {'content': texto}}], 'usage': {'total_tokens': 150}}
+
+
+def _evento_stream(formato: str, texto: str) -> bytes:
+    if formato == 'claude':
+        datos = {'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': texto}}
+    elif formato == 'gemini':
+        datos = {'candidates': [{'content': {'parts': [{'text': texto}]}}]}
+    else:
+        datos = {'choices': [{'delta': {'content': texto}}]}
+    return f'data: {json.dumps(datos)}\n\n'.encode('utf-8')
+
+
+def _fin_stream(formato: str) -> bytes:
+    if formato == 'claude':
+        datos = {'type': 'message_delta', 'usage': {'output_tokens': 50}}
+        return f'data: {json.dumps(datos)}\n\n'.encode('utf-8')
+    if formato == 'gemini':
+        datos = {'candidates': [], 'usageMetadata': {'promptTokenCount': 100, 'candidatesTokenCount': 50}}
+        return f'data: {json.dumps(datos)}\n\n'.encode('utf-8')
+    return f'data: {json.dumps({"choices": [], "usage": {"total_tokens": 150}})}\n\ndata: [DONE]\n\n'.encode('utf-8')
@@ -0,0 +1,289 @@
+from typing import Dict, Optional, Tuple
+
+from usuarios.models import (
+    ConfiguracionClaude,
+    ConfiguracionDeepseek,
+    ConfiguracionGemini,
+    ConfiguracionOpenai,
+)
+
+# IDs de proveedores_ia con los que se crean los modelos en administrador
+PROVEEDOR_CLAUDE = 1
+PROVEEDOR_DEEPSEEK = 2
+PROVEEDOR_GEMINI = 3
+PROVEEDOR_OPENAI = 4
+
+
+class AdaptadorProveedor:
+    """Arma la petición y lee la respuesta de un proveedor de IA"""
+    nombre = None
+    modelo_config = None
+
+    def construir_peticion(self, config, prompt: str, prefijo: str = '') -> Tuple[str, Dict, Dict]:
+        """Retorna (url, headers, payload) para enviar el prompt.
+
+        prefijo es el inicio del prompt que no cambia entre llamadas (las instrucciones de la
+        plantilla); los proveedores con caché de prompt lo marcan para no procesarlo cada vez.
+        """
+        raise NotImplementedError
+
+    def extraer_respuesta(self, response_data: Dict) -> Tuple[str, int]:
+        """Retorna (texto generado, tokens usados)"""
+        raise NotImplementedError
+
+    def uso_respuesta(self, response_data: Dict) -> Dict:
+        """Contadores de uso de una respuesta completa (mismo formato que los acumulados del stream)"""
+        return response_data.get('usage') or {}
+
+    def tokens_cache(self, uso: Dict) -> Dict:
+        """Tokens de entrada leídos de la caché de prompt del proveedor y escritos en ella"""
+        return {'leidos': 0, 'escritos': 0}
+
+    def construir_peticion_stream(self, config, prompt: str, prefijo: str = '') -> Tuple[str, Dict, Dict]:
+        """Igual que construir_peticion pero pidiendo la respuesta como eventos SSE"""
+        url, headers, payload = self.construir_peticion(config, prompt, prefijo)
+        payload['stream'] = True
+        return url, headers, payload
+
+    def extraer_fragmento(self, evento: Dict) -> Tuple[str, Dict]:
+        """Retorna (texto nuevo, contadores de uso) de un evento del stream"""
+        raise NotImplementedError
+
+    def contar_tokens(self, uso: Dict) -> int:
+        """Tokens totales a partir de los contadores acumulados del stream"""
+        raise NotImplementedError
+
+
+class AdaptadorClaude(AdaptadorProveedor):
+    nombre = 'Claude'
+    modelo_config = ConfiguracionClaude
+
+    def construir_peticion(self, config, prompt, prefijo=''):
+        headers = {
+            'Content-Type': 'application/json',
+            'x-api-key': config.api_key,
+            'anthropic-version': config.anthropic_version
+        }
+        payload = {
+            'model': config.model_name,
+            'max_tokens': config.max_tokens,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': self._contenido_con_cache(prompt, prefijo)
+                }
+            ]
+        }
+        return config.endpoint_url, headers, payload
+
+    @staticmethod
+    def _contenido_con_cache(prompt: str, prefijo: str):
+        """Separa las instrucciones fijas en su propio bloque con cache_control; los códigos van después.
+
+        Anthropic ignora la marca si el prefijo no llega al mínimo cacheable del modelo.
+        """
+        if not prefijo.strip() or not prompt.startswith(prefijo):
+            return prompt
+
+        bloques = [{'type': 'text', 'text': prefijo, 'cache_control': {'type': 'ephemeral'}}]
+        if len(prompt) > len(prefijo):
+            bloques.append({'type': 'text', 'text': prompt[len(prefijo):]})
+        return bloques
+
+    def extraer_respuesta(self, response_data):
+        texto = response_data['content'][0]['text']
+        tokens = (
+            response_data.get('usage', {}).get('input_tokens', 0) +
+            response_data.get('usage', {}).get('output_tokens', 0)
+        )
+        return texto, tokens
+
+    def extraer_fragmento(self, evento):
+        # message_start trae los tokens de entrada; message_delta, los de salida acumulados
+        tipo = evento.get('type')
+        if tipo == 'content_block_delta':
+            return evento['delta'].get('text', ''), {}
+        if tipo == 'message_start':
+            return '', evento['message'].get('usage', {})
+        if tipo == 'message_delta':
+            return '', evento.get('usage', {})
+        return '', {}
+
+    def contar_tokens(self, uso):
+        return uso.get('input_tokens', 0) + uso.get('output_tokens', 0)
+
+    def tokens_cache(self, uso):
+        return {
+            'leidos': uso.get('cache_read_input_tokens') or 0,
+            'escritos': uso.get('cache_creation_input_tokens') or 0,
+        }
+
+
+class AdaptadorOpenAI(AdaptadorProveedor):
+    nombre = 'OpenAI'
+    modelo_config = ConfiguracionOpenai
+
+    def construir_peticion(self, config, prompt, prefijo=''):
+        # OpenAI cachea solo los prefijos repetidos: basta con que las instrucciones vayan primero
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {config.api_key}'
+        }
+        payload = {
+            'model': config.model_name,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'max_tokens': config.max_tokens,
+            'temperature': float(config.temperature)
+        }
+        return config.endpoint_url, headers, payload
+
+    def extraer_respuesta(self, response_data):
+        texto = response_data['choices'][0]['message']['content']
+        tokens = response_data.get('usage', {}).get('total_tokens', 0)
+        return texto, tokens
+
+    def construir_peticion_stream(self, config, prompt, prefijo=''):
+        url, headers, payload = super().construir_peticion_stream(config, prompt, prefijo)
+        # Sin esta opción el stream no informa los tokens usados (llegan en el último evento)
+        payload['stream_options'] = {'include_usage': True}
+        return url, headers, payload
+
+    def extraer_fragmento(self, evento):
+        opciones = evento.get('choices') or [{}]
+        texto = opciones[0].get('delta', {}).get('content') or ''
+        return texto, evento.get('usage') or {}
+
+    def contar_tokens(self, uso):
+        return uso.get('total_tokens', 0)
+
+    def tokens_cache(self, uso):
+        # OpenAI no cobra la escritura en caché: solo informa los tokens leídos
+        detalle = uso.get('prompt_tokens_details') or {}
+        return {'leidos': detalle.get('cached_tokens') or 0, 'escritos': 0}
+
+
+class AdaptadorDeepSeek(AdaptadorOpenAI):
+    # DeepSeek usa el mismo formato que la API de chat de OpenAI
+    nombre = 'DeepSeek'
+    modelo_config = ConfiguracionDeepseek
+
+    def tokens_cache(self, uso):
+        # La caché de DeepSeek es automática y la informa en sus propios campos
+        return {'leidos': uso.get('prompt_cache_hit_tokens') or 0, 'escritos': 0}
+
+
+class AdaptadorGemini(AdaptadorProveedor):
+    nombre = 'Gemini'
+    modelo_config = ConfiguracionGemini
+
+    def construir_peticion(self, config, prompt, prefijo=''):
+        # Gemini aplica la caché implícita a los prefijos repetidos sin marcas en la petición
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        # Gemini usa la API key en la URL
+        url = f"{config.endpoint_url}/{config.model_name}:generateContent?key={config.api_key}"
+        payload = {
+            'contents': [
+                {
+                    'parts': [
+                        {
+                            'text': prompt
+                        }
+                    ]
+                }
+            ],
+            'generationConfig': {
+                'maxOutputTokens': config.max_tokens,
+                'temperature': float(config.temperature)
+            }
+        }
+        return url, headers, payload
+
+    def extraer_respuesta(self, response_data):
+        texto = response_data['candidates'][0]['content']['parts'][0]['text']
+        tokens = (
+            response_data.get('usageMetadata', {}).get('promptTokenCount', 0) +
+            response_data.get('usageMetadata', {}).get('candidatesTokenCount', 0)
+        )
+        return texto, tokens
+
+    def uso_respuesta(self, response_data):
+        return response_data.get('usageMetadata') or {}
+
+    def construir_peticion_stream(self, config, prompt, prefijo=''):
+        _, headers, payload = self.construir_peticion(config, prompt, prefijo)
+        # alt=sse hace que streamGenerateContent responda eventos SSE en vez de un arreglo JSON
+        url = f"{config.endpoint_url}/{config.model_name}:streamGenerateContent?alt=sse&key={config.api_key}"
+        return url, headers, payload
+
+    def extraer_fragmento(self, evento):
+        partes = (evento.get('candidates') or [{}])[0].get('content', {}).get('parts', [])
+        texto = ''.join(parte.get('text', '') for parte in partes)
+        # usageMetadata viene acumulado en cada evento
+        return texto, evento.get('usageMetadata', {})
+
+    def contar_tokens(self, uso):
+        return uso.get('promptTokenCount', 0) + uso.get('candidatesTokenCount', 0)
+
+    def tokens_cache(self, uso):
+        return {'leidos': uso.get('cachedContentTokenCount') or 0, 'escritos': 0}
+
+
+# Registro de adaptadores por ModelosIa.proveedor_id
+ADAPTADORES = {
+    PROVEEDOR_CLAUDE: AdaptadorClaude(),
+    PROVEEDOR_DEEPSEEK: AdaptadorDeepSeek(),
+    PROVEEDOR_GEMINI: AdaptadorGemini(),
+    PROVEEDOR_OPENAI: AdaptadorOpenAI(),
+}
+
+
+def resolver_configuracion(modelo_ia, campo_prompt: str = 'id_prompt') -> Tuple[Optional[AdaptadorProveedor], Optional[object]]:
+    """Retorna (adaptador, configuración activa) del modelo con una sola consulta"""
+    adaptador = ADAPTADORES.get(modelo_ia.proveedor_id)
+
+    if adaptador:
+        config = adaptador.modelo_config.objects.select_related(campo_prompt).filter(
+            id_modelo_ia_id=modelo_ia.id,
+            activo=True
+        ).first()
+        return (adaptador, config) if config else (None, None)
+
+    # Modelos sin proveedor registrado: buscar en cada tabla de configuración
+    for adaptador in ADAPTADORES.values():
+        config = adaptador.modelo_config.objects.select_related(campo_prompt).filter(
+            id_modelo_ia_id=modelo_ia.id,
+            activo=True
+        ).first()
+        if config:
+            return adaptador, config
+
+    return None, None
+
+
+async def aresolver_configuracion(modelo_ia, campo_prompt: str = 'id_prompt') -> Tuple[Optional[AdaptadorProveedor], Optional[object]]:
+    """Versión asíncrona de resolver_configuracion (ORM asíncrono de Django)"""
+    adaptador = ADAPTADORES.get(modelo_ia.proveedor_id)
+
+    if adaptador:
+        config = await adaptador.modelo_config.objects.select_related(campo_prompt).filter(
+            id_modelo_ia_id=modelo_ia.id,
+            activo=True
+        ).afirst()
+        return (adaptador, config) if config else (None, None)
+
+    for adaptador in ADAPTADORES.values():
+        config = await adaptador.modelo_config.objects.select_related(campo_prompt).filter(
+            id_modelo_ia_id=modelo_ia.id,
+            activo=True
+        ).afirst()
+        if config:
+            return adaptador, config
+
+    return None, None
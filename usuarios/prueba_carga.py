@@ -0,0 +1,65 @@
+import math
+from collections import defaultdict
+from typing import Dict, List
+
+
+def percentil(valores: List[float], porcentaje: float) -> float:
+    """Percentil por rango más cercano (el valor que deja por debajo `porcentaje`% de las muestras)"""
+    if not valores:
+        return 0.0
+
+    ordenados = sorted(valores)
+    posicion = max(1, math.ceil(porcentaje / 100 * len(ordenados)))
+    return ordenados[posicion - 1]
+
+
+class Mediciones:
+    """Latencias y errores por endpoint durante una prueba de carga"""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.orden = []
+
+    def registrar(self, endpoint: str, segundos: float, exito: bool) -> None:
+        if endpoint not in self.orden:
+            self.orden.append(endpoint)
+
+        if exito:
+            self.latencias[endpoint].append(segundos)
+        else:
+            self.errores[endpoint] += 1
+
+    def resumen(self, duracion: float) -> List[Dict]:
+        """Una fila por endpoint con p50/p95/p99 (segundos) y peticiones exitosas por segundo"""
+        filas = []
+
+        for endpoint in self.orden:
+            latencias = self.latencias[endpoint]
+            filas.append({
+                'endpoint': endpoint,
+                'ok': len(latencias),
+                'errores': self.errores[endpoint],
+                'p50': percentil(latencias, 50),
+                'p95': percentil(latencias, 95),
+                'p99': percentil(latencias, 99),
+                'por_segundo': len(latencias) / duracion if duracion else 0.0,
+            })
+
+        return filas
+
+
+def formatear_resumen(filas: List[Dict]) -> str:
+    """Tabla de texto con el resumen de Mediciones"""
+    ancho = max([len('endpoint')] + [len(fila['endpoint']) for fila in filas])
+    lineas = [
+        f'{"endpoint":<{ancho}} {"ok":>6} {"errores":>8} {"p50 s":>8} {"p95 s":>8} {"p99 s":>8} {"req/s":>8}'
+    ]
+
+    for fila in filas:
+        lineas.append(
+            f"{fila['endpoint']:<{ancho}} {fila['ok']:>6} {fila['errores']:>8} {fila['p50']:>8.3f} "
+            f"{fila['p95']:>8.3f} {fila['p99']:>8.3f} {fila['por_segundo']:>8.2f}"
+        )
+
+    return '\n'.join(lineas)
@@ -0,0 +1,315 @@
+import asyncio
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+
+from usuarios.limites_proveedor import en_hilo
+from usuarios.models import ModelosIa
+from usuarios.prueba_carga import percentil
+
+# Errores de red tras los que conviene probar con otro proveedor
+ERRORES_RED = (requests.Timeout, requests.ConnectionError, httpx.TransportError)
+
+# Latencias recientes por modelo (en este proceso) para calcular el p95
+_latencias = defaultdict(deque)
+_candado_latencias = threading.Lock()
+
+# Hilos de la cobertura, compartidos por todas las peticiones del proceso
+_ejecutor_cobertura = None
+_candado_ejecutor = threading.Lock()
+
+
+class LlamadaCancelada(Exception):
+    """La cobertura ya tiene ganador: la llamada perdedora no sigue"""
+
+
+class Cancelacion:
+    """Permite detener desde otro hilo la llamada perdedora de una cobertura: al cancelarla
+    se ejecutan los cierres que registró (liberar su cupo, cerrar su respuesta)"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._cierres = []
+        self.cancelada = False
+
+    def al_cancelar(self, cierre: Callable) -> None:
+        """Registra un cierre; si ya estaba cancelada se ejecuta enseguida"""
+        with self._candado:
+            if not self.cancelada:
+                self._cierres.append(cierre)
+                return
+        cierre()
+
+    def verificar(self) -> None:
+        if self.cancelada:
+            raise LlamadaCancelada()
+
+    def cancelar(self) -> None:
+        with self._candado:
+            self.cancelada = True
+            cierres, self._cierres = self._cierres, []
+        for cierre in cierres:
+            try:
+                cierre()
+            except Exception:
+                # Cerrar una respuesta a medio leer puede fallar; la llamada ya se descarta
+                pass
+
+
+# Timeout por intento sin streaming: las respuestas largas tardan de 20 a 60s y no se cortan;
+# la cola lenta la recorta la cobertura por p95, no el timeout
+TIMEOUT_LLAMADA = 60
+
+
+def configuracion_respaldo() -> dict:
+    """Configuración del respaldo y la cobertura entre modelos con valores por defecto"""
+    config = {
+        'TIMEOUT_CON_RESPALDO': 20,
+        'MAX_RESPALDOS': 2,
+        'DEMORA_COBERTURA': 8.0,
+        'DEMORA_COBERTURA_MINIMA': 1.0,
+        'MIN_MUESTRAS': 20,
+        'MUESTRAS_LATENCIA': 200,
+        'HILOS_COBERTURA': 16,
+    }
+    config.update(getattr(settings, 'RESPALDO_IA', {}))
+    return config
+
+
+def ejecutor_cobertura() -> ThreadPoolExecutor:
+    """Pool de hilos de la cobertura, creado la primera vez que se usa"""
+    global _ejecutor_cobertura
+
+    if _ejecutor_cobertura is None:
+        with _candado_ejecutor:
+            if _ejecutor_cobertura is None:
+                _ejecutor_cobertura = ThreadPoolExecutor(
+                    max_workers=configuracion_respaldo()['HILOS_COBERTURA'],
+                    thread_name_prefix='cobertura-ia'
+                )
+
+    return _ejecutor_cobertura
+
+
+def registrar_latencia(id_modelo: int, segundos: float) -> None:
+    """Guarda la latencia de una respuesta real del proveedor (no las de caché)"""
+    maximo = configuracion_respaldo()['MUESTRAS_LATENCIA']
+
+    with _candado_latencias:
+        muestras = _latencias[id_modelo]
+        muestras.append(segundos)
+        while len(muestras) > maximo:
+            muestras.popleft()
+
+
+def demora_cobertura(id_modelo: int) -> float:
+    """Segundos a esperar al modelo antes de lanzar la cobertura: su p95 reciente"""
+    config = configuracion_respaldo()
+
+    with _candado_latencias:
+        muestras = list(_latencias[id_modelo])
+
+    if len(muestras) < config['MIN_MUESTRAS']:
+        return config['DEMORA_COBERTURA']
+
+    return max(config['DEMORA_COBERTURA_MINIMA'], percentil(muestras, 95))
+
+
+def cadena_respaldos(modelo_ia) -> List:
+    """Respaldos activos del modelo en orden (sin ciclos y hasta MAX_RESPALDOS)"""
+    maximo = configuracion_respaldo()['MAX_RESPALDOS']
+    respaldos = []
+    vistos = {modelo_ia.id}
+    id_siguiente = modelo_ia.id_modelo_respaldo_id
+
+    while id_siguiente and id_siguiente not in vistos and len(respaldos) < maximo:
+        respaldo = ModelosIa.objects.filter(id=id_siguiente, activo=True).first()
+        if respaldo is None:
+            break
+        respaldos.append(respaldo)
+        vistos.add(respaldo.id)
+        id_siguiente = respaldo.id_modelo_respaldo_id
+
+    return respaldos
+
+
+async def acadena_respaldos(modelo_ia) -> List:
+    maximo = configuracion_respaldo()['MAX_RESPALDOS']
+    respaldos = []
+    vistos = {modelo_ia.id}
+    id_siguiente = modelo_ia.id_modelo_respaldo_id
+
+    while id_siguiente and id_siguiente not in vistos and len(respaldos) < maximo:
+        respaldo = await ModelosIa.objects.filter(id=id_siguiente, activo=True).afirst()
+        if respaldo is None:
+            break
+        respaldos.append(respaldo)
+        vistos.add(respaldo.id)
+        id_siguiente = respaldo.id_modelo_respaldo_id
+
+    return respaldos
+
+
+def debe_pasar_al_respaldo(error: Exception) -> bool:
+    """Timeouts, errores de conexión, 429 y 5xx; los 4xx se repetirían igual con otro modelo"""
+    if isinstance(error, ERRORES_RED):
+        return True
+    status = getattr(error, 'status', None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def intento_fallido(candidato: Tuple, error: Exception) -> Dict:
+    modelo_ia = candidato[0]
+    return {
+        'modelo_ia_id': modelo_ia.id,
+        'modelo': modelo_ia.nombre,
+        'error': getattr(error, 'mensaje', None) or str(error) or type(error).__name__,
+    }
+
+
+def ejecutar_con_respaldo(candidatos: List[Tuple], intentar: Callable, cobertura: bool) -> Tuple[Tuple, Dict, Dict]:
+    """Prueba los candidatos (modelo, ...) en orden hasta que uno responda.
+
+    intentar(candidato, timeout, cancelacion=None) hace la llamada. Con cobertura, si el primero
+    tarda más que su p95 se lanza también el segundo y se usa el que responda primero; el otro
+    se detiene con su Cancelacion.
+    Retorna (candidato que respondió, resultado, informe de intentos).
+    """
+    timeout = TIMEOUT_LLAMADA
+    informe = {'modelo_solicitado_id': candidatos[0][0].id, 'fallidos': [], 'cobertura_lanzada': False}
+    pendientes = list(candidatos)
+    ultimo_error = None
+
+    # 1. Primario con cobertura del segundo candidato
+    if cobertura and len(pendientes) > 1:
+        primario, secundario = pendientes.pop(0), pendientes.pop(0)
+        candidato, resultado, ultimo_error = _con_cobertura(primario, secundario, intentar, timeout, informe)
+        if candidato:
+            return candidato, resultado, informe
+
+    # 2. Resto de candidatos, uno tras otro
+    for posicion, candidato in enumerate(pendientes):
+        try:
+            return candidato, intentar(candidato, timeout), informe
+        except Exception as e:
+            if not debe_pasar_al_respaldo(e) or posicion == len(pendientes) - 1:
+                raise
+            informe['fallidos'].append(intento_fallido(candidato, e))
+
+    raise ultimo_error
+
+
+def _con_cobertura(primario: Tuple, secundario: Tuple, intentar: Callable, timeout: float, informe: Dict):
+    """Retorna (candidato, resultado, None) del primero que responde, o (None, None, último error)"""
+    ejecutor = ejecutor_cobertura()
+    en_curso = {}
+    cancelaciones = {}
+    restantes = [secundario]
+    ultimo_error = None
+
+    def lanzar(candidato):
+        cancelacion = Cancelacion()
+        futuro = ejecutor.submit(en_hilo(intentar), candidato, timeout, cancelacion)
+        en_curso[futuro] = candidato
+        cancelaciones[futuro] = cancelacion
+
+    lanzar(primario)
+
+    try:
+        while en_curso or restantes:
+            # El primario falló antes de su p95: el secundario se lanza ya
+            if not en_curso:
+                lanzar(restantes.pop())
+                continue
+
+            espera = demora_cobertura(primario[0].id) if restantes else None
+            terminados, _ = wait(en_curso, timeout=espera, return_when=FIRST_COMPLETED)
+
+            # El primario superó su p95: se lanza la cobertura sin cancelar al primario
+            if not terminados:
+                lanzar(restantes.pop())
+                informe['cobertura_lanzada'] = True
+                continue
+
+            for futuro in terminados:
+                candidato = en_curso.pop(futuro)
+                try:
+                    return candidato, futuro.result(), None
+                except Exception as e:
+                    if not debe_pasar_al_respaldo(e):
+                        raise
+                    informe['fallidos'].append(intento_fallido(candidato, e))
+                    ultimo_error = e
+
+        return None, None, ultimo_error
+    finally:
+        # La llamada perdedora libera su cupo y cierra su respuesta; si no empezó, no corre
+        for futuro in en_curso:
+            futuro.cancel()
+            cancelaciones[futuro].cancelar()
+
+
+async def aejecutar_con_respaldo(candidatos: List[Tuple], aintentar: Callable, cobertura: bool) -> Tuple[Tuple, Dict, Dict]:
+    """Versión asíncrona de ejecutar_con_respaldo (la llamada perdedora de la cobertura se cancela)"""
+    timeout = TIMEOUT_LLAMADA
+    informe = {'modelo_solicitado_id': candidatos[0][0].id, 'fallidos': [], 'cobertura_lanzada': False}
+    pendientes = list(candidatos)
+    ultimo_error = None
+
+    if cobertura and len(pendientes) > 1:
+        primario, secundario = pendientes.pop(0), pendientes.pop(0)
+        candidato, resultado, ultimo_error = await _acon_cobertura(primario, secundario, aintentar, timeout, informe)
+        if candidato:
+            return candidato, resultado, informe
+
+    for posicion, candidato in enumerate(pendientes):
+        try:
+            return candidato, await aintentar(candidato, timeout), informe
+        except Exception as e:
+            if not debe_pasar_al_respaldo(e) or posicion == len(pendientes) - 1:
+                raise
+            informe['fallidos'].append(intento_fallido(candidato, e))
+
+    raise ultimo_error
+
+
+async def _acon_cobertura(primario: Tuple, secundario: Tuple, aintentar: Callable, timeout: float, informe: Dict):
+    en_curso = {asyncio.ensure_future(aintentar(primario, timeout)): primario}
+    restantes = [secundario]
+    ultimo_error: Optional[Exception] = None
+
+    try:
+        while en_curso or restantes:
+            if not en_curso:
+                candidato = restantes.pop()
+                en_curso[asyncio.ensure_future(aintentar(candidato, timeout))] = candidato
+                continue
+
+            espera = demora_cobertura(primario[0].id) if restantes else None
+            terminados, _ = await asyncio.wait(en_curso, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+
+            if not terminados:
+                candidato = restantes.pop()
+                en_curso[asyncio.ensure_future(aintentar(candidato, timeout))] = candidato
+                informe['cobertura_lanzada'] = True
+                continue
+
+            for tarea in terminados:
+                candidato = en_curso.pop(tarea)
+                try:
+                    return candidato, tarea.result(), None
+                except Exception as e:
+                    if not debe_pasar_al_respaldo(e):
+                        raise
+                    informe['fallidos'].append(intento_fallido(candidato, e))
+                    ultimo_error = e
+
+        return None, None, ultimo_error
+    finally:
+        for tarea in en_curso:
+            tarea.cancel()
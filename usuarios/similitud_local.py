@@ -0,0 +1,174 @@
+import re
+import time
+import zlib
+from typing import Dict, List, Set
+
+from django.conf import settings
+
+# Comentarios por familia de lenguaje (claves de LENGUAJES_SOPORTADOS)
+COMENTARIO_NUMERAL = r'\#[^\n]*'
+COMENTARIO_LINEA = r'//[^\n]*'
+COMENTARIO_BLOQUE = r'/\*.*?\*/'
+
+COMENTARIOS_POR_LENGUAJE = {
+    'python': [COMENTARIO_NUMERAL],
+    'ruby': [COMENTARIO_NUMERAL, r'^=begin.*?^=end'],
+    'php': [COMENTARIO_NUMERAL, COMENTARIO_LINEA, COMENTARIO_BLOQUE],
+}
+COMENTARIOS_DEFECTO = [COMENTARIO_LINEA, COMENTARIO_BLOQUE]
+
+# Cadenas: triples de Python primero para que no se corten en la primera comilla
+CADENA = r'"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`'
+NUMERO = r'\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)[a-zA-Z]*\b'
+IDENTIFICADOR = r'[A-Za-z_$][\w$]*'
+OPERADOR = r'[^\w\s]'
+
+# Palabras reservadas: se conservan porque marcan la estructura del código
+PALABRAS_RESERVADAS = frozenset('''
+    if else elif for while do switch case default break continue return try catch except finally
+    throw throws raise class struct interface enum def function func fn fun lambda new delete
+    import from package using namespace public private protected static const final var let val
+    void int long short float double char bool boolean string byte unsigned signed auto
+    true false null none nil self this super in is not and or yield async await match
+    foreach as end begin then unless until loop impl trait mut pub where extends implements
+    override virtual abstract sizeof typedef template typename goto with pass del global
+    nonlocal assert echo print println printf len range go defer chan map select type
+'''.split())
+
+# Tokens normalizados: renombrar variables o cambiar literales no cambia la huella
+TOKEN_IDENTIFICADOR = 'V'
+TOKEN_NUMERO = 'N'
+TOKEN_CADENA = 'S'
+
+_patrones_por_lenguaje = {}
+
+
+def configuracion_similitud_local() -> dict:
+    """Configuración del motor local con valores por defecto"""
+    config = {
+        'TAMANO_KGRAMA': 5,
+        'VENTANA': 4,
+        'UMBRAL_IDENTICO': 0.95,
+        'UMBRAL_SIN_RELACION': 0.05,
+        'OMITIR_IA': True,
+    }
+    config.update(getattr(settings, 'SIMILITUD_LOCAL', {}))
+    return config
+
+
+def _patron_tokens(lenguaje: str):
+    """Expresión compilada (una por lenguaje) que separa comentarios, cadenas, números, nombres y operadores"""
+    patron = _patrones_por_lenguaje.get(lenguaje)
+
+    if patron is None:
+        comentarios = '|'.join(COMENTARIOS_POR_LENGUAJE.get(lenguaje, COMENTARIOS_DEFECTO))
+        patron = re.compile(
+            rf'(?P<comentario>{comentarios})|(?P<cadena>{CADENA})|(?P<numero>{NUMERO})'
+            rf'|(?P<nombre>{IDENTIFICADOR})|(?P<operador>{OPERADOR})',
+            re.DOTALL | re.MULTILINE
+        )
+        _patrones_por_lenguaje[lenguaje] = patron
+
+    return patron
+
+
+def tokenizar(codigo: str, lenguaje: str = None) -> List[str]:
+    """Tokens normalizados del código, sin comentarios ni espacios"""
+    tokens = []
+
+    for match in _patron_tokens(lenguaje).finditer(codigo):
+        tipo = match.lastgroup
+
+        if tipo == 'comentario':
+            continue
+        if tipo == 'cadena':
+            tokens.append(TOKEN_CADENA)
+        elif tipo == 'numero':
+            tokens.append(TOKEN_NUMERO)
+        elif tipo == 'nombre':
+            palabra = match.group().lower()
+            tokens.append(palabra if palabra in PALABRAS_RESERVADAS else TOKEN_IDENTIFICADOR)
+        else:
+            tokens.append(match.group())
+
+    return tokens
+
+
+def _hashes_kgramas(tokens: List[str], k: int) -> List[int]:
+    if len(tokens) < k:
+        return [zlib.crc32(' '.join(tokens).encode('utf-8'))] if tokens else []
+
+    return [
+        zlib.crc32(' '.join(tokens[i:i + k]).encode('utf-8'))
+        for i in range(len(tokens) - k + 1)
+    ]
+
+
+def winnowing(hashes: List[int], ventana: int) -> Set[int]:
+    """Selecciona el mínimo de cada ventana (el más a la derecha en empates), como MOSS"""
+    if len(hashes) <= ventana:
+        return {min(hashes)} if hashes else set()
+
+    seleccion = set()
+    for inicio in range(len(hashes) - ventana + 1):
+        tramo = hashes[inicio:inicio + ventana]
+        minimo = min(tramo)
+        # Posición absoluta del mínimo más a la derecha
+        posicion = inicio + ventana - 1 - tramo[::-1].index(minimo)
+        seleccion.add((posicion, minimo))
+
+    return {valor for _, valor in seleccion}
+
+
+def huellas(codigo: str, lenguaje: str = None, k: int = None, ventana: int = None) -> Set[int]:
+    """Huellas de winnowing sobre los k-gramas de tokens normalizados"""
+    config = configuracion_similitud_local()
+    k = k or config['TAMANO_KGRAMA']
+    ventana = ventana or config['VENTANA']
+    return winnowing(_hashes_kgramas(tokenizar(codigo, lenguaje), k), ventana)
+
+
+def jaccard(huellas_1: Set[int], huellas_2: Set[int]) -> float:
+    """Proporción de huellas compartidas entre dos códigos (0 a 1)"""
+    if not huellas_1 and not huellas_2:
+        return 1.0
+
+    union = len(huellas_1 | huellas_2)
+    return len(huellas_1 & huellas_2) / union if union else 0.0
+
+
+def contencion(huellas_1: Set[int], huellas_2: Set[int]) -> float:
+    """Qué parte del código más corto aparece dentro del otro (0 a 1)"""
+    if not huellas_1 and not huellas_2:
+        return 1.0
+
+    menor = min(len(huellas_1), len(huellas_2))
+    return len(huellas_1 & huellas_2) / menor if menor else 0.0
+
+
+def comparar_local(codigo_1: str, codigo_2: str, lenguaje: str = None) -> Dict:
+    """Similitud local del par y si el resultado es lo bastante claro para no consultar a la IA"""
+    config = configuracion_similitud_local()
+    inicio = time.perf_counter()
+
+    huellas_1 = huellas(codigo_1, lenguaje)
+    huellas_2 = huellas(codigo_2, lenguaje)
+    valor_jaccard = jaccard(huellas_1, huellas_2)
+    valor_contencion = contencion(huellas_1, huellas_2)
+
+    if valor_jaccard >= config['UMBRAL_IDENTICO']:
+        veredicto = 'identico'
+    elif valor_contencion <= config['UMBRAL_SIN_RELACION']:
+        veredicto = 'sin_relacion'
+    else:
+        veredicto = 'requiere_ia'
+
+    return {
+        'porcentaje_similitud': round(valor_jaccard * 100),
+        'jaccard': round(valor_jaccard, 4),
+        'contencion': round(valor_contencion, 4),
+        'huellas': [len(huellas_1), len(huellas_2)],
+        'veredicto': veredicto,
+        'omitir_ia': config['OMITIR_IA'] and veredicto != 'requiere_ia',
+        'tiempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+    }
@@ -0,0 +1,259 @@
+import json
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from usuarios import cliente_http
+from usuarios.cache_similitud import obtener_resultado
+from usuarios.comparacion_ia import (
+    ErrorComparacionIA,
+    clave_cache_comparacion,
+    completar_resultado_ia,
+    con_informe_respaldo,
+    construir_prompt_comparacion,
+    guardar_resultado_comparacion,
+    lenguaje_comparacion,
+    prefijo_comparacion,
+    reservar_cupo_proveedor,
+    resolver_candidatos,
+    resultado_solo_local,
+    similitud_local_comparacion,
+)
+from usuarios.respaldo_ia import TIMEOUT_LLAMADA, configuracion_respaldo, debe_pasar_al_respaldo, intento_fallido
+
+
+class TransmisionIA:
+    """Petición en modo streaming a un proveedor; al iterarla entrega el texto a medida que llega"""
+
+    def __init__(self, adaptador, config, prompt: str, timeout: int = 60, prefijo: str = ''):
+        self.adaptador = adaptador
+        self.config = config
+        self.prompt = prompt
+        self.prefijo = prefijo
+        self.timeout = timeout
+        self.response = None
+        self.cupo = None
+        self.texto = ''
+        self.tokens_usados = 0
+        self.tokens_cache = None
+        self.tiempo_respuesta = 0.0
+        self.tiempo_primer_fragmento = None
+        self._inicio = None
+
+    def abrir(self) -> 'TransmisionIA':
+        """Envía la petición y valida el status antes de empezar a responder al cliente"""
+        url, headers, payload = self.adaptador.construir_peticion_stream(self.config, self.prompt, self.prefijo)
+
+        # El cupo del modelo queda tomado hasta que termina el stream
+        self.cupo = reservar_cupo_proveedor(self.adaptador, self.config, self.prompt, self.timeout)
+        self._inicio = time.time()
+
+        try:
+            self.response = cliente_http.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            )
+        except Exception:
+            self.cupo.liberar()
+            raise
+
+        if self.response.status_code != 200:
+            detalle = self.response.text
+            self.response.close()
+            self.cupo.liberar()
+            raise ErrorComparacionIA(
+                f'Error de la API {self.adaptador.nombre}: {self.response.status_code}',
+                status=self.response.status_code,
+                detalle=detalle
+            )
+
+        return self
+
+    def __iter__(self) -> Iterator[str]:
+        partes = []
+        uso = {}
+
+        try:
+            for evento in cliente_http.eventos_sse(self.response):
+                if 'error' in evento:
+                    raise ErrorComparacionIA(
+                        f'Error de la API {self.adaptador.nombre} durante el stream',
+                        status=502,
+                        detalle=evento['error']
+                    )
+
+                fragmento, uso_evento = self.adaptador.extraer_fragmento(evento)
+                uso.update(uso_evento)
+
+                if fragmento:
+                    if self.tiempo_primer_fragmento is None:
+                        self.tiempo_primer_fragmento = time.time() - self._inicio
+                    partes.append(fragmento)
+                    yield fragmento
+        finally:
+            self.texto = ''.join(partes)
+            self.tokens_usados = self.adaptador.contar_tokens(uso)
+            self.tokens_cache = self.adaptador.tokens_cache(uso)
+            self.tiempo_respuesta = time.time() - self._inicio
+            self.cerrar()
+
+    def cerrar(self) -> None:
+        """Cierra la respuesta del proveedor y libera el cupo (se puede llamar más de una vez)"""
+        if self.response is not None:
+            self.response.close()
+        if self.cupo is not None:
+            self.cupo.liberar(self.tokens_usados)
+
+
+def evento_sse(evento: str, datos: Dict) -> str:
+    """Formatea un evento Server-Sent Events"""
+    return f'event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n'
+
+
+class EventosSSE:
+    """Contenido de la respuesta SSE. Django llama a close() al cerrar la respuesta, aunque el
+    cliente se haya desconectado antes de empezar a leer: ahí se cierra la transmisión"""
+
+    def __init__(self, eventos: Iterator[str], transmision: Optional[TransmisionIA] = None):
+        self.eventos = iter(eventos)
+        self.transmision = transmision
+
+    def __iter__(self) -> Iterator[str]:
+        return self.eventos
+
+    def close(self) -> None:
+        if hasattr(self.eventos, 'close'):
+            self.eventos.close()
+        if self.transmision is not None:
+            self.transmision.cerrar()
+
+
+class EventosSSEAsync(EventosSSE):
+    """Versión para ASGI: cada evento se pide por separado en el hilo de la petición, en vez de
+    que Django junte todo el stream en una lista antes de enviarlo"""
+
+    __iter__ = None
+
+    async def __aiter__(self):
+        siguiente = sync_to_async(next)
+        while True:
+            evento = await siguiente(self.eventos, None)
+            if evento is None:
+                return
+            yield evento
+
+
+def respuesta_sse(request, eventos: Iterator[str], transmision: Optional[TransmisionIA] = None) -> StreamingHttpResponse:
+    """StreamingHttpResponse con los headers para que ni el navegador ni el proxy acumulen el stream"""
+    clase = EventosSSEAsync if isinstance(request, ASGIRequest) else EventosSSE
+    response = StreamingHttpResponse(clase(eventos, transmision), content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx: no bufferizar la respuesta
+    return response
+
+
+def transmitir_fragmentos(transmision: TransmisionIA, al_terminar) -> Iterator[str]:
+    """Eventos 'fragmento' con el texto y, al cerrar el stream, 'fin' con lo que retorne al_terminar"""
+    # El evento inicial sale de inmediato, antes del primer token del proveedor
+    yield evento_sse('inicio', {
+        'proveedor': transmision.adaptador.nombre,
+        'model_name': transmision.config.model_name
+    })
+
+    try:
+        for fragmento in transmision:
+            yield evento_sse('fragmento', {'texto': fragmento})
+    except ErrorComparacionIA as e:
+        yield evento_sse('error', e.como_dict())
+        return
+    except Exception as e:
+        # Los headers ya se enviaron: el error solo puede llegar como evento
+        yield evento_sse('error', {'error': f'Error en la petición HTTP: {str(e)}'})
+        return
+
+    try:
+        resultado = al_terminar(transmision)
+    except Exception as e:
+        yield evento_sse('error', {'error': f'Error interno: {str(e)}'})
+        return
+
+    resultado['tiempo_primer_fragmento_segundos'] = round(transmision.tiempo_primer_fragmento or 0, 2)
+    yield evento_sse('fin', resultado)
+
+
+def transmitir_comparacion_ia(comparacion) -> Tuple[Iterator[str], Optional[TransmisionIA]]:
+    """Valida la comparación y abre el stream; retorna (eventos SSE para el cliente, transmisión
+    abierta o None si la respuesta no viene del proveedor).
+
+    Los errores previos al stream (configuración, status del proveedor) se lanzan como
+    ErrorComparacionIA para que la vista responda con el status correspondiente. Mientras el
+    stream no empieza, un proveedor caído pasa al siguiente respaldo del modelo.
+    """
+    # 1. Obtener el modelo IA
+    if not comparacion.id_modelo_ia:
+        raise ErrorComparacionIA('La comparación no tiene un modelo de IA asignado', status=400)
+
+    # 2. Similitud local: si el par es claro no se consulta a la IA
+    similitud_local = similitud_local_comparacion(comparacion)
+
+    if similitud_local['omitir_ia']:
+        return iter([evento_sse('fin', resultado_solo_local(comparacion, similitud_local))]), None
+
+    # 3. Configuración del modelo y de sus respaldos
+    candidatos = resolver_candidatos(comparacion.id_modelo_ia)
+    informe = {'modelo_solicitado_id': comparacion.id_modelo_ia.id, 'fallidos': [], 'cobertura_lanzada': False}
+    # En streaming el timeout cubre la conexión y el primer byte: con respaldo conviene cortarlo antes
+    timeout = configuracion_respaldo()['TIMEOUT_CON_RESPALDO'] if len(candidatos) > 1 else TIMEOUT_LLAMADA
+    lenguaje = lenguaje_comparacion(comparacion)
+
+    for posicion, candidato in enumerate(candidatos):
+        modelo_ia, adaptador, config, prompt_config = candidato
+        clave = clave_cache_comparacion(config, prompt_config, comparacion.codigo_1, comparacion.codigo_2)
+
+        # 4. Respuesta en caché: se envía completa en un solo fragmento
+        en_cache = obtener_resultado(clave)
+        if en_cache:
+            resultado_ia = completar_resultado_ia(
+                clave, en_cache['respuesta_ia'], en_cache['tokens_usados'], 0.0, True
+            )
+            resultado = con_informe_respaldo(guardar_resultado_comparacion(
+                comparacion, adaptador, config, prompt_config, resultado_ia, similitud_local, modelo_ia=modelo_ia
+            ), candidatos, informe)
+            return iter([
+                evento_sse('fragmento', {'texto': resultado_ia['respuesta_ia']}),
+                evento_sse('fin', resultado)
+            ]), None
+
+        # 5. Abrir el stream del proveedor con los códigos compactados
+        prompt_procesado, compactacion = construir_prompt_comparacion(
+            adaptador, prompt_config, comparacion.codigo_1, comparacion.codigo_2, lenguaje
+        )
+        try:
+            transmision = TransmisionIA(
+                adaptador, config, prompt_procesado, timeout=timeout, prefijo=prefijo_comparacion(prompt_config)
+            ).abrir()
+        except Exception as e:
+            if not debe_pasar_al_respaldo(e) or posicion == len(candidatos) - 1:
+                raise
+            informe['fallidos'].append(intento_fallido(candidato, e))
+            continue
+
+        break
+
+    # 6. Al terminar: porcentaje, caché y base de datos con el texto completo
+    def al_terminar(transmision):
+        resultado_ia = completar_resultado_ia(
+            clave, transmision.texto, transmision.tokens_usados, transmision.tiempo_respuesta, False,
+            compactacion, transmision.tokens_cache
+        )
+        return con_informe_respaldo(guardar_resultado_comparacion(
+            comparacion, adaptador, config, prompt_config, resultado_ia, similitud_local, modelo_ia=modelo_ia
+        ), candidatos, informe)
+
+    return transmitir_fragmentos(transmision, al_terminar), transmision
@@ -0,0 +1,224 @@
+import threading
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from usuarios.comparacion_grupal import ejecutar_comparacion_grupal
+from usuarios.comparacion_ia import ErrorComparacionIA, LimiteProveedorExcedido, ejecutar_comparacion_ia
+from usuarios.models import ComparacionesGrupales, ComparacionesIndividuales, TrabajosComparacionIa
+
+# Estados posibles de un trabajo en la cola
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_PROCESO = 'en_proceso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_FALLIDO = 'fallido'
+
+# Tipos de trabajo
+TIPO_INDIVIDUAL = 'individual'
+TIPO_GRUPAL = 'grupal'
+
+# Códigos HTTP del proveedor que vale la pena reintentar
+STATUS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+def configuracion_trabajos() -> dict:
+    """Configuración de la cola con valores por defecto"""
+    config = {
+        'TRABAJADORES': 4,
+        'INTERVALO_SONDEO': 1.0,
+        'MAX_INTENTOS': 3,
+        'MAX_ESPERAS_LIMITE': 20,
+        'TIEMPO_MAXIMO_PROCESO': 300,
+        'TIEMPO_MAXIMO_PROCESO_GRUPAL': 3600,
+    }
+    config.update(getattr(settings, 'TRABAJOS_IA', {}))
+    return config
+
+
+def _encolar(tipo: str, **comparacion) -> TrabajosComparacionIa:
+    """Crea un trabajo pendiente, o retorna el que ya está en cola para la comparación"""
+    with transaction.atomic():
+        trabajo = TrabajosComparacionIa.objects.select_for_update().filter(
+            estado__in=[ESTADO_PENDIENTE, ESTADO_EN_PROCESO],
+            **comparacion
+        ).first()
+
+        if trabajo:
+            return trabajo
+
+        return TrabajosComparacionIa.objects.create(
+            tipo=tipo,
+            estado=ESTADO_PENDIENTE,
+            intentos=0,
+            fecha_creacion=timezone.now(),
+            **comparacion
+        )
+
+
+def encolar_comparacion_ia(comparacion: ComparacionesIndividuales) -> TrabajosComparacionIa:
+    """Encola la comparación individual con IA"""
+    return _encolar(TIPO_INDIVIDUAL, id_comparacion_individual=comparacion)
+
+
+def encolar_comparacion_grupal(comparacion: ComparacionesGrupales) -> TrabajosComparacionIa:
+    """Encola el procesamiento completo de una comparación grupal"""
+    return _encolar(TIPO_GRUPAL, id_comparacion_grupal=comparacion)
+
+
+def reclamar_siguiente_trabajo():
+    """Toma el trabajo pendiente más antiguo sin bloquear a otros trabajadores"""
+    with transaction.atomic():
+        # SELECT ... FOR UPDATE SKIP LOCKED: cada trabajador salta las filas ya tomadas
+        # Los que volvieron por límite del proveedor esperan hasta disponible_desde
+        trabajo = TrabajosComparacionIa.objects.select_for_update(skip_locked=True).filter(
+            Q(disponible_desde__isnull=True) | Q(disponible_desde__lte=timezone.now()),
+            estado=ESTADO_PENDIENTE
+        ).order_by('id_trabajo').first()
+
+        if not trabajo:
+            return None
+
+        trabajo.estado = ESTADO_EN_PROCESO
+        trabajo.intentos += 1
+        trabajo.fecha_inicio = timezone.now()
+        trabajo.save(update_fields=['estado', 'intentos', 'fecha_inicio'])
+
+    return trabajo
+
+
+def recuperar_trabajos_abandonados() -> int:
+    """Devuelve a la cola los trabajos de un trabajador que murió a mitad de proceso.
+
+    Los que ya gastaron MAX_INTENTOS se marcan como fallidos: un trabajo que tumba a su
+    trabajador (memoria, segfault) no vuelve a la cola para siempre.
+    """
+    config = configuracion_trabajos()
+    ahora = timezone.now()
+    # Los trabajos grupales llaman a la IA por cada par y tardan mucho más
+    limites = {
+        TIPO_INDIVIDUAL: ahora - timedelta(seconds=config['TIEMPO_MAXIMO_PROCESO']),
+        TIPO_GRUPAL: ahora - timedelta(seconds=config['TIEMPO_MAXIMO_PROCESO_GRUPAL']),
+    }
+
+    recuperados = 0
+    for tipo, limite in limites.items():
+        abandonados = TrabajosComparacionIa.objects.filter(
+            tipo=tipo,
+            estado=ESTADO_EN_PROCESO,
+            fecha_inicio__lt=limite
+        )
+        abandonados.filter(intentos__gte=config['MAX_INTENTOS']).update(
+            estado=ESTADO_FALLIDO,
+            error='El trabajador se detuvo en cada intento (agotó MAX_INTENTOS)',
+            fecha_fin=ahora
+        )
+        recuperados += abandonados.filter(intentos__lt=config['MAX_INTENTOS']).update(estado=ESTADO_PENDIENTE)
+
+    return recuperados
+
+
+def _ejecutar(trabajo: TrabajosComparacionIa) -> dict:
+    """Ejecuta la comparación correspondiente al tipo del trabajo"""
+    if trabajo.tipo == TIPO_GRUPAL:
+        comparacion = ComparacionesGrupales.objects.select_related('id_modelo_ia', 'lenguaje').get(
+            id=trabajo.id_comparacion_grupal_id
+        )
+        return ejecutar_comparacion_grupal(comparacion)
+
+    comparacion = ComparacionesIndividuales.objects.select_related('id_modelo_ia', 'lenguaje').get(
+        id=trabajo.id_comparacion_individual_id
+    )
+    return ejecutar_comparacion_ia(comparacion)
+
+
+def procesar_trabajo(trabajo: TrabajosComparacionIa) -> None:
+    """Ejecuta la llamada al proveedor y guarda el resultado en el trabajo"""
+    config = configuracion_trabajos()
+    max_intentos = config['MAX_INTENTOS']
+    reintentar = False
+    trabajo.disponible_desde = None
+
+    try:
+        trabajo.resultado = _ejecutar(trabajo)
+        trabajo.error = None
+        trabajo.estado = ESTADO_COMPLETADO
+
+    except LimiteProveedorExcedido as e:
+        # La llamada no llegó al proveedor: vuelve a la cola sin gastar un intento,
+        # pero no se reclama de nuevo hasta que el cupo se libere
+        trabajo.resultado = e.como_dict()
+        trabajo.error = e.mensaje
+        trabajo.esperas_limite += 1
+        # Tras MAX_ESPERAS_LIMITE esperas el trabajo falla en vez de rotar para siempre
+        if trabajo.esperas_limite < config['MAX_ESPERAS_LIMITE']:
+            espera = max(e.reintentar_en, config['INTERVALO_SONDEO'])
+            trabajo.disponible_desde = timezone.now() + timedelta(seconds=espera)
+            trabajo.intentos -= 1
+            reintentar = True
+
+    except ErrorComparacionIA as e:
+        trabajo.resultado = e.como_dict()
+        trabajo.error = e.mensaje
+        reintentar = e.status in STATUS_REINTENTABLES
+
+    except requests.Timeout:
+        trabajo.error = 'Timeout al llamar a la API de IA'
+        reintentar = True
+
+    except requests.RequestException as e:
+        trabajo.error = f'Error en la petición HTTP: {str(e)}'
+        reintentar = True
+
+    except Exception as e:
+        trabajo.error = f'Error interno: {str(e)}'
+
+    if trabajo.estado != ESTADO_COMPLETADO:
+        if reintentar and trabajo.intentos < max_intentos:
+            trabajo.estado = ESTADO_PENDIENTE
+        else:
+            trabajo.estado = ESTADO_FALLIDO
+
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=[
+        'estado', 'intentos', 'esperas_limite', 'disponible_desde', 'resultado', 'error', 'fecha_fin'
+    ])
+
+
+def ejecutar_trabajador(detener: threading.Event) -> None:
+    """Bucle de un trabajador: reclama, procesa y espera cuando la cola está vacía"""
+    intervalo = configuracion_trabajos()['INTERVALO_SONDEO']
+
+    try:
+        while not detener.is_set():
+            close_old_connections()
+            trabajo = reclamar_siguiente_trabajo()
+
+            if trabajo is None:
+                detener.wait(intervalo)
+                continue
+
+            procesar_trabajo(trabajo)
+    finally:
+        # Cada hilo abre su propia conexión; cerrarla al terminar
+        connection.close()
+
+
+def serializar_trabajo(trabajo: TrabajosComparacionIa) -> dict:
+    """Representación JSON de un trabajo para el endpoint de consulta"""
+    return {
+        'id_trabajo': trabajo.id_trabajo,
+        'tipo': trabajo.tipo,
+        'comparacion_id': trabajo.id_comparacion_grupal_id if trabajo.tipo == TIPO_GRUPAL else trabajo.id_comparacion_individual_id,
+        'estado': trabajo.estado,
+        'intentos': trabajo.intentos,
+        'disponible_desde': trabajo.disponible_desde.isoformat() if trabajo.disponible_desde else None,
+        'resultado': trabajo.resultado,
+        'error': trabajo.error,
+        'fecha_creacion': trabajo.fecha_creacion.isoformat() if trabajo.fecha_creacion else None,
+        'fecha_inicio': trabajo.fecha_inicio.isoformat() if trabajo.fecha_inicio else None,
+        'fecha_fin': trabajo.fecha_fin.isoformat() if trabajo.fecha_fin else None
+    }
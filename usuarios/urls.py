@@ -5,6 +5,7 @@ urlpatterns = [
     path('registrar/', views.registrar_usuario, name='registrar_usuario'),
     path('login/', views.login_usuario, name='login_usuario'),
     path('perfil/', views.perfil_usuario, name='perfil_usuario'),
+    path('cerrar_sesion/', views.cerrar_sesion, name='cerrar_sesion'),
     path('listar_individual/<int:usuario_id>/', views.listar_comparaciones_individuales, name='listar_comparaciones_individuales'),
     path('listar_grupal/<int:usuario_id>/', views.listar_comparaciones_grupales, name='listar_comparaciones_grupal'),
     path('crear_comparaciones_grupales/', views.crear_comparacion_grupal, name="crear_comparacion_grupal"),
@@ -20,16 +21,26 @@ urlpatterns = [
     path('comparacion_grupal_oculto/<int:comparacion_id>/', views.marcar_grupal_oculto, name="marcar_grupal_oculto"),
     path('listar_modelos_admin/', views.listar_modelos_admin, name='listar_modelos_admin'),
     path('listar_modelos_usuario/<int:usuario_id>/', views.listar_modelos_usuario, name='listar_modelos_usuario'),
+    path('imagen_modelo/<int:id_modelo>/', views.obtener_imagen_modelo, name='obtener_imagen_modelo'),
     path('mostrar_datos_comparacion_individual/<int:comparacion_id>/', views.obtener_comparacion_individual, name="obtener_comparacion_individual"),
     path('listar_lenguajes/<int:usuario_id>', views.listar_lenguajes_usuario, name='listar_lenguajes_usuario'),
     path('crear_comparacion_ia/<int:id_comparacion>/', views.crear_comparacion_ia, name="crear_comparacion_ia"),
+    path('crear_comparacion_ia_async/<int:id_comparacion>/', views.crear_comparacion_ia_async, name="crear_comparacion_ia_async"),
+    path('crear_comparacion_multimodelo/<int:id_comparacion>/', views.crear_comparacion_multimodelo, name="crear_comparacion_multimodelo"),
+    path('crear_comparacion_multimodelo_async/<int:id_comparacion>/', views.crear_comparacion_multimodelo_async, name="crear_comparacion_multimodelo_async"),
+    path('crear_comparacion_grupal_ia/<int:id_comparacion>/', views.crear_comparacion_grupal_ia, name="crear_comparacion_grupal_ia"),
+    path('estado_trabajo_ia/<int:id_trabajo>/', views.obtener_estado_trabajo_ia, name="obtener_estado_trabajo_ia"),
+    path('metricas_cache_similitud/', views.obtener_metricas_cache_similitud, name="obtener_metricas_cache_similitud"),
     path('mostrar_resultados_similitud_individual/<int:comparacion_id>/', views.obtener_resultados_similitud_individual, name="obtener_resultados_similitud_individual"),
+    path('mostrar_resultados_comparacion_grupal/<int:comparacion_id>/', views.obtener_resultados_comparacion_grupal, name="obtener_resultados_comparacion_grupal"),
     path('crear_lenguaje_docente/', views.crear_lenguaje_docente, name='crear_lenguaje_docente'),
     path('listar_lenguajes_docente/', views.listar_lenguajes_docente, name='listar_lenguajes_docente'),
     path('editar_lenguaje_docente/<int:lenguaje_id>/', views.editar_lenguaje_docente, name='editar_lenguaje_docente'),
     path('cambiar_estado_lenguaje_docente/<int:lenguaje_id>/', views.cambiar_estado_lenguaje_docente, name='cambiar_estado_lenguaje_docente'),
     path('analisis_big_o_individual/<int:comparacion_id>/', views.analizar_big_o_individual, name='analisis_big_o_individual'),
+    path('analisis_big_o_lote/', views.analizar_big_o_lote, name='analisis_big_o_lote'),
     path('crear_comentario_eficiencia_individual/<int:id_resultado_eficiencia>/', views.crear_comentario_eficiencia_individual, name='crear_comentario_eficiencia_individual'),
+    path('crear_comentario_eficiencia_individual_async/<int:id_resultado_eficiencia>/', views.crear_comentario_eficiencia_individual_async, name='crear_comentario_eficiencia_individual_async'),
     path('mostrar_resultados_eficiencia_individual/<int:comparacion_id>/', views.obtener_resultados_eficiencia_individual, name="obtener_resultados_eficiencia_individual"),
     path('mostrar_comentarios_eficiencia_individual/<int:comparacion_id>/', views.obtener_comentarios_eficiencia_individual, name="obtener_comentarios_eficiencia_individual"),
 ]
\ No newline at end of file
@@ -1,7 +1,8 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.utils.cache import patch_cache_control
 from django.contrib.auth.hashers import make_password, check_password
 from django.db import transaction
 from datetime import datetime, timedelta
@@ -17,7 +18,38 @@ import time
 import re
 import json
 from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.urls import reverse
 from typing import Dict, List
+from usuarios import cliente_http, cliente_http_async
+from asgiref.sync import sync_to_async
+import httpx
+from usuarios.autenticacion import emitir_token, revocar_token, validar_token
+from usuarios.cache_similitud import obtener_metricas
+from usuarios.comentario_eficiencia import (
+    construir_prompt_eficiencia,
+    guardar_comentario_eficiencia,
+    prefijo_eficiencia,
+)
+from usuarios.comparacion_grupal import ejecutar_comparacion_grupal
+from usuarios.comparacion_ia import (
+    ErrorComparacionIA,
+    aejecutar_comparacion_ia,
+    areservar_cupo_proveedor,
+    ejecutar_comparacion_ia,
+    reservar_cupo_proveedor,
+)
+from usuarios.comparacion_multimodelo import (
+    aejecutar_comparacion_multimodelo,
+    ejecutar_comparacion_multimodelo,
+    leer_ids_modelos,
+    ordenar_modelos,
+)
+from usuarios.eficiencia import analizar_eficiencia_comparaciones, configuracion_analisis
+from usuarios.imagenes_modelo import configuracion_imagenes, firma_imagen_valida, tipo_imagen, url_imagen
+from usuarios.paginacion import ErrorPaginacion, leer_campos, paginar, proyectar
+from usuarios.proveedores import aresolver_configuracion, resolver_configuracion
+from usuarios.streaming_ia import TransmisionIA, respuesta_sse, transmitir_comparacion_ia, transmitir_fragmentos
+from usuarios.trabajos import encolar_comparacion_grupal, encolar_comparacion_ia, serializar_trabajo
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -101,17 +133,8 @@ def login_usuario(request):
         
         # Verificar contraseña
         if check_password(contraseña, usuario_obj.contrasenia):
-            # Generar JWT token
-            payload = {
-                'usuario_id': usuario_obj.id,
-                'usuario': usuario_obj.usuario,
-                'rol': usuario_obj.rol.nombre,
-                'exp': datetime.utcnow() + timedelta(hours=24),  # Expira en 24 horas
-                'iat': datetime.utcnow()  # Fecha de emisión
-            }
-            
-            # Crear token (usa SECRET_KEY de Django por seguridad)
-            token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+            # Generar JWT token (usa SECRET_KEY de Django; expira a las DURACION_TOKEN_HORAS)
+            token = emitir_token(usuario_obj)
             
             return JsonResponse({
                 'mensaje': 'Login exitoso',
@@ -124,23 +147,20 @@ def login_usuario(request):
         return JsonResponse({'error': str(e)}, status=500)
     
 
-# Función auxiliar para validar JWT, es decir ya no es necesario validar el token en cada llamado a la API
-def validar_token(request):
-    """Valida el token JWT del header Authorization"""
-    try:
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return None
-        
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        return payload
-        
-    except jwt.ExpiredSignatureError:
-        return {'error': 'Token expirado'}
-    except jwt.InvalidTokenError:
-        return {'error': 'Token inválido'}
+@csrf_exempt
+@require_http_methods(["POST"])
+def cerrar_sesion(request):
+    """Revoca el token enviado (deja de valer aunque no haya vencido)"""
+    payload = validar_token(request)
+    
+    if not payload:
+        return JsonResponse({'error': 'Token requerido'}, status=401)
+    
+    if 'error' in payload:
+        return JsonResponse(payload, status=401)
     
+    revocar_token(payload)
+    return JsonResponse({'mensaje': 'Sesión cerrada'}, status=200)
 
 
 @require_http_methods(["GET"])
@@ -175,6 +195,22 @@ def perfil_usuario(request):
     except Usuarios.DoesNotExist:
         return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
 
+# Columnas que se pueden pedir con ?fields= en los listados de comparaciones
+CAMPOS_LISTADO_COMPARACIONES = ['id', 'nombre_comparacion', 'fecha_creacion', 'estado']
+
+# Campo de la respuesta -> columna de ModelosIa en el listado de modelos del usuario
+# (las imágenes se devuelven como URL de obtener_imagen_modelo armada con la huella)
+CAMPOS_LISTADO_MODELOS = {
+    'id_modelo_ia': 'id',
+    'nombre': 'nombre',
+    'descripcion': 'descripcion',
+    'color': 'color_ia',
+    'nombre_proveedor': 'proveedor__nombre',
+    'imagen': 'imagen_hash',
+    'imagen_miniatura': 'imagen_hash',
+}
+
+
 @require_http_methods(["GET"])
 def listar_comparaciones_individuales(request, usuario_id):
     """Listar comparaciones individuales de un usuario específico"""
@@ -187,15 +223,23 @@ def listar_comparaciones_individuales(request, usuario_id):
         return JsonResponse(payload, status=401)
     
     try:
-        # Obtener todas las comparaciones individuales del usuario
-        comparaciones = ComparacionesIndividuales.objects.filter(
-            usuario_id=usuario_id  # Ahora usa el parámetro de la URL
-        ).values('id', 'nombre_comparacion', 'fecha_creacion', 'estado').order_by('-fecha_creacion')
+        # Página de comparaciones individuales del usuario, de la más nueva a la más vieja
+        # (?limit=, ?cursor= con el next_cursor anterior y ?fields= para elegir columnas)
+        campos = leer_campos(request, CAMPOS_LISTADO_COMPARACIONES)
+        comparaciones, siguiente = paginar(
+            ComparacionesIndividuales.objects.filter(
+                usuario_id=usuario_id  # Ahora usa el parámetro de la URL
+            ).values(*dict.fromkeys(campos + ['id', 'fecha_creacion'])),
+            request
+        )
         
         return JsonResponse({
-            'comparaciones': list(comparaciones)
+            'comparaciones': [proyectar(comparacion, campos) for comparacion in comparaciones],
+            'next_cursor': siguiente
         }, status=200)
         
+    except ErrorPaginacion as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -212,15 +256,23 @@ def listar_comparaciones_grupales(request, usuario_id):
         return JsonResponse(payload, status=401)
     
     try:
-        # Obtener todas las comparaciones grupales del usuario
-        comparaciones = ComparacionesGrupales.objects.filter(
-            usuario_id=usuario_id  # Ahora usa el parámetro de la URL
-        ).values('id', 'nombre_comparacion', 'fecha_creacion','estado').order_by('-fecha_creacion')
+        # Página de comparaciones grupales del usuario, de la más nueva a la más vieja
+        # (?limit=, ?cursor= con el next_cursor anterior y ?fields= para elegir columnas)
+        campos = leer_campos(request, CAMPOS_LISTADO_COMPARACIONES)
+        comparaciones, siguiente = paginar(
+            ComparacionesGrupales.objects.filter(
+                usuario_id=usuario_id  # Ahora usa el parámetro de la URL
+            ).values(*dict.fromkeys(campos + ['id', 'fecha_creacion'])),
+            request
+        )
         
         return JsonResponse({
-            'comparaciones': list(comparaciones)
+            'comparaciones': [proyectar(comparacion, campos) for comparacion in comparaciones],
+            'next_cursor': siguiente
         }, status=200)
         
+    except ErrorPaginacion as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -819,29 +871,21 @@ def listar_modelos_admin(request):
         return JsonResponse(payload, status=401)
     
     try:
-        # Obtener el rol de admin
-        rol_admin = Roles.objects.filter(nombre='admin').first()
-        
-        if not rol_admin:
-            return JsonResponse({'error': 'Rol admin no encontrado'}, status=404)
-        
-        # Obtener todos los usuarios con rol admin
-        usuarios_admin = Usuarios.objects.filter(rol=rol_admin).values_list('id', flat=True)
-        
         # Filtrar modelos creados por usuarios admin y que estén activos
+        # (el rol se resuelve con un JOIN en la misma consulta)
         modelos = ModelosIa.objects.filter(
-            id_usuario__in=usuarios_admin,
+            id_usuario__rol__nombre='admin',
             activo=True
         ).select_related('proveedor').values(
             'id',
             'nombre',
             'descripcion',
             'color_ia',
-            'imagen_ia',
+            'imagen_hash',
             'proveedor__nombre'
         ).order_by('-fecha_creacion')
         
-        # Convertir imagen binaria a base64 si existe
+        # La imagen va como URL cacheable (los bytes los sirve obtener_imagen_modelo)
         modelos_lista = []
         for modelo in modelos:
             modelo_dict = {
@@ -850,7 +894,8 @@ def listar_modelos_admin(request):
                 'descripcion': modelo['descripcion'],
                 'color': modelo['color_ia'],
                 'nombre_proveedor': modelo['proveedor__nombre'],
-                'imagen': base64.b64encode(modelo['imagen_ia']).decode('utf-8') if modelo['imagen_ia'] else None
+                'imagen': url_imagen(modelo['id'], modelo['imagen_hash']),
+                'imagen_miniatura': url_imagen(modelo['id'], modelo['imagen_hash'], miniatura=True)
             }
             modelos_lista.append(modelo_dict)
         
@@ -880,38 +925,95 @@ def listar_modelos_usuario(request, usuario_id):
         if not usuario:
             return JsonResponse({'error': 'Usuario no encontrado'}, status=404)
         
-        # Filtrar modelos creados por este usuario específico y que estén activos
-        modelos = ModelosIa.objects.filter(
-            id_usuario=usuario_id,
-            activo=True
-        ).select_related('proveedor').values(
-            'id',
-            'nombre',
-            'descripcion',
-            'color_ia',
-            'imagen_ia',
-            'proveedor__nombre'
-        ).order_by('-fecha_creacion')
+        # Página de modelos activos creados por este usuario
+        campos = leer_campos(request, list(CAMPOS_LISTADO_MODELOS))
+        columnas = [CAMPOS_LISTADO_MODELOS[campo] for campo in campos]
+        modelos, siguiente = paginar(
+            ModelosIa.objects.filter(
+                id_usuario=usuario_id,
+                activo=True
+            ).values(*dict.fromkeys(columnas + ['id', 'fecha_creacion'])),
+            request
+        )
         
-        # Convertir imagen binaria a base64 si existe
+        # La imagen va como URL cacheable (los bytes los sirve obtener_imagen_modelo)
         modelos_lista = []
         for modelo in modelos:
-            modelo_dict = {
-                'id_modelo_ia': modelo['id'],
-                'nombre': modelo['nombre'],
-                'descripcion': modelo['descripcion'],
-                'color': modelo['color_ia'],
-                'nombre_proveedor': modelo['proveedor__nombre'],
-                'imagen': base64.b64encode(modelo['imagen_ia']).decode('utf-8') if modelo['imagen_ia'] else None
-            }
+            modelo_dict = {campo: modelo[CAMPOS_LISTADO_MODELOS[campo]] for campo in campos}
+            if 'imagen' in modelo_dict:
+                modelo_dict['imagen'] = url_imagen(modelo['id'], modelo['imagen_hash'])
+            if 'imagen_miniatura' in modelo_dict:
+                modelo_dict['imagen_miniatura'] = url_imagen(modelo['id'], modelo['imagen_hash'], miniatura=True)
             modelos_lista.append(modelo_dict)
         
         return JsonResponse({
-            'modelos': modelos_lista
+            'modelos': modelos_lista,
+            'next_cursor': siguiente
         }, status=200)
         
+    except ErrorPaginacion as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+def _version_imagen(request, id_modelo):
+    """(huella, fecha) de la imagen, leídas una sola vez por petición para ETag y Last-Modified;
+    (None, None) si la URL no trae una firma válida de url_imagen"""
+    if not hasattr(request, '_version_imagen'):
+        request._version_imagen = (None, None)
+        if firma_imagen_valida(id_modelo, request.GET.get('v', ''), bool(request.GET.get('miniatura')),
+                               request.GET.get('firma', '')):
+            request._version_imagen = ModelosIa.objects.filter(id=id_modelo).values_list(
+                'imagen_hash', 'fecha_imagen'
+            ).first() or (None, None)
+    return request._version_imagen
+
+
+def _etag_imagen(request, id_modelo):
+    """La miniatura y la original son representaciones distintas: cada una con su ETag"""
+    huella = _version_imagen(request, id_modelo)[0]
+    if not huella:
+        return None
+    return f"{huella}-{'miniatura' if request.GET.get('miniatura') else 'original'}"
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(
+    etag_func=_etag_imagen,
+    last_modified_func=lambda request, id_modelo: _version_imagen(request, id_modelo)[1],
+)
+def obtener_imagen_modelo(request, id_modelo):
+    """Imagen del modelo en binario (?miniatura=1 para la reducida). No pide token para poder usarla
+    en <img>, pero solo responde a las URLs firmadas que entregan los listados (url_imagen).
+    Con If-None-Match / If-Modified-Since responde 304 sin leer los bytes."""
+    huella = _version_imagen(request, id_modelo)[0]
+    if not huella:
+        return JsonResponse({'error': 'Imagen no encontrada'}, status=404)
+
+    modelos = ModelosIa.objects.filter(id=id_modelo)
+    datos = None
+
+    if request.GET.get('miniatura'):
+        datos = modelos.values_list('imagen_miniatura', flat=True).first()
+    # Sin miniatura guardada se sirve la original
+    if not datos:
+        datos = modelos.values_list('imagen_ia', flat=True).first()
+    if not datos:
+        return JsonResponse({'error': 'Imagen no encontrada'}, status=404)
+
+    datos = bytes(datos)
+    respuesta = HttpResponse(datos, content_type=tipo_imagen(datos) or 'application/octet-stream')
+
+    # La URL con ?v=<huella> cambia junto con la imagen: se cachea un año sin revalidar
+    config = configuracion_imagenes()
+    version = request.GET.get('v')
+    if version and huella.startswith(version):
+        patch_cache_control(respuesta, public=True, max_age=config['MAX_AGE_VERSIONADA'], immutable=True)
+    else:
+        patch_cache_control(respuesta, public=True, max_age=config['MAX_AGE'])
+
+    return respuesta
     
     
 @csrf_exempt
@@ -987,25 +1089,26 @@ def listar_lenguajes_usuario(request, usuario_id):
         return JsonResponse(payload, status=401)
     
     try:
-        # Obtener IDs de todos los usuarios admin
-        usuarios_admin_ids = list(Usuarios.objects.filter(
-            rol__nombre__iexact='admin'
-        ).values_list('id', flat=True))
-        
-        # Obtener lenguajes creados por admins O por el usuario actual
-        lenguajes = Lenguajes.objects.filter(
-            Q(usuario_id__in=usuarios_admin_ids) | 
-            Q(usuario_id=usuario_id)
-        ).values(
-            'id', 
-            'nombre', 
-            'extension'
-        ).order_by('nombre')
+        # Página de lenguajes creados por admins O por el usuario actual, por nombre
+        # (la tabla no tiene fecha de creación: el cursor va sobre (nombre, id);
+        # el rol de los creadores se resuelve con un JOIN en la misma consulta)
+        campos = leer_campos(request, ['id', 'nombre', 'extension'])
+        lenguajes, siguiente = paginar(
+            Lenguajes.objects.filter(
+                Q(usuario__rol__nombre__iexact='admin') | 
+                Q(usuario_id=usuario_id)
+            ).values(*dict.fromkeys(campos + ['id', 'nombre'])),
+            request,
+            orden='nombre'
+        )
         
         return JsonResponse({
-            'lenguajes': list(lenguajes)
+            'lenguajes': [proyectar(lenguaje, campos) for lenguaje in lenguajes],
+            'next_cursor': siguiente
         }, status=200)
         
+    except ErrorPaginacion as e:
+        return JsonResponse(e.como_dict(), status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
     
@@ -1014,6 +1117,7 @@ def listar_lenguajes_usuario(request, usuario_id):
 @csrf_exempt
 @require_http_methods(["POST"])
 def crear_comparacion_ia(request, id_comparacion):
+    """Encola la comparación con IA; con ?sincrono=true la ejecuta en la misma petición y con ?stream=true la transmite por SSE"""
     try:
         # El ID de la comparación viene desde la URL
         if not id_comparacion:
@@ -1023,7 +1127,7 @@ def crear_comparacion_ia(request, id_comparacion):
         
         # 1. Obtener la comparación
         try:
-            comparacion = ComparacionesIndividuales.objects.get(
+            comparacion = ComparacionesIndividuales.objects.select_related('id_modelo_ia', 'lenguaje').get(
                 id=id_comparacion
             )
         except ComparacionesIndividuales.DoesNotExist:
@@ -1031,269 +1135,179 @@ def crear_comparacion_ia(request, id_comparacion):
                 'error': f'Comparación {id_comparacion} no encontrada'
             }, status=404)
         
-        # 2. Obtener el modelo IA
         if not comparacion.id_modelo_ia:
             return JsonResponse({
                 'error': 'La comparación no tiene un modelo de IA asignado'
             }, status=400)
         
-        modelo_ia = comparacion.id_modelo_ia
-        
-        # 3. Obtener la configuración según el tipo de modelo
-        config = None
-        proveedor = None
-        prompt_config = None
-        
-        # Intentar obtener configuración de cada proveedor
-        try:
-            config = ConfiguracionClaude.objects.select_related('id_prompt').get(
-                id_modelo_ia_id=modelo_ia.id,
-                activo=True
-            )
-            proveedor = 'Claude'
-            prompt_config = config.id_prompt
-        except ConfiguracionClaude.DoesNotExist:
-            pass
-        
-        if not config:
+        # 2. Modo streaming: el texto del proveedor llega al cliente como eventos SSE
+        if request.GET.get('stream', 'false').lower() in ['true', '1', 'yes']:
             try:
-                config = ConfiguracionOpenai.objects.select_related('id_prompt').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'OpenAI'
-                prompt_config = config.id_prompt
-            except ConfiguracionOpenai.DoesNotExist:
-                pass
+                return respuesta_sse(request, *transmitir_comparacion_ia(comparacion))
+            except ErrorComparacionIA as e:
+                return JsonResponse(e.como_dict(), status=e.status)
         
-        if not config:
+        # 3. Modo síncrono (compatibilidad): la petición espera la respuesta del proveedor
+        if request.GET.get('sincrono', 'false').lower() in ['true', '1', 'yes']:
             try:
-                config = ConfiguracionGemini.objects.select_related('id_prompt').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'Gemini'
-                prompt_config = config.id_prompt
-            except ConfiguracionGemini.DoesNotExist:
-                pass
+                return JsonResponse(ejecutar_comparacion_ia(comparacion), status=200)
+            except ErrorComparacionIA as e:
+                return JsonResponse(e.como_dict(), status=e.status)
         
-        if not config:
-            try:
-                config = ConfiguracionDeepseek.objects.select_related('id_prompt').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'DeepSeek'
-                prompt_config = config.id_prompt
-            except ConfiguracionDeepseek.DoesNotExist:
-                pass
+        # 4. Modo por defecto: encolar y responder de inmediato
+        trabajo = encolar_comparacion_ia(comparacion)
         
-        if not config or not prompt_config:
-            return JsonResponse({
-                'error': 'No hay configuración activa para este modelo de IA'
-            }, status=404)
+        return JsonResponse({
+            'mensaje': 'Comparación encolada',
+            'id_trabajo': trabajo.id_trabajo,
+            'estado': trabajo.estado,
+            'comparacion_id': id_comparacion,
+            'url_estado': reverse('obtener_estado_trabajo_ia', args=[trabajo.id_trabajo])
+        }, status=202)
         
-        # 4. Verificar que el prompt esté activo
-        if not prompt_config.activo:
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'JSON inválido en el body'
+        }, status=400)
+    except requests.Timeout:
+        return JsonResponse({
+            'error': 'Timeout al llamar a la API de IA'
+        }, status=504)
+    except requests.RequestException as e:
+        return JsonResponse({
+            'error': f'Error en la petición HTTP: {str(e)}'
+        }, status=500)
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def crear_comparacion_ia_async(request, id_comparacion):
+    """Versión asíncrona (ASGI) de crear_comparacion_ia: ejecuta la comparación sin ocupar un hilo mientras responde el proveedor"""
+    try:
+        # 1. Obtener la comparación
+        try:
+            comparacion = await ComparacionesIndividuales.objects.select_related('id_modelo_ia', 'lenguaje').aget(
+                id=id_comparacion
+            )
+        except ComparacionesIndividuales.DoesNotExist:
             return JsonResponse({
-                'error': 'El prompt configurado no está activo'
-            }, status=400)
+                'error': f'Comparación {id_comparacion} no encontrada'
+            }, status=404)
         
-        # 5. Reemplazar placeholders en el prompt
-        prompt_procesado = prompt_config.template_prompt.replace(
-            '{{codigo_a}}', comparacion.codigo_1
-        ).replace(
-            '{{codigo_b}}', comparacion.codigo_2
-        )
+        # 2. Comparar y guardar (misma respuesta que el modo síncrono)
+        try:
+            return JsonResponse(await aejecutar_comparacion_ia(comparacion), status=200)
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
         
-        # 6. Preparar headers y payload según el proveedor
-        headers = {}
-        payload = {}
+    except httpx.TimeoutException:
+        return JsonResponse({
+            'error': 'Timeout al llamar a la API de IA'
+        }, status=504)
+    except httpx.HTTPError as e:
+        return JsonResponse({
+            'error': f'Error en la petición HTTP: {str(e)}'
+        }, status=500)
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def crear_comparacion_multimodelo(request, id_comparacion):
+    """Compara con varios modelos a la vez (body {"modelos": [ids]}); guarda un resultado por modelo y retorna el agregado"""
+    try:
+        # 1. Obtener la comparación
+        try:
+            comparacion = ComparacionesIndividuales.objects.select_related('lenguaje').get(id=id_comparacion)
+        except ComparacionesIndividuales.DoesNotExist:
+            return JsonResponse({
+                'error': f'Comparación {id_comparacion} no encontrada'
+            }, status=404)
         
-        if proveedor == 'Claude':
-            headers = {
-                'Content-Type': 'application/json',
-                'x-api-key': config.api_key,
-                'anthropic-version': config.anthropic_version
-            }
-            payload = {
-                'model': config.model_name,
-                'max_tokens': config.max_tokens,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ]
-            }
-            
-        elif proveedor == 'OpenAI':
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {config.api_key}'
-            }
-            payload = {
-                'model': config.model_name,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ],
-                'max_tokens': config.max_tokens,
-                'temperature': float(config.temperature)
-            }
-            
-        elif proveedor == 'Gemini':
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            # Gemini usa la API key en la URL
-            endpoint_url = f"{config.endpoint_url}/{config.model_name}:generateContent?key={config.api_key}"
-            payload = {
-                'contents': [
-                    {
-                        'parts': [
-                            {
-                                'text': prompt_procesado
-                            }
-                        ]
-                    }
-                ],
-                'generationConfig': {
-                    'maxOutputTokens': config.max_tokens,
-                    'temperature': float(config.temperature)
-                }
-            }
+        try:
+            # 2. Modelos pedidos (activos y en el orden recibido)
+            ids = leer_ids_modelos(request.body)
+            modelos = ordenar_modelos(ids, list(ModelosIa.objects.filter(id__in=ids, activo=True)))
             
-        elif proveedor == 'DeepSeek':
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {config.api_key}'
-            }
-            payload = {
-                'model': config.model_name,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ],
-                'max_tokens': config.max_tokens,
-                'temperature': float(config.temperature)
-            }
-        
-        # 7. Hacer la petición
-        inicio = time.time()
-        
-        # Para Gemini, usamos la URL modificada
-        url = endpoint_url if proveedor == 'Gemini' else config.endpoint_url
+            # 3. Llamar a todos los modelos en paralelo y guardar
+            return JsonResponse(ejecutar_comparacion_multimodelo(comparacion, modelos), status=200)
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
         
-        response = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
-        
-        tiempo_respuesta = time.time() - inicio
-        
-        # 8. Verificar respuesta
-        if response.status_code != 200:
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def crear_comparacion_multimodelo_async(request, id_comparacion):
+    """Versión asíncrona (ASGI) de crear_comparacion_multimodelo"""
+    try:
+        try:
+            comparacion = await ComparacionesIndividuales.objects.select_related('lenguaje').aget(id=id_comparacion)
+        except ComparacionesIndividuales.DoesNotExist:
             return JsonResponse({
-                'error': f'Error de la API {proveedor}: {response.status_code}',
-                'detalle': response.text
-            }, status=response.status_code)
-        
-        # 9. Extraer la respuesta según el proveedor
-        response_data = response.json()
-        respuesta_ia = None
-        tokens_usados = 0
-        
-        if proveedor == 'Claude':
-            respuesta_ia = response_data['content'][0]['text']
-            tokens_usados = (
-                response_data.get('usage', {}).get('input_tokens', 0) + 
-                response_data.get('usage', {}).get('output_tokens', 0)
-            )
-            
-        elif proveedor == 'OpenAI':
-            respuesta_ia = response_data['choices'][0]['message']['content']
-            tokens_usados = response_data.get('usage', {}).get('total_tokens', 0)
+                'error': f'Comparación {id_comparacion} no encontrada'
+            }, status=404)
+        
+        try:
+            ids = leer_ids_modelos(request.body)
+            modelos = ordenar_modelos(ids, [
+                modelo async for modelo in ModelosIa.objects.filter(id__in=ids, activo=True)
+            ])
             
-        elif proveedor == 'Gemini':
-            respuesta_ia = response_data['candidates'][0]['content']['parts'][0]['text']
-            tokens_usados = (
-                response_data.get('usageMetadata', {}).get('promptTokenCount', 0) +
-                response_data.get('usageMetadata', {}).get('candidatesTokenCount', 0)
+            return JsonResponse(await aejecutar_comparacion_multimodelo(comparacion, modelos), status=200)
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def crear_comparacion_grupal_ia(request, id_comparacion):
+    """Encola la comparación grupal (todos los pares); con ?sincrono=true la ejecuta en la misma petición"""
+    try:
+        # 1. Obtener la comparación grupal
+        try:
+            comparacion = ComparacionesGrupales.objects.select_related('id_modelo_ia', 'lenguaje').get(
+                id=id_comparacion
             )
-            
-        elif proveedor == 'DeepSeek':
-            respuesta_ia = response_data['choices'][0]['message']['content']
-            tokens_usados = response_data.get('usage', {}).get('total_tokens', 0)
+        except ComparacionesGrupales.DoesNotExist:
+            return JsonResponse({
+                'error': f'Comparación grupal {id_comparacion} no encontrada'
+            }, status=404)
         
-        # 10. NUEVO: Extraer el porcentaje de similitud general
-        porcentaje_similitud = None
-        patron_similitud = r'SIMILITUD GENERAL:\s*(\d+)'
-        match = re.search(patron_similitud, respuesta_ia, re.IGNORECASE)
+        # 2. Modo síncrono (compatibilidad): la petición espera todo el procesamiento
+        if request.GET.get('sincrono', 'false').lower() in ['true', '1', 'yes']:
+            try:
+                return JsonResponse(ejecutar_comparacion_grupal(comparacion), status=200)
+            except ErrorComparacionIA as e:
+                return JsonResponse(e.como_dict(), status=e.status)
         
-        if match:
-            porcentaje_similitud = int(match.group(1))
-        else:
-            # Si no encuentra el patrón, intentar otros formatos comunes
-            patron_alternativo = r'similitud general[:\s]*(\d+)%?'
-            match_alt = re.search(patron_alternativo, respuesta_ia, re.IGNORECASE)
-            if match_alt:
-                porcentaje_similitud = int(match_alt.group(1))
-        
-        # 11. NUEVO: Guardar en la base de datos
-        if porcentaje_similitud is not None:
-            # Eliminar resultado anterior si existe (para evitar duplicados)
-            ResultadosSimilitudIndividual.objects.filter(
-                id_comparacion_individual=comparacion
-            ).delete()
-            
-            # Crear nuevo resultado
-            resultado = ResultadosSimilitudIndividual.objects.create(
-                id_comparacion_individual=comparacion,
-                porcentaje_similitud=porcentaje_similitud,
-                explicacion=respuesta_ia
-            )
-            
-            mensaje_guardado = 'Resultado guardado exitosamente'
-        else:
-            mensaje_guardado = 'No se pudo extraer el porcentaje de similitud. Respuesta no guardada.'
+        # 3. Modo por defecto: encolar y responder de inmediato
+        trabajo = encolar_comparacion_grupal(comparacion)
         
-        # 12. Retornar resultado
         return JsonResponse({
-            'mensaje': 'Comparación exitosa',
-            'guardado': mensaje_guardado,
+            'mensaje': 'Comparación grupal encolada',
+            'id_trabajo': trabajo.id_trabajo,
+            'estado': trabajo.estado,
             'comparacion_id': id_comparacion,
-            'modelo_usado': modelo_ia.nombre,
-            'proveedor': proveedor,
-            'model_name': config.model_name,
-            'prompt_usado': {
-                'version': prompt_config.version,
-                'descripcion': prompt_config.descripcion
-            },
-            'tiempo_respuesta_segundos': round(tiempo_respuesta, 2),
-            'tokens_usados': tokens_usados,
-            'porcentaje_similitud': porcentaje_similitud,
-            'respuesta_ia': respuesta_ia,
-            'codigos_comparados': {
-                'codigo_1': comparacion.codigo_1[:100] + '...' if len(comparacion.codigo_1) > 100 else comparacion.codigo_1,
-                'codigo_2': comparacion.codigo_2[:100] + '...' if len(comparacion.codigo_2) > 100 else comparacion.codigo_2
-            }
-        }, status=200)
+            'url_estado': reverse('obtener_estado_trabajo_ia', args=[trabajo.id_trabajo])
+        }, status=202)
         
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'error': 'JSON inválido en el body'
-        }, status=400)
-    except requests.Timeout:
-        return JsonResponse({
-            'error': 'Timeout al llamar a la API de IA'
-        }, status=504)
     except requests.RequestException as e:
         return JsonResponse({
             'error': f'Error en la petición HTTP: {str(e)}'
@@ -1302,6 +1316,59 @@ def crear_comparacion_ia(request, id_comparacion):
         return JsonResponse({
             'error': f'Error interno: {str(e)}'
         }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def obtener_estado_trabajo_ia(request, id_trabajo):
+    """Consultar el estado y el resultado de un trabajo de comparación con IA"""
+    payload = validar_token(request)
+    
+    if not payload:
+        return JsonResponse({'error': 'Token requerido'}, status=401)
+    
+    if 'error' in payload:
+        return JsonResponse(payload, status=401)
+    
+    try:
+        trabajo = TrabajosComparacionIa.objects.select_related(
+            'id_comparacion_individual', 'id_comparacion_grupal'
+        ).get(id_trabajo=id_trabajo)
+        
+        # Verificar que el usuario autenticado sea el dueño de la comparación
+        comparacion = trabajo.id_comparacion_grupal or trabajo.id_comparacion_individual
+        usuario_id_token = payload.get('usuario_id')
+        if comparacion.usuario_id != usuario_id_token:
+            return JsonResponse({
+                'error': 'No tienes permiso para ver este trabajo'
+            }, status=403)
+        
+        return JsonResponse(serializar_trabajo(trabajo), status=200)
+        
+    except TrabajosComparacionIa.DoesNotExist:
+        return JsonResponse({
+            'error': f'No se encontró el trabajo con ID {id_trabajo}'
+        }, status=404)
+        
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+@require_http_methods(["GET"])
+def obtener_metricas_cache_similitud(request):
+    """Tasa de aciertos de la caché de similitud y el tiempo/tokens ahorrados"""
+    payload = validar_token(request)
+    
+    if not payload:
+        return JsonResponse({'error': 'Token requerido'}, status=401)
+    
+    if 'error' in payload:
+        return JsonResponse(payload, status=401)
+    
+    try:
+        return JsonResponse(obtener_metricas(), status=200)
+        
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
     
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -1329,16 +1396,18 @@ def obtener_resultados_similitud_individual(request, comparacion_id):
             }, status=403)
         
         # Obtener todos los resultados de similitud para esta comparación
-        resultados = ResultadosSimilitudIndividual.objects.filter(
+        resultados = ResultadosSimilitudIndividual.objects.select_related('id_modelo_ia').filter(
             id_comparacion_individual=comparacion_id
         )
         
-        # Construir la lista de resultados
+        # Construir la lista de resultados (uno por modelo cuando se comparó con varios)
         resultados_list = []
         for resultado in resultados:
             resultados_list.append({
                 'porcentaje_similitud': resultado.porcentaje_similitud,
-                'explicacion': resultado.explicacion
+                'explicacion': resultado.explicacion,
+                'modelo_ia_id': resultado.id_modelo_ia_id,
+                'modelo_usado': resultado.id_modelo_ia.nombre if resultado.id_modelo_ia else None
             })
         
         return JsonResponse({
@@ -1353,6 +1422,63 @@ def obtener_resultados_similitud_individual(request, comparacion_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
     
+@csrf_exempt
+@require_http_methods(["GET"])
+def obtener_resultados_comparacion_grupal(request, comparacion_id):
+    """Obtener la similitud por par y la eficiencia por código de una comparación grupal"""
+    payload = validar_token(request)
+    
+    if not payload:
+        return JsonResponse({'error': 'Token requerido'}, status=401)
+    
+    if 'error' in payload:
+        return JsonResponse(payload, status=401)
+    
+    try:
+        comparacion = ComparacionesGrupales.objects.get(id=comparacion_id)
+        
+        # Verificar que el usuario autenticado sea el dueño de la comparación
+        usuario_id_token = payload.get('usuario_id')
+        if comparacion.usuario_id != usuario_id_token:
+            return JsonResponse({
+                'error': 'No tienes permiso para ver estos resultados'
+            }, status=403)
+        
+        similitudes = ResultadosSimilitudGrupal.objects.filter(
+            comparacion_grupal_id=comparacion_id
+        ).select_related('codigo_fuente_1', 'codigo_fuente_2').order_by('-porcentaje_similitud')
+        
+        eficiencias = ResultadosEficienciaGrupal.objects.filter(
+            comparacion_grupal_id=comparacion_id
+        ).select_related('codigo_fuente').order_by('-puntuacion_eficiencia')
+        
+        return JsonResponse({
+            'similitud': [{
+                'codigo_fuente_1': resultado.codigo_fuente_1_id,
+                'nombre_archivo_1': resultado.codigo_fuente_1.nombre_archivo,
+                'codigo_fuente_2': resultado.codigo_fuente_2_id,
+                'nombre_archivo_2': resultado.codigo_fuente_2.nombre_archivo,
+                'porcentaje_similitud': resultado.porcentaje_similitud,
+                'explicacion': resultado.explicacion
+            } for resultado in similitudes],
+            'eficiencia': [{
+                'codigo_fuente': resultado.codigo_fuente_id,
+                'nombre_archivo': resultado.codigo_fuente.nombre_archivo,
+                'complejidad_temporal': resultado.complejidad_temporal,
+                'complejidad_espacial': resultado.complejidad_espacial,
+                'puntuacion_eficiencia': resultado.puntuacion_eficiencia,
+                'es_mas_eficiente': resultado.es_mas_eficiente
+            } for resultado in eficiencias]
+        }, status=200)
+        
+    except ComparacionesGrupales.DoesNotExist:
+        return JsonResponse({
+            'error': f'No se encontró la comparación con ID {comparacion_id}'
+        }, status=404)
+        
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
 @csrf_exempt
 @require_http_methods(["POST"])
 def crear_lenguaje_docente(request):
@@ -1384,14 +1510,9 @@ def crear_lenguaje_docente(request):
                 'error': 'El campo nombre es requerido'
             }, status=400)
         
-        # Obtener IDs de todos los usuarios admin
-        usuarios_admin_ids = list(Usuarios.objects.filter(
-            rol__nombre__iexact='admin'
-        ).values_list('id', flat=True))
-        
         # Verificar si ya existe un lenguaje con ese nombre creado por un ADMIN
-        # (Los lenguajes de otros docentes NO importan)
-        if Lenguajes.objects.filter(nombre=nombre, usuario_id__in=usuarios_admin_ids).exists():
+        # (Los lenguajes de otros docentes NO importan; el rol se resuelve con un JOIN)
+        if Lenguajes.objects.filter(nombre=nombre, usuario__rol__nombre__iexact='admin').exists():
             return JsonResponse({
                 'error': f'El lenguaje "{nombre}" ya existe (creado por administrador)'
             }, status=400)
@@ -1595,27 +1716,6 @@ def cambiar_estado_lenguaje_docente(request, lenguaje_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
     
-# Mapeo de lenguajes soportados
-LENGUAJES_SOPORTADOS = {
-    'python': {'nombre': 'Python', 'extensiones': ['.py']},
-    'javascript': {'nombre': 'JavaScript', 'extensiones': ['.js']},
-    'java': {'nombre': 'Java', 'extensiones': ['.java']},
-    'c': {'nombre': 'C', 'extensiones': ['.c', '.h']},
-    'cpp': {'nombre': 'C++', 'extensiones': ['.cpp', '.cc', '.cxx', '.hpp']},
-    'c++': {'nombre': 'C++', 'extensiones': ['.cpp', '.cc', '.cxx', '.hpp']},
-    'csharp': {'nombre': 'C#', 'extensiones': ['.cs']},
-    'c#': {'nombre': 'C#', 'extensiones': ['.cs']},
-    'php': {'nombre': 'PHP', 'extensiones': ['.php']},
-    'ruby': {'nombre': 'Ruby', 'extensiones': ['.rb']},
-    'go': {'nombre': 'Go', 'extensiones': ['.go']},
-    'rust': {'nombre': 'Rust', 'extensiones': ['.rs']},
-    'swift': {'nombre': 'Swift', 'extensiones': ['.swift']},
-    'kotlin': {'nombre': 'Kotlin', 'extensiones': ['.kt']},
-    'typescript': {'nombre': 'TypeScript', 'extensiones': ['.ts']},
-}
-
-from django.utils import timezone
-
 @csrf_exempt
 @require_http_methods(["POST"])
 def analizar_big_o_individual(request, comparacion_id):
@@ -1626,65 +1726,29 @@ def analizar_big_o_individual(request, comparacion_id):
         return JsonResponse({'error': 'Token inválido'}, status=401)
     
     try:
-        comparacion = ComparacionesIndividuales.objects.get(pk=comparacion_id)
-        
-        lenguaje = comparacion.lenguaje.nombre.lower()
+        comparacion = ComparacionesIndividuales.objects.select_related('lenguaje').get(pk=comparacion_id)
         
-        if lenguaje not in LENGUAJES_SOPORTADOS:
-            extension = comparacion.lenguaje.extension
-            lenguaje_detectado = detectar_lenguaje_por_extension(extension)
-            
-            if not lenguaje_detectado:
-                return JsonResponse({
-                    'advertencia': f'Lenguaje "{comparacion.lenguaje.nombre}" no completamente soportado.',
-                    'lenguaje_original': comparacion.lenguaje.nombre,
-                    'usando_analisis': 'generico'
-                }, status=200)
-            
-            lenguaje = lenguaje_detectado
+        # Ambos códigos se analizan en el pool de procesos y el resultado se guarda en BD
+        resultados, omitidas = analizar_eficiencia_comparaciones([comparacion])
         
-        analisis_1 = analizar_codigo_big_o(comparacion.codigo_1, lenguaje)
-        analisis_2 = analizar_codigo_big_o(comparacion.codigo_2, lenguaje)
+        if omitidas:
+            return JsonResponse({
+                'advertencia': omitidas[0]['advertencia'],
+                'lenguaje_original': comparacion.lenguaje.nombre,
+                'usando_analisis': 'generico'
+            }, status=200)
         
-        ganador = determinar_ganador(
-            analisis_1['complejidad_temporal'],
-            analisis_2['complejidad_temporal']
-        )
+        resultado = resultados[0]
         
-        resultado = {
+        return JsonResponse({
             'mensaje': 'Análisis Big O completado',
-            'codigo_1': analisis_1,
-            'codigo_2': analisis_2,
-            'ganador': ganador,
-            'lenguaje': comparacion.lenguaje.nombre,
-            'lenguaje_analizado': LENGUAJES_SOPORTADOS[lenguaje]['nombre']
-        }
-        
-        # Guardar en base de datos
-        resultado_bd = ResultadosEficienciaIndividual.objects.create(
-            id_comparacion_individual_id=comparacion_id,
-            codigo_1_complejidad_temporal=analisis_1['complejidad_temporal'],
-            codigo_1_complejidad_espacial=analisis_1['complejidad_espacial'],
-            codigo_1_nivel_anidamiento=analisis_1['nivel_anidamiento'],
-            codigo_1_patrones_detectados=analisis_1['patrones_detectados'],
-            codigo_1_estructuras_datos=analisis_1['estructuras_datos'],
-            codigo_1_confianza_analisis=analisis_1['confianza_analisis'],
-            codigo_2_complejidad_temporal=analisis_2['complejidad_temporal'],
-            codigo_2_complejidad_espacial=analisis_2['complejidad_espacial'],
-            codigo_2_nivel_anidamiento=analisis_2['nivel_anidamiento'],
-            codigo_2_patrones_detectados=analisis_2['patrones_detectados'],
-            codigo_2_estructuras_datos=analisis_2['estructuras_datos'],
-            codigo_2_confianza_analisis=analisis_2['confianza_analisis'],
-            ganador=ganador,
-            lenguaje=comparacion.lenguaje.nombre,
-            lenguaje_analizado=LENGUAJES_SOPORTADOS[lenguaje]['nombre'],
-            fecha_analisis=timezone.now()
-        )
-        
-        # ← IMPORTANTE: Agregar el ID del resultado a la respuesta
-        resultado['resultado_id'] = resultado_bd.id_resultado_eficiencia_individual
-        
-        return JsonResponse(resultado, status=200)
+            'codigo_1': resultado['codigo_1'],
+            'codigo_2': resultado['codigo_2'],
+            'ganador': resultado['ganador'],
+            'lenguaje': resultado['lenguaje'],
+            'lenguaje_analizado': resultado['lenguaje_analizado'],
+            'resultado_id': resultado['resultado_id']
+        }, status=200)
         
     except ComparacionesIndividuales.DoesNotExist:
         return JsonResponse({'error': 'Comparación no encontrada'}, status=404)
@@ -1698,384 +1762,61 @@ def analizar_big_o_individual(request, comparacion_id):
         }, status=500)
 
 
-def detectar_lenguaje_por_extension(extension: str) -> str:
-    """Detecta el lenguaje por su extensión"""
-    if not extension:
-        return None
-    
-    extension = extension.lower()
-    if not extension.startswith('.'):
-        extension = f'.{extension}'
+@csrf_exempt
+@require_http_methods(["POST"])
+def analizar_big_o_lote(request):
+    """Analiza Big O de varias comparaciones individuales y guarda todos los resultados de una vez"""
+    payload = validar_token(request)
     
-    for lenguaje, info in LENGUAJES_SOPORTADOS.items():
-        if extension in info['extensiones']:
-            return lenguaje
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido'}, status=401)
     
-    return None
-
-
-def analizar_codigo_big_o(codigo: str, lenguaje: str) -> Dict:
-    """Analiza un código y retorna su complejidad Big O"""
-    lineas = codigo.split('\n')
-    
-    # Analizar cada función por separado
-    funciones = extraer_funciones(codigo, lineas, lenguaje)
-    
-    if funciones:
-        # Si hay múltiples funciones, tomar la de mayor complejidad
-        complejidad_temporal = max(
-            [calcular_complejidad_temporal(func['codigo'], func['lineas'], lenguaje) 
-             for func in funciones],
-            key=lambda x: orden_complejidad(x)
+    try:
+        # 1. Leer y validar la lista de IDs
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        
+        ids = data.get('comparaciones')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return JsonResponse({
+                'error': 'El campo comparaciones debe ser una lista de IDs'
+            }, status=400)
+        
+        ids = list(dict.fromkeys(ids))
+        max_lote = configuracion_analisis()['MAX_LOTE']
+        if len(ids) > max_lote:
+            return JsonResponse({
+                'error': f'Máximo {max_lote} comparaciones por lote'
+            }, status=400)
+        
+        # 2. Traer todas las comparaciones con su lenguaje en una sola consulta
+        comparaciones = list(
+            ComparacionesIndividuales.objects.select_related('lenguaje').filter(pk__in=ids)
         )
-    else:
-        # Analizar el código completo
-        complejidad_temporal = calcular_complejidad_temporal(codigo, lineas, lenguaje)
-    
-    complejidad_espacial = calcular_complejidad_espacial(codigo, lineas, lenguaje)
-    patrones = detectar_patrones(codigo, lineas, lenguaje)
-    nivel_anidamiento = contar_loops_anidados(lineas, lenguaje)
-    estructuras = detectar_estructuras_datos(codigo, lenguaje)
-    
-    return {
-        'complejidad_temporal': complejidad_temporal,
-        'complejidad_espacial': complejidad_espacial,
-        'patrones_detectados': patrones,
-        'nivel_anidamiento': nivel_anidamiento,
-        'estructuras_datos': estructuras,
-        'confianza_analisis': calcular_confianza(codigo, lenguaje)
-    }
-
-
-def extraer_funciones(codigo: str, lineas: List[str], lenguaje: str) -> List[Dict]:
-    """Extrae funciones individuales del código para analizarlas por separado"""
-    funciones = []
-    
-    if lenguaje == 'python':
-        funcion_actual = None
-        indentacion_funcion = None
-        
-        for i, linea in enumerate(lineas):
-            # Detectar inicio de función
-            if re.match(r'^\s*def\s+(\w+)\s*\(', linea):
-                if funcion_actual:
-                    funciones.append(funcion_actual)
-                
-                espacios = len(linea) - len(linea.lstrip())
-                funcion_actual = {
-                    'nombre': re.search(r'def\s+(\w+)', linea).group(1),
-                    'lineas': [linea],
-                    'codigo': linea + '\n',
-                    'indentacion': espacios
-                }
-                indentacion_funcion = espacios
-            
-            # Agregar líneas a la función actual
-            elif funcion_actual:
-                espacios = len(linea) - len(linea.lstrip())
-                
-                # Si la indentación vuelve al nivel de la función o menos, terminar
-                if linea.strip() and espacios <= indentacion_funcion and not linea.strip().startswith('#'):
-                    funciones.append(funcion_actual)
-                    funcion_actual = None
-                else:
-                    funcion_actual['lineas'].append(linea)
-                    funcion_actual['codigo'] += linea + '\n'
-        
-        # Agregar última función
-        if funcion_actual:
-            funciones.append(funcion_actual)
-    
-    return funciones
-
-
-def orden_complejidad(complejidad: str) -> int:
-    """Retorna el orden numérico de una complejidad"""
-    orden = {
-        'O(1)': 1,
-        'O(log n)': 2,
-        'O(n)': 3,
-        'O(n log n)': 4,
-        'O(n^2)': 5,
-        'O(n^3)': 6,
-        'O(2^n)': 7,
-        'O(n!)': 8
-    }
-    return orden.get(complejidad, 999)
-
-
-def calcular_confianza(codigo: str, lenguaje: str) -> str:
-    """Calcula qué tan confiable es el análisis"""
-    if lenguaje in ['python', 'javascript', 'java', 'c', 'cpp', 'c++']:
-        return 'Alta'
-    elif lenguaje in LENGUAJES_SOPORTADOS:
-        return 'Media'
-    else:
-        return 'Baja - Análisis genérico'
-
-
-def contar_loops_anidados(lineas: List[str], lenguaje: str) -> int:
-    """Cuenta el nivel máximo de loops anidados"""
-    max_nivel = 0
-    
-    patrones_loop = {
-        'python': r'^\s*(for\s+.*:|while\s+.*:)',
-        'javascript': r'^\s*(for\s*\(|while\s*\()',
-        'typescript': r'^\s*(for\s*\(|while\s*\()',
-        'java': r'^\s*(for\s*\(|while\s*\()',
-        'c': r'^\s*(for\s*\(|while\s*\()',
-        'cpp': r'^\s*(for\s*\(|while\s*\()',
-        'c++': r'^\s*(for\s*\(|while\s*\()',
-    }
-    
-    patron = patrones_loop.get(lenguaje, patrones_loop.get('python'))
-    
-    if lenguaje == 'python':
-        stack_indentacion = []
-        
-        for linea in lineas:
-            linea_limpia = linea.rstrip()
-            if not linea_limpia or linea_limpia.strip().startswith('#'):
-                continue
-            
-            espacios = len(linea) - len(linea.lstrip())
-            
-            # Detectar loop
-            if re.search(patron, linea):
-                stack_indentacion.append(espacios)
-                nivel_actual = len(stack_indentacion)
-                max_nivel = max(max_nivel, nivel_actual)
-            else:
-                # Salir de loops cuando la indentación disminuye
-                while stack_indentacion and espacios <= stack_indentacion[-1]:
-                    stack_indentacion.pop()
-    else:
-        nivel_actual = 0
-        for linea in lineas:
-            if re.search(patron, linea):
-                nivel_actual += 1
-                max_nivel = max(max_nivel, nivel_actual)
-            
-            if '}' in linea:
-                nivel_actual = max(0, nivel_actual - 1)
-    
-    return max_nivel
-
-
-def detectar_recursion(codigo: str, lineas: List[str], lenguaje: str) -> bool:
-    """Detecta llamadas recursivas"""
-    patrones_funcion = {
-        'python': r'def\s+(\w+)\s*\(',
-        'javascript': r'(function\s+(\w+)\s*\(|const\s+(\w+)\s*=.*=>)',
-        'java': r'(public|private|protected|static)?\s*\w+\s+(\w+)\s*\(',
-        'c': r'\w+\s+(\w+)\s*\([^)]*\)\s*\{',
-        'cpp': r'\w+\s+(\w+)\s*\([^)]*\)\s*\{',
-        'c++': r'\w+\s+(\w+)\s*\([^)]*\)\s*\{',
-    }
-    
-    patron = patrones_funcion.get(lenguaje, patrones_funcion.get('python'))
-    
-    funciones = []
-    for linea in lineas:
-        matches = re.finditer(patron, linea)
-        for match in matches:
-            for grupo in match.groups():
-                if grupo and grupo not in ['public', 'private', 'protected', 'static', 'function', 'const', 'def']:
-                    funciones.append(grupo)
-    
-    for nombre_funcion in funciones:
-        for linea in lineas:
-            if 'def ' in linea or 'function ' in linea:
-                continue
-            
-            if re.search(rf'\b{nombre_funcion}\s*\(', linea):
-                return True
-    
-    return False
-
-
-def calcular_complejidad_temporal(codigo: str, lineas: List[str], lenguaje: str) -> str:
-    """Calcula Big O temporal"""
-    loops = contar_loops_anidados(lineas, lenguaje)
-    tiene_recursion = detectar_recursion(codigo, lineas, lenguaje)
-    tiene_division_iterativa = detectar_division_iterativa_en_loop(codigo, lineas)
-    
-    if tiene_recursion:
-        if es_recursion_multiple(codigo):
-            return "O(2^n)"
-        elif es_recursion_dividir_conquistar(codigo):
-            return "O(n log n)"
-        else:
-            return "O(n)"
-    
-    elif loops >= 3:
-        return "O(n^3)"
-    elif loops == 2:
-        return "O(n^2)"
-    elif loops == 1:
-        if tiene_division_iterativa:
-            return "O(n log n)"
-        return "O(n)"
-    else:
-        return "O(1)"
-
-
-def detectar_division_iterativa_en_loop(codigo: str, lineas: List[str]) -> bool:
-    """Detecta si hay división iterativa DENTRO de un loop"""
-    en_loop = False
-    
-    for linea in lineas:
-        if re.search(r'^\s*(for|while)\s+', linea):
-            en_loop = True
+        encontradas = {comparacion.id for comparacion in comparaciones}
         
-        if en_loop:
-            if re.search(r'//=\s*2|/=\s*2', linea):
-                return True
-            
-            if re.search(r'(mid|mitad)\s*=.*//\s*2', linea):
-                return True
+        # 3. Analizar en paralelo y guardar con un solo bulk_create
+        resultados, omitidas = analizar_eficiencia_comparaciones(comparaciones)
         
-        if en_loop and linea.strip() and not linea.strip().startswith('#'):
-            espacios = len(linea) - len(linea.lstrip())
-            if espacios == 0:
-                en_loop = False
-    
-    return False
-
-
-def calcular_complejidad_espacial(codigo: str, lineas: List[str], lenguaje: str) -> str:
-    """Calcula Big O espacial"""
-    arrays_auxiliares = contar_arrays_auxiliares_significativos(codigo, lineas, lenguaje)
-    tiene_recursion = detectar_recursion(codigo, lineas, lenguaje)
-    tiene_matriz = detectar_matriz(codigo, lenguaje)
-    
-    if tiene_matriz:
-        return "O(n^2)"
-    elif tiene_recursion:
-        return "O(n)"
-    elif arrays_auxiliares > 0:
-        return "O(n)"
-    else:
-        return "O(1)"
-
-
-def contar_arrays_auxiliares_significativos(codigo: str, lineas: List[str], lenguaje: str) -> int:
-    """Cuenta solo arrays auxiliares que crecen proporcionalmente con la entrada"""
-    
-    if lenguaje == 'python':
-        contador = 0
+        omitidas.extend(
+            {'comparacion_id': id_comparacion, 'error': 'Comparación no encontrada'}
+            for id_comparacion in ids if id_comparacion not in encontradas
+        )
         
-        for linea in lineas:
-            if re.search(r'=\s*\[.+\]', linea) and not re.search(r'=\s*\[[^\]]{0,5}\]', linea):
-                contador += 1
-            
-            elif re.search(r'=\s*\[\s*\]', linea):
-                nombre_lista = re.search(r'(\w+)\s*=\s*\[\s*\]', linea)
-                if nombre_lista:
-                    lista = nombre_lista.group(1)
-                    if re.search(rf'{lista}\.append\(', codigo):
-                        contador += 1
+        return JsonResponse({
+            'mensaje': 'Análisis Big O por lote completado',
+            'total_analizadas': len(resultados),
+            'resultados': resultados,
+            'omitidas': omitidas
+        }, status=200)
         
-        return contador
-    
-    return 0
-
-
-def es_recursion_multiple(codigo: str) -> bool:
-    """Detecta recursión múltiple"""
-    return len(re.findall(r'\w+\([^)]*-\s*\d+\)', codigo)) >= 2
-
-
-def es_recursion_dividir_conquistar(codigo: str) -> bool:
-    """Detecta recursión divide y conquista"""
-    patrones = [r'//\s*2', r'/\s*2', r'mid', r'mitad', r'medio', r'pivot']
-    return any(re.search(p, codigo, re.IGNORECASE) for p in patrones)
-
-
-def detectar_matriz(codigo: str, lenguaje: str) -> bool:
-    """Detecta matrices 2D"""
-    patrones = {
-        'python': r'\[\s*\[\s*\]|\[\s*\]\s*\*\s*\d+',
-        'javascript': r'new\s+Array\(.*\)\.fill\(\[|\.map\(\s*\(\)\s*=>\s*\[',
-        'java': r'new\s+\w+\[.*\]\[.*\]',
-        'c': r'\w+\s+\w+\[.*\]\[.*\]',
-        'cpp': r'vector<\s*vector<|new\s+\w+\[.*\]\[.*\]',
-        'c++': r'vector<\s*vector<|new\s+\w+\[.*\]\[.*\]',
-    }
-    
-    patron = patrones.get(lenguaje, r'\[\s*\[\s*\]')
-    return bool(re.search(patron, codigo))
-
-
-def detectar_patrones(codigo: str, lineas: List[str], lenguaje: str) -> List[Dict]:
-    """Detecta patrones algorítmicos"""
-    patrones = []
-    
-    if re.search(r'(binary|binaria|mid|mitad)', codigo, re.IGNORECASE):
-        patrones.append({'patron': 'Búsqueda Binaria', 'complejidad': 'O(log n)'})
-    
-    if re.search(r'(sort|ordenar|sorted|quicksort|mergesort)', codigo, re.IGNORECASE):
-        patrones.append({'patron': 'Ordenamiento', 'complejidad': 'O(n log n)'})
-    
-    if contar_loops_anidados(lineas, lenguaje) >= 2:
-        patrones.append({'patron': 'Fuerza Bruta', 'complejidad': 'O(n^2) o superior'})
-    
-    if re.search(r'(dict|map|hash|set)\s*[\(\{<]', codigo, re.IGNORECASE):
-        patrones.append({'patron': 'Hash Table', 'complejidad': 'O(1) búsquedas'})
-    
-    if re.search(r'(fibonacci|fib)', codigo, re.IGNORECASE):
-        patrones.append({'patron': 'Fibonacci', 'complejidad': 'O(2^n) o O(n) con memo'})
-    
-    if re.search(r'(dynamic|dinamica|memo|dp\[)', codigo, re.IGNORECASE):
-        patrones.append({'patron': 'Programación Dinámica', 'complejidad': 'Variable'})
-    
-    return patrones
-
-
-def detectar_estructuras_datos(codigo: str, lenguaje: str) -> List[str]:
-    """Detecta estructuras de datos"""
-    estructuras = []
-    
-    estructuras_patrones = {
-        'Array/Lista': r'\[|list\(|Array|vector<|ArrayList',
-        'Diccionario/Map': r'\{.*:.*\}|dict\(|Map|HashMap|map<',
-        'Set': r'set\(|Set|HashSet|unordered_set',
-        'Queue': r'queue|Queue|deque',
-        'Stack': r'stack|Stack',
-        'Heap': r'heap|Heap|PriorityQueue',
-        'Árbol': r'tree|Tree|node|Node|TreeNode',
-        'Grafo': r'graph|Graph|grafo|adjacency'
-    }
-    
-    for estructura, patron in estructuras_patrones.items():
-        if re.search(patron, codigo, re.IGNORECASE):
-            estructuras.append(estructura)
-    
-    return list(set(estructuras))
-
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
 
-def determinar_ganador(comp1: str, comp2: str) -> str:
-    """Determina qué código es más eficiente"""
-    orden = {
-        'O(1)': 1,
-        'O(log n)': 2,
-        'O(n)': 3,
-        'O(n log n)': 4,
-        'O(n^2)': 5,
-        'O(n^3)': 6,
-        'O(2^n)': 7,
-        'O(n!)': 8
-    }
-    
-    v1 = orden.get(comp1, 999)
-    v2 = orden.get(comp2, 999)
-    
-    if v1 < v2:
-        return 'codigo_1'
-    elif v2 < v1:
-        return 'codigo_2'
-    else:
-        return 'empate'
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -2103,259 +1844,82 @@ def crear_comentario_eficiencia_individual(request, id_resultado_eficiencia):
         
         modelo_ia = comparacion.id_modelo_ia
         
-        # 3. Obtener la configuración según el tipo de modelo
-        config = None
-        proveedor = None
-        prompt_eficiencia = None
+        # 3. Obtener la configuración del proveedor del modelo (una sola consulta)
+        adaptador, config = resolver_configuracion(modelo_ia, 'id_prompt_eficiencia')
         
-        # Intentar obtener configuración de cada proveedor
+        # 4. Validar el prompt de eficiencia y reemplazar sus placeholders
         try:
-            config = ConfiguracionClaude.objects.select_related('id_prompt_eficiencia').get(
-                id_modelo_ia_id=modelo_ia.id,
-                activo=True
+            prompt_eficiencia, prompt_procesado, compactacion = construir_prompt_eficiencia(
+                resultado_eficiencia, adaptador, config
             )
-            proveedor = 'Claude'
-            prompt_eficiencia = config.id_prompt_eficiencia
-        except ConfiguracionClaude.DoesNotExist:
-            pass
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
         
-        if not config:
-            try:
-                config = ConfiguracionOpenai.objects.select_related('id_prompt_eficiencia').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'OpenAI'
-                prompt_eficiencia = config.id_prompt_eficiencia
-            except ConfiguracionOpenai.DoesNotExist:
-                pass
-        
-        if not config:
-            try:
-                config = ConfiguracionGemini.objects.select_related('id_prompt_eficiencia').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'Gemini'
-                prompt_eficiencia = config.id_prompt_eficiencia
-            except ConfiguracionGemini.DoesNotExist:
-                pass
+        proveedor = adaptador.nombre
         
-        if not config:
+        # 5. Modo streaming (?stream=true): el comentario llega al cliente como eventos SSE
+        if request.GET.get('stream', 'false').lower() in ['true', '1', 'yes']:
             try:
-                config = ConfiguracionDeepseek.objects.select_related('id_prompt_eficiencia').get(
-                    id_modelo_ia_id=modelo_ia.id,
-                    activo=True
-                )
-                proveedor = 'DeepSeek'
-                prompt_eficiencia = config.id_prompt_eficiencia
-            except ConfiguracionDeepseek.DoesNotExist:
-                pass
-        
-        if not config:
-            return JsonResponse({
-                'error': 'No hay configuración activa para este modelo de IA'
-            }, status=404)
-        
-        # 4. Verificar que el prompt de eficiencia exista y esté activo
-        if not prompt_eficiencia:
-            return JsonResponse({
-                'error': 'No hay prompt de eficiencia configurado para este modelo'
-            }, status=400)
-        
-        if not prompt_eficiencia.activo:
-            return JsonResponse({
-                'error': 'El prompt de eficiencia configurado no está activo'
-            }, status=400)
-        
-        # 5. Reemplazar placeholders en el prompt con los datos de la comparación y análisis
-        prompt_procesado = prompt_eficiencia.template_prompt.format(
-            lenguaje=comparacion.lenguaje.nombre if comparacion.lenguaje else 'No especificado',
-            codigo_1=comparacion.codigo_1,
-            codigo_2=comparacion.codigo_2,
-            codigo_1_complejidad_temporal=resultado_eficiencia.codigo_1_complejidad_temporal,
-            codigo_1_complejidad_espacial=resultado_eficiencia.codigo_1_complejidad_espacial,
-            codigo_1_nivel_anidamiento=resultado_eficiencia.codigo_1_nivel_anidamiento or 0,
-            codigo_1_patrones_detectados=json.dumps(resultado_eficiencia.codigo_1_patrones_detectados or {}, indent=2),
-            codigo_1_estructuras_datos=json.dumps(resultado_eficiencia.codigo_1_estructuras_datos or {}, indent=2),
-            codigo_1_confianza_analisis=resultado_eficiencia.codigo_1_confianza_analisis or 'No especificada',
-            codigo_2_complejidad_temporal=resultado_eficiencia.codigo_2_complejidad_temporal,
-            codigo_2_complejidad_espacial=resultado_eficiencia.codigo_2_complejidad_espacial,
-            codigo_2_nivel_anidamiento=resultado_eficiencia.codigo_2_nivel_anidamiento or 0,
-            codigo_2_patrones_detectados=json.dumps(resultado_eficiencia.codigo_2_patrones_detectados or {}, indent=2),
-            codigo_2_estructuras_datos=json.dumps(resultado_eficiencia.codigo_2_estructuras_datos or {}, indent=2),
-            codigo_2_confianza_analisis=resultado_eficiencia.codigo_2_confianza_analisis or 'No especificada'
-        )
-        
-        # 6. Preparar headers y payload según el proveedor
-        headers = {}
-        payload = {}
-        
-        if proveedor == 'Claude':
-            headers = {
-                'Content-Type': 'application/json',
-                'x-api-key': config.api_key,
-                'anthropic-version': config.anthropic_version
-            }
-            payload = {
-                'model': config.model_name,
-                'max_tokens': config.max_tokens,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ]
-            }
-            
-        elif proveedor == 'OpenAI':
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {config.api_key}'
-            }
-            payload = {
-                'model': config.model_name,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ],
-                'max_tokens': config.max_tokens,
-                'temperature': float(config.temperature)
-            }
+                transmision = TransmisionIA(
+                    adaptador, config, prompt_procesado, timeout=120, prefijo=prefijo_eficiencia(prompt_eficiencia)
+                ).abrir()
+            except ErrorComparacionIA as e:
+                return JsonResponse(e.como_dict(), status=e.status)
             
-        elif proveedor == 'Gemini':
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            # Gemini usa la API key en la URL
-            endpoint_url = f"{config.endpoint_url}/{config.model_name}:generateContent?key={config.api_key}"
-            payload = {
-                'contents': [
-                    {
-                        'parts': [
-                            {
-                                'text': prompt_procesado
-                            }
-                        ]
-                    }
-                ],
-                'generationConfig': {
-                    'maxOutputTokens': config.max_tokens,
-                    'temperature': float(config.temperature)
-                }
-            }
+            def al_terminar(transmision):
+                return guardar_comentario_eficiencia(
+                    resultado_eficiencia, modelo_ia, adaptador, config, prompt_eficiencia,
+                    transmision.texto, transmision.tokens_usados, transmision.tiempo_respuesta,
+                    compactacion, transmision.tokens_cache
+                )
             
-        elif proveedor == 'DeepSeek':
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {config.api_key}'
-            }
-            payload = {
-                'model': config.model_name,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt_procesado
-                    }
-                ],
-                'max_tokens': config.max_tokens,
-                'temperature': float(config.temperature)
-            }
-        
-        # 7. Hacer la petición
-        inicio = time.time()
+            return respuesta_sse(request, transmitir_fragmentos(transmision, al_terminar), transmision)
         
-        # Para Gemini, usamos la URL modificada
-        url = endpoint_url if proveedor == 'Gemini' else config.endpoint_url
-        
-        response = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=120  # Más tiempo para análisis más complejos
-        )
+        # 6. Esperar turno según los límites del modelo (o rechazar antes de llamar)
+        try:
+            cupo = reservar_cupo_proveedor(adaptador, config, prompt_procesado, timeout=120)
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
         
-        tiempo_respuesta = time.time() - inicio
+        tokens_usados = None
         
-        # 8. Verificar respuesta
-        if response.status_code != 200:
-            return JsonResponse({
-                'error': f'Error de la API {proveedor}: {response.status_code}',
-                'detalle': response.text
-            }, status=response.status_code)
-        
-        # 9. Extraer la respuesta según el proveedor
-        response_data = response.json()
-        comentario_ia = None
-        tokens_usados = 0
-        
-        if proveedor == 'Claude':
-            comentario_ia = response_data['content'][0]['text']
-            tokens_usados = (
-                response_data.get('usage', {}).get('input_tokens', 0) + 
-                response_data.get('usage', {}).get('output_tokens', 0)
+        try:
+            # 7. Preparar url, headers y payload según el proveedor
+            url, headers, payload = adaptador.construir_peticion(
+                config, prompt_procesado, prefijo_eficiencia(prompt_eficiencia)
             )
             
-        elif proveedor == 'OpenAI':
-            comentario_ia = response_data['choices'][0]['message']['content']
-            tokens_usados = response_data.get('usage', {}).get('total_tokens', 0)
+            # 8. Hacer la petición
+            inicio = time.time()
             
-        elif proveedor == 'Gemini':
-            comentario_ia = response_data['candidates'][0]['content']['parts'][0]['text']
-            tokens_usados = (
-                response_data.get('usageMetadata', {}).get('promptTokenCount', 0) +
-                response_data.get('usageMetadata', {}).get('candidatesTokenCount', 0)
+            response = cliente_http.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=120  # Más tiempo para análisis más complejos
             )
             
-        elif proveedor == 'DeepSeek':
-            comentario_ia = response_data['choices'][0]['message']['content']
-            tokens_usados = response_data.get('usage', {}).get('total_tokens', 0)
-        
-        # 10. Guardar el comentario en la base de datos
-        # Eliminar comentario anterior si existe (para evitar duplicados)
-        ComentariosEficienciaIndividual.objects.filter(
-            id_resultado_eficiencia_individual=resultado_eficiencia
-        ).delete()
-        
-        # Crear nuevo comentario
-        comentario = ComentariosEficienciaIndividual.objects.create(
-            id_resultado_eficiencia_individual=resultado_eficiencia,
-            comentario=comentario_ia
-        )
-        
-        # 11. Retornar resultado
-        return JsonResponse({
-            'mensaje': 'Comentario de eficiencia generado exitosamente',
-            'comentario_id': comentario.id_comentario_eficiencia,
-            'resultado_eficiencia_id': id_resultado_eficiencia,
-            'modelo_usado': modelo_ia.nombre,
-            'proveedor': proveedor,
-            'model_name': config.model_name,
-            'prompt_usado': {
-                'id': prompt_eficiencia.id_prompt_eficiencia,
-                'version': prompt_eficiencia.version,
-                'descripcion': prompt_eficiencia.descripcion,
-                'tipo_analisis': prompt_eficiencia.tipo_analisis
-            },
-            'tiempo_respuesta_segundos': round(tiempo_respuesta, 2),
-            'tokens_usados': tokens_usados,
-            'analisis_big_o': {
-                'codigo_1': {
-                    'temporal': resultado_eficiencia.codigo_1_complejidad_temporal,
-                    'espacial': resultado_eficiencia.codigo_1_complejidad_espacial,
-                    'ganador': resultado_eficiencia.ganador == 'codigo_1'
-                },
-                'codigo_2': {
-                    'temporal': resultado_eficiencia.codigo_2_complejidad_temporal,
-                    'espacial': resultado_eficiencia.codigo_2_complejidad_espacial,
-                    'ganador': resultado_eficiencia.ganador == 'codigo_2'
-                }
-            },
-            'comentario': comentario_ia,  # ← AGREGAR ESTA LÍNEA
-            'comentario_preview': comentario_ia[:500] + '...' if len(comentario_ia) > 500 else comentario_ia
-        }, status=200)
+            tiempo_respuesta = time.time() - inicio
+            
+            # 9. Verificar respuesta
+            if response.status_code != 200:
+                return JsonResponse({
+                    'error': f'Error de la API {proveedor}: {response.status_code}',
+                    'detalle': response.text
+                }, status=response.status_code)
+            
+            # 10. Extraer la respuesta y los tokens servidos desde la caché del proveedor
+            response_data = response.json()
+            comentario_ia, tokens_usados = adaptador.extraer_respuesta(response_data)
+            tokens_cache = adaptador.tokens_cache(adaptador.uso_respuesta(response_data))
+        finally:
+            cupo.liberar(tokens_usados)
+        
+        # 11. Guardar el comentario y retornar el resultado
+        return JsonResponse(guardar_comentario_eficiencia(
+            resultado_eficiencia, modelo_ia, adaptador, config, prompt_eficiencia,
+            comentario_ia, tokens_usados, tiempo_respuesta, compactacion, tokens_cache
+        ), status=200)
         
     except json.JSONDecodeError:
         return JsonResponse({
@@ -2378,6 +1942,101 @@ def crear_comentario_eficiencia_individual(request, id_resultado_eficiencia):
             'error': f'Error interno: {str(e)}'
         }, status=500)
     
+@csrf_exempt
+@require_http_methods(["POST"])
+async def crear_comentario_eficiencia_individual_async(request, id_resultado_eficiencia):
+    """Versión asíncrona (ASGI) de crear_comentario_eficiencia_individual"""
+    try:
+        # 1. Obtener el resultado de eficiencia
+        try:
+            resultado_eficiencia = await ResultadosEficienciaIndividual.objects.select_related(
+                'id_comparacion_individual',
+                'id_comparacion_individual__lenguaje',
+                'id_comparacion_individual__id_modelo_ia'
+            ).aget(id_resultado_eficiencia_individual=id_resultado_eficiencia)
+        except ResultadosEficienciaIndividual.DoesNotExist:
+            return JsonResponse({
+                'error': f'Resultado de eficiencia {id_resultado_eficiencia} no encontrado'
+            }, status=404)
+        
+        modelo_ia = resultado_eficiencia.id_comparacion_individual.id_modelo_ia
+        
+        # 2. Obtener el modelo IA
+        if not modelo_ia:
+            return JsonResponse({
+                'error': 'La comparación no tiene un modelo de IA asignado'
+            }, status=400)
+        
+        # 3. Configuración del proveedor y prompt de eficiencia
+        adaptador, config = await aresolver_configuracion(modelo_ia, 'id_prompt_eficiencia')
+        
+        try:
+            prompt_eficiencia, prompt_procesado, compactacion = construir_prompt_eficiencia(
+                resultado_eficiencia, adaptador, config
+            )
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
+        
+        # 4. Esperar turno según los límites del modelo sin bloquear el event loop
+        try:
+            cupo = await areservar_cupo_proveedor(adaptador, config, prompt_procesado, timeout=120)
+        except ErrorComparacionIA as e:
+            return JsonResponse(e.como_dict(), status=e.status)
+        
+        tokens_usados = None
+        
+        try:
+            # 5. Llamar al proveedor
+            url, headers, payload = adaptador.construir_peticion(
+                config, prompt_procesado, prefijo_eficiencia(prompt_eficiencia)
+            )
+            inicio = time.time()
+            
+            response = await cliente_http_async.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=120
+            )
+            
+            tiempo_respuesta = time.time() - inicio
+            
+            if response.status_code != 200:
+                return JsonResponse({
+                    'error': f'Error de la API {adaptador.nombre}: {response.status_code}',
+                    'detalle': response.text
+                }, status=response.status_code)
+            
+            response_data = response.json()
+            comentario_ia, tokens_usados = adaptador.extraer_respuesta(response_data)
+            tokens_cache = adaptador.tokens_cache(adaptador.uso_respuesta(response_data))
+        finally:
+            await cupo.aliberar(tokens_usados)
+        
+        # 6. Guardar el comentario y retornar el resultado
+        return JsonResponse(await sync_to_async(guardar_comentario_eficiencia)(
+            resultado_eficiencia, modelo_ia, adaptador, config, prompt_eficiencia,
+            comentario_ia, tokens_usados, tiempo_respuesta, compactacion, tokens_cache
+        ), status=200)
+        
+    except httpx.TimeoutException:
+        return JsonResponse({
+            'error': 'Timeout al llamar a la API de IA (análisis muy extenso)'
+        }, status=504)
+    except httpx.HTTPError as e:
+        return JsonResponse({
+            'error': f'Error en la petición HTTP: {str(e)}'
+        }, status=500)
+    except KeyError as e:
+        return JsonResponse({
+            'error': f'Falta un campo requerido en el prompt: {str(e)}'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'error': f'Error interno: {str(e)}'
+        }, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def obtener_resultados_eficiencia_individual(request, comparacion_id):
@@ -2403,10 +2062,10 @@ def obtener_resultados_eficiencia_individual(request, comparacion_id):
                 'error': 'No tienes permiso para ver estos resultados'
             }, status=403)
         
-        # Obtener todos los resultados de eficiencia para esta comparación
+        # Solo el resultado vigente (el de la versión más reciente del analizador)
         resultados = ResultadosEficienciaIndividual.objects.filter(
             id_comparacion_individual=comparacion_id
-        )
+        ).order_by('-version_analizador')[:1]
         
         # Construir la lista de resultados
         resultados_list = []
@@ -2432,12 +2091,31 @@ def obtener_resultados_eficiencia_individual(request, comparacion_id):
                 'ganador': resultado.ganador,
                 'lenguaje': resultado.lenguaje,
                 'lenguaje_analizado': resultado.lenguaje_analizado,
+                'version_analizador': resultado.version_analizador,
                 'fecha_analisis': resultado.fecha_analisis.isoformat() if resultado.fecha_analisis else None
             })
         
-        return JsonResponse({
-            'resultados': resultados_list
-        }, status=200)
+        respuesta = {'resultados': resultados_list}
+        
+        # Las ejecuciones anteriores solo se envían si se piden (?historial=true)
+        if request.GET.get('historial', 'false').lower() in ['true', '1', 'yes']:
+            respuesta['historial'] = [
+                {
+                    'version_analizador': fila['version_analizador'],
+                    'codigo_1_complejidad_temporal': fila['codigo_1_complejidad_temporal'],
+                    'codigo_2_complejidad_temporal': fila['codigo_2_complejidad_temporal'],
+                    'ganador': fila['ganador'],
+                    'fecha_analisis': fila['fecha_analisis'].isoformat() if fila['fecha_analisis'] else None
+                }
+                for fila in HistorialEficienciaIndividual.objects.filter(
+                    id_comparacion_individual=comparacion_id
+                ).order_by('-fecha_analisis').values(
+                    'version_analizador', 'codigo_1_complejidad_temporal',
+                    'codigo_2_complejidad_temporal', 'ganador', 'fecha_analisis'
+                )
+            ]
+        
+        return JsonResponse(respuesta, status=200)
         
     except ComparacionesIndividuales.DoesNotExist:
         return JsonResponse({
@@ -2472,22 +2150,22 @@ def obtener_comentarios_eficiencia_individual(request, comparacion_id):
                 'error': 'No tienes permiso para ver estos comentarios'
             }, status=403)
         
-        # Obtener los resultados de eficiencia para esta comparación
+        # Comentarios del resultado vigente (el de la versión más reciente del analizador)
         resultados_eficiencia = ResultadosEficienciaIndividual.objects.filter(
             id_comparacion_individual=comparacion_id
-        )
+        ).order_by('-version_analizador').values('id_resultado_eficiencia_individual')[:1]
         
         # Obtener todos los comentarios relacionados a estos resultados
         comentarios = ComentariosEficienciaIndividual.objects.filter(
             id_resultado_eficiencia_individual__in=resultados_eficiencia
-        ).select_related('id_resultado_eficiencia_individual')
+        )
         
         # Construir la lista de comentarios
         comentarios_list = []
         for comentario in comentarios:
             comentarios_list.append({
                 'id_comentario': comentario.id_comentario_eficiencia,
-                'id_resultado_eficiencia': comentario.id_resultado_eficiencia_individual.id_resultado_eficiencia_individual,
+                'id_resultado_eficiencia': comentario.id_resultado_eficiencia_individual_id,
                 'comentario': comentario.comentario,
                 'fecha_generacion': comentario.fecha_generacion.isoformat() if comentario.fecha_generacion else None
             })